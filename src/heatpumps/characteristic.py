@@ -0,0 +1,1229 @@
+import numpy as np
+import pandas as pd
+from scipy.interpolate import NdBSpline
+from scipy.interpolate import RegularGridInterpolator
+from scipy.interpolate import make_interp_spline
+from scipy.sparse import csr_matrix
+from scipy.sparse.linalg import spsolve
+
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
+
+def _axis_weights(grid, x, clamp=False):
+    """
+    Return enclosing nodes, weights and in-range mask of values on a grid.
+
+    Values outside of the grid are clamped to its bounds if `clamp` is set.
+    The upper node is always the lower node plus one (except for grids of a
+    single node), so that values on the last node get a weight of one.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    if clamp:
+        x = np.clip(x, grid[0], grid[-1])
+    inside = (x >= grid[0]) & (x <= grid[-1])
+    n = len(grid)
+    if n == 1:
+        zeros = np.zeros(x.shape, dtype=np.intp)
+        return zeros, zeros, np.zeros(x.shape), inside
+    if n <= 32:
+        # counting the inner nodes below is faster than a binary search for
+        # the small grids of partload characteristics
+        lower = np.zeros(x.shape, dtype=np.intp)
+        for node in grid[1:-1]:
+            lower += x >= node
+    else:
+        lower = np.clip(np.searchsorted(grid, x, side='right') - 1, 0, n - 2)
+    upper = lower + 1
+    t = (x - grid[lower]) * (1 / np.diff(grid))[lower]
+    return lower, upper, t, inside
+
+
+def _locate(grid, x):
+    """Return the enclosing nodes of a value and its relative position."""
+    n = grid.shape[0]
+    if not (grid[0] <= x <= grid[n - 1]):
+        return -1, -1, 0.0
+    if n == 1:
+        return 0, 0, 0.0
+    lower = 0
+    upper = n - 1
+    while upper - lower > 1:
+        middle = (lower + upper) // 2
+        if grid[middle] <= x:
+            lower = middle
+        else:
+            upper = middle
+    return lower, upper, (x - grid[lower]) / (grid[upper] - grid[lower])
+
+
+def _trilinear(grid0, grid1, grid2, values, x0, x1, x2):
+    """Interpolate a 3d array trilinearly at a single point."""
+    i0, j0, t0 = _locate(grid0, x0)
+    i1, j1, t1 = _locate(grid1, x1)
+    i2, j2, t2 = _locate(grid2, x2)
+    if i0 < 0 or i1 < 0 or i2 < 0:
+        return np.nan
+
+    v00 = values[i0, i1, i2] * (1 - t2) + values[i0, i1, j2] * t2
+    v01 = values[i0, j1, i2] * (1 - t2) + values[i0, j1, j2] * t2
+    v10 = values[j0, i1, i2] * (1 - t2) + values[j0, i1, j2] * t2
+    v11 = values[j0, j1, i2] * (1 - t2) + values[j0, j1, j2] * t2
+    v0 = v00 * (1 - t1) + v01 * t1
+    v1 = v10 * (1 - t1) + v11 * t1
+    return v0 * (1 - t0) + v1 * t0
+
+
+def _trilinear_batch(grid0, grid1, grid2, values, x0, x1, x2, out):
+    """Interpolate a 3d array trilinearly at many points into `out`."""
+    for k in range(x0.shape[0]):
+        out[k] = _trilinear(grid0, grid1, grid2, values, x0[k], x1[k], x2[k])
+    return out
+
+
+def _trilinear_batch_numpy(grid0, grid1, grid2, values, x0, x1, x2, out):
+    """Vectorised NumPy version of `_trilinear_batch`."""
+    indices = [
+        _axis_weights(grid, x)
+        for grid, x in zip([grid0, grid1, grid2], [x0, x1, x2])
+        ]
+    (i0, j0, t0, in0), (i1, j1, t1, in1), (i2, j2, t2, in2) = indices
+    v0 = (
+        (values[i0, i1, i2] * (1 - t2) + values[i0, i1, j2] * t2) * (1 - t1)
+        + (values[i0, j1, i2] * (1 - t2) + values[i0, j1, j2] * t2) * t1
+        )
+    v1 = (
+        (values[j0, i1, i2] * (1 - t2) + values[j0, i1, j2] * t2) * (1 - t1)
+        + (values[j0, j1, i2] * (1 - t2) + values[j0, j1, j2] * t2) * t1
+        )
+    out[:] = np.where(in0 & in1 & in2, v0 * (1 - t0) + v1 * t0, np.nan)
+    return out
+
+
+if njit is not None:
+    _locate = njit(cache=True)(_locate)
+    _trilinear = njit(cache=True)(_trilinear)
+    _trilinear_batch = njit(cache=True)(_trilinear_batch)
+else:
+    _trilinear_batch = _trilinear_batch_numpy
+
+
+def _scalar_kernel(grid0, grid1, grid2, numerator, denominator=None):
+    """Return a scalar lookup function with the support arrays frozen in."""
+    if denominator is None:
+        def kernel(x0, x1, x2):
+            return _trilinear(grid0, grid1, grid2, numerator, x0, x1, x2)
+    else:
+        def kernel(x0, x1, x2):
+            return (
+                _trilinear(grid0, grid1, grid2, numerator, x0, x1, x2)
+                / _trilinear(grid0, grid1, grid2, denominator, x0, x1, x2)
+                )
+    if njit is not None:
+        kernel = njit(kernel)
+    return kernel
+
+
+def harmonic_fill(array):
+    """
+    Fill NaN values of a regular grid by harmonic interpolation.
+
+    The missing values are the solution of the discrete Laplace equation on
+    the grid (in index space), where the valid values act as fixed boundary
+    conditions and the grid edges as zero-flux boundaries. All missing values
+    are determined at once by a single sparse linear solve, so the result
+    blends smoothly into the surrounding valid values.
+
+    Parameters
+    ----------
+    array : np.ndarray
+        N-d array of values containing NaN at the missing points.
+
+    Returns
+    -------
+    tuple of np.ndarray
+        The filled array and a boolean mask of the reconstructed values. If
+        there are no valid values at all, the array is returned unchanged.
+    """
+    array = np.asarray(array, dtype=float)
+    missing = np.isnan(array)
+    filled = array.copy()
+    if not missing.any() or missing.all():
+        return filled, np.zeros(array.shape, dtype=bool)
+
+    n_missing = missing.sum()
+    index = np.full(array.shape, -1)
+    index[missing] = np.arange(n_missing)
+    coords = np.nonzero(missing)
+    equations = np.arange(n_missing)
+
+    diagonal = np.zeros(n_missing)
+    rhs = np.zeros(n_missing)
+    rows, cols = [], []
+    for axis in range(array.ndim):
+        for shift in [-1, 1]:
+            neighbour = list(coords)
+            neighbour[axis] = coords[axis] + shift
+            inside = (
+                (neighbour[axis] >= 0)
+                & (neighbour[axis] < array.shape[axis])
+                )
+            neighbour = tuple(c[inside] for c in neighbour)
+            eq = equations[inside]
+            diagonal[eq] += 1
+
+            neighbour_missing = missing[neighbour]
+            rows += [eq[neighbour_missing]]
+            cols += [index[neighbour][neighbour_missing]]
+            np.add.at(
+                rhs, eq[~neighbour_missing], array[neighbour][~neighbour_missing]
+                )
+
+    rows = np.concatenate(rows + [equations])
+    cols = np.concatenate(cols + [equations])
+    values = np.concatenate([-np.ones(len(rows) - n_missing), diagonal])
+    laplacian = csr_matrix(
+        (values, (rows, cols)), shape=(n_missing, n_missing)
+        )
+    filled[missing] = spsolve(laplacian, rhs)
+
+    return filled, missing
+
+
+def _chord_errors(x, y):
+    """
+    Return squared errors and slopes of all chords of many sampled curves.
+
+    The squared error of the chord from sample i to sample j of a curve is
+    the sum of squared deviations of the samples i to j from the chord. It is
+    computed for all pairs of samples of all curves at once from prefix sums.
+
+    Parameters
+    ----------
+    x, y : np.ndarray
+        Samples of the curves with the shape (curves, samples) and `x`
+        increasing along each curve.
+
+    Returns
+    -------
+    tuple of np.ndarray
+        Squared errors and slopes with the shape (curves, samples, samples).
+        Chords with j <= i have an infinite error.
+    """
+    x = x - x[:, :1]
+    y = y - y[:, :1]
+    n_curves, n_samples = x.shape
+
+    def range_sums(values):
+        prefix = np.zeros((n_curves, n_samples + 1))
+        prefix[:, 1:] = np.cumsum(values, axis=1)
+        return prefix[:, np.newaxis, 1:] - prefix[:, :-1, np.newaxis]
+
+    S_x = range_sums(x)
+    S_y = range_sums(y)
+    S_xx = range_sums(x * x)
+    S_xy = range_sums(x * y)
+    S_yy = range_sums(y * y)
+
+    samples = np.arange(n_samples)
+    n = (samples[np.newaxis, :] - samples[:, np.newaxis] + 1)[np.newaxis]
+    x_i = x[:, :, np.newaxis]
+    y_i = y[:, :, np.newaxis]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        slopes = (y[:, np.newaxis, :] - y_i) / (x[:, np.newaxis, :] - x_i)
+
+    sum_dxx = S_xx - 2 * x_i * S_x + n * x_i ** 2
+    sum_dxy = S_xy - x_i * S_y - y_i * S_x + n * x_i * y_i
+    sum_dyy = S_yy - 2 * y_i * S_y + n * y_i ** 2
+    errors = np.maximum(
+        sum_dyy - 2 * slopes * sum_dxy + slopes ** 2 * sum_dxx, 0
+        )
+    errors = np.where((n > 1) & np.isfinite(slopes), errors, np.inf)
+
+    return errors, slopes
+
+
+def fit_piecewise_linear(x, y, n_segments, convex=False, max_elements=2**20):
+    """
+    Fit continuous piecewise linear functions to many sampled curves.
+
+    The breakpoints are chosen among the samples of every curve, such that
+    the sum of squared deviations of all samples from the piecewise linear
+    function is minimal. The first and last sample of a curve are always
+    breakpoints. The optimum is found by dynamic programming over arrays of
+    all curves of a chunk at once.
+
+    Parameters
+    ----------
+    x, y : np.ndarray
+        Samples of the curves with the shape (curves, samples). The samples
+        of each curve are sorted by `x` if necessary.
+
+    n_segments : int
+        Number of linear segments. It is reduced if the curves have too few
+        samples.
+
+    convex : bool
+        Flag to set if the slopes of the segments have to be non-decreasing,
+        so the functions are convex (e.g. to be used without binary variables
+        in minimisation problems). If no convex fit with `n_segments` exists,
+        the best convex fit with fewer segments is used and its widest
+        segments are split in collinear halves. Otherwise, the functions are
+        suited for SOS2 formulations. Default is `False`.
+
+    max_elements : int
+        Maximal number of values of the intermediate arrays with the shape
+        (curves, samples, samples). The curves are fitted in chunks
+        accordingly, which bounds the memory use. Defaults to 2**20.
+
+    Returns
+    -------
+    tuple of np.ndarray
+        Breakpoints in `x` and `y` with the shape (curves, n_segments + 1)
+        and the sum of squared errors of every curve.
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    order = np.argsort(x, axis=1)
+    x = np.take_along_axis(x, order, axis=1)
+    y = np.take_along_axis(y, order, axis=1)
+    n_curves, n_samples = x.shape
+    n_segments = max(1, min(int(n_segments), n_samples - 1))
+
+    x_breakpoints = np.full((n_curves, n_segments + 1), np.nan)
+    y_breakpoints = np.full((n_curves, n_segments + 1), np.nan)
+    sse = np.full(n_curves, np.inf)
+    chunksize = max(1, max_elements // n_samples**2)
+    for start in range(0, n_curves, chunksize):
+        chunk = slice(start, start + chunksize)
+        x_breakpoints[chunk], y_breakpoints[chunk], sse[chunk] = (
+            _fit_piecewise_linear(x[chunk], y[chunk], n_segments, convex)
+            )
+
+    return x_breakpoints, y_breakpoints, sse
+
+
+def _fit_piecewise_linear(x, y, n_segments, convex):
+    """Fit piecewise linear functions to curves with sorted samples."""
+    n_curves, n_samples = x.shape
+    errors, slopes = _chord_errors(x, y)
+    curves = np.arange(n_curves)
+    pointers = []
+
+    if not convex:
+        # cost of the best fit of the samples up to j with s segments
+        cost = np.full((n_curves, n_samples), np.inf)
+        cost[:, 0] = 0
+        for _ in range(n_segments):
+            total = cost[:, :, np.newaxis] + errors
+            pointers += [total.argmin(axis=1)]
+            cost = total.min(axis=1)
+        sse = cost[:, -1]
+
+        breakpoints = [np.full(n_curves, n_samples - 1)]
+        for pointer in pointers[::-1]:
+            breakpoints += [pointer[curves, breakpoints[-1]]]
+        breakpoints = np.stack(breakpoints[::-1], axis=1)
+        x_breakpoints = np.take_along_axis(x, breakpoints, axis=1)
+        y_breakpoints = np.take_along_axis(y, breakpoints, axis=1)
+        infeasible = ~np.isfinite(sse)
+        x_breakpoints[infeasible] = np.nan
+        y_breakpoints[infeasible] = np.nan
+    else:
+        # cost of the best fit with s segments ending with the chord (i, j)
+        cost = np.where(
+            np.arange(n_samples)[np.newaxis, :, np.newaxis] == 0,
+            errors, np.inf
+            )
+        finals = [cost[:, :, -1]]
+        for _ in range(n_segments - 1):
+            new_cost = np.full(cost.shape, np.inf)
+            pointer = np.zeros(cost.shape, dtype=int)
+            for i in range(1, n_samples - 1):
+                # only chords (k, i) with k < i can precede chords (i, j)
+                # with j > i
+                feasible = (
+                    slopes[:, :i, i, np.newaxis]
+                    <= slopes[:, np.newaxis, i, i + 1:]
+                    )
+                previous = np.where(
+                    feasible, cost[:, :i, i, np.newaxis], np.inf
+                    )
+                pointer[:, i, i + 1:] = previous.argmin(axis=1)
+                new_cost[:, i, i + 1:] = (
+                    previous.min(axis=1) + errors[:, i, i + 1:]
+                    )
+            pointers += [pointer]
+            cost = new_cost
+            finals += [cost[:, :, -1]]
+
+        # fewer segments are used if no convex fit with n_segments exists
+        finals = np.stack(finals, axis=1)
+        sse_stages = finals.min(axis=2)
+        stages = n_segments - 1 - sse_stages[:, ::-1].argmin(axis=1)
+        sse = sse_stages[curves, stages]
+        last = finals[curves, stages].argmin(axis=1)
+
+        x_breakpoints = np.full((n_curves, n_segments + 1), np.nan)
+        y_breakpoints = np.full((n_curves, n_segments + 1), np.nan)
+        for stage in np.unique(stages[np.isfinite(sse)]):
+            group = curves[(stages == stage) & np.isfinite(sse)]
+            breakpoints = [np.full(len(group), n_samples - 1), last[group]]
+            for pointer in pointers[:stage][::-1]:
+                breakpoints += [
+                    pointer[group, breakpoints[-1], breakpoints[-2]]
+                    ]
+            breakpoints = np.stack(breakpoints[::-1], axis=1)
+            x_breakpoints[group, :stage + 2] = np.take_along_axis(
+                x[group], breakpoints, axis=1
+                )
+            y_breakpoints[group, :stage + 2] = np.take_along_axis(
+                y[group], breakpoints, axis=1
+                )
+
+        for curve in curves[np.isfinite(sse) & (stages < n_segments - 1)]:
+            x_curve = x_breakpoints[curve, :stages[curve] + 2]
+            y_curve = y_breakpoints[curve, :stages[curve] + 2]
+            while len(x_curve) < n_segments + 1:
+                k = np.argmax(np.diff(x_curve))
+                x_curve = np.insert(
+                    x_curve, k + 1, (x_curve[k] + x_curve[k + 1]) / 2
+                    )
+                y_curve = np.insert(
+                    y_curve, k + 1, (y_curve[k] + y_curve[k + 1]) / 2
+                    )
+            x_breakpoints[curve] = x_curve
+            y_breakpoints[curve] = y_curve
+
+    return x_breakpoints, y_breakpoints, sse
+
+
+class PartloadCharacteristic:
+    """
+    Partload characteristic of a heat pump evaluated on demand.
+
+    The characteristic keeps the support points of the offdesign simulation
+    and interpolates heat output, power input, COP and exergetic efficiency
+    linearly between them whenever they are requested. Memory use and build
+    time are therefore independent of the resolution the values are needed
+    in. Points outside of the support ranges evaluate to NaN.
+
+    Parameters
+    ----------
+    T_hs_ff_range : 1d array
+        Feed flow temperatures of the heat source of the support points.
+
+    T_cons_ff_range : 1d array
+        Feed flow temperatures of the heat sink of the support points.
+
+    pl_range : 1d array
+        Partload ratios of the support points.
+
+    Q_array : 3d array
+        Heat output at the support points with the shape
+        (T_hs_ff, T_cons_ff, pl).
+
+    P_array : 3d array
+        Power input at the support points with the same shape as `Q_array`.
+
+    epsilon_array : 3d array
+        Exergetic efficiency at the support points with the same shape as
+        `Q_array`.
+
+    dtype : str or np.dtype
+        Floating point type of the stored support values and of all evaluated
+        values, e.g. 'float32' to halve memory use. Default is 'float64'.
+
+    absolute : bool
+        Flag to set if the heat output in `Q_array` is already absolute. The
+        check for negative values, which reads the whole array, is skipped
+        then, e.g. for memory-mapped arrays of a `CharacteristicStore`.
+        Default is `False`.
+
+    Note
+    ----
+    The support values are stored as labelled N-d arrays in `support` with
+    the axes `dims` and the coordinates `coords`. `resample` returns a
+    characteristic with the same storage at another resolution. The boolean
+    array `reconstructed` flags support values set by `fill_gaps`.
+    """
+
+    quantities = ['Q', 'P', 'COP', 'epsilon']
+    dims = ['T_hs_ff', 'T_cons_ff', 'pl']
+    default_resolution = {'T_hs_ff': 1, 'T_cons_ff': 1, 'pl': 0.01}
+
+    def __init__(self, T_hs_ff_range, T_cons_ff_range, pl_range, Q_array,
+                 P_array, epsilon_array, dtype='float64', absolute=False):
+        """Store support points and check the shapes of the arrays."""
+        self.dtype = np.dtype(dtype)
+        if not np.issubdtype(self.dtype, np.floating):
+            raise ValueError(
+                'The dtype of a partload characteristic has to be a floating '
+                + f'point type, not {self.dtype}.'
+                )
+        self.T_hs_ff_range = np.asarray(T_hs_ff_range, dtype=float)
+        self.T_cons_ff_range = np.asarray(T_cons_ff_range, dtype=float)
+        self.pl_range = np.asarray(pl_range, dtype=float)
+
+        shape = (
+            len(self.T_hs_ff_range), len(self.T_cons_ff_range),
+            len(self.pl_range)
+            )
+        self.support = {}
+        for quantity, array in zip(
+                ['Q', 'P', 'epsilon'], [Q_array, P_array, epsilon_array]):
+            array = np.asarray(array, dtype=self.dtype)
+            if array.shape != shape:
+                raise ValueError(
+                    f'Shape {array.shape} of the {quantity} array does not '
+                    + f'match the shape of the support ranges {shape}.'
+                    )
+            self.support[quantity] = array
+        if not absolute and (self.support['Q'] < 0).any():
+            self.support['Q'] = np.abs(self.support['Q'])
+        self.reconstructed = np.zeros(shape, dtype=bool)
+
+        self._interpolators = {}
+
+    @property
+    def grid(self):
+        """Return the support ranges in the order of the array axes."""
+        return (self.T_hs_ff_range, self.T_cons_ff_range, self.pl_range)
+
+    @property
+    def coords(self):
+        """Return the support ranges labelled by their dimension."""
+        return dict(zip(self.dims, self.grid))
+
+    @property
+    def nbytes(self):
+        """Return the memory used by the support values in bytes."""
+        return sum(array.nbytes for array in self.support.values())
+
+    def _interpolator(self, quantity):
+        """Return (and cache) the grid interpolator of a quantity."""
+        if quantity not in self._interpolators:
+            self._interpolators[quantity] = RegularGridInterpolator(
+                self.grid, self.support[quantity], bounds_error=False,
+                fill_value=np.nan
+                )
+        return self._interpolators[quantity]
+
+    def evaluate(self, quantity, T_hs_ff, T_cons_ff, pl):
+        """
+        Evaluate a quantity of the characteristic.
+
+        Parameters
+        ----------
+        quantity : str
+            Quantity to evaluate. One of 'Q', 'P', 'COP' or 'epsilon'.
+
+        T_hs_ff : float or array
+            Feed flow temperature of the heat source.
+
+        T_cons_ff : float or array
+            Feed flow temperature of the heat sink.
+
+        pl : float or array
+            Partload ratio.
+
+        Returns
+        -------
+        float or np.ndarray
+            Interpolated values in the broadcast shape of the inputs.
+        """
+        if quantity not in self.quantities:
+            raise KeyError(
+                f'Quantity {quantity} is not part of the partload '
+                + f'characteristic. Choose one of {self.quantities}.'
+                )
+        if quantity == 'COP':
+            return (
+                self.evaluate('Q', T_hs_ff, T_cons_ff, pl)
+                / self.evaluate('P', T_hs_ff, T_cons_ff, pl)
+                )
+
+        T_hs_ff, T_cons_ff, pl = np.broadcast_arrays(
+            np.asarray(T_hs_ff, dtype=float),
+            np.asarray(T_cons_ff, dtype=float),
+            np.asarray(pl, dtype=float)
+            )
+        points = np.stack([T_hs_ff, T_cons_ff, pl], axis=-1)
+        values = self._interpolator(quantity)(points.reshape(-1, 3))
+        values = values.reshape(T_hs_ff.shape).astype(self.dtype, copy=False)
+        if values.ndim == 0:
+            return float(values)
+        return values
+
+    def Q(self, T_hs_ff, T_cons_ff, pl):
+        """Evaluate the heat output (see `evaluate`)."""
+        return self.evaluate('Q', T_hs_ff, T_cons_ff, pl)
+
+    def P(self, T_hs_ff, T_cons_ff, pl):
+        """Evaluate the power input (see `evaluate`)."""
+        return self.evaluate('P', T_hs_ff, T_cons_ff, pl)
+
+    def COP(self, T_hs_ff, T_cons_ff, pl):
+        """Evaluate the coefficient of performance (see `evaluate`)."""
+        return self.evaluate('COP', T_hs_ff, T_cons_ff, pl)
+
+    def epsilon(self, T_hs_ff, T_cons_ff, pl):
+        """Evaluate the exergetic efficiency (see `evaluate`)."""
+        return self.evaluate('epsilon', T_hs_ff, T_cons_ff, pl)
+
+    def inverse(self, T_hs_ff, T_cons_ff, Q, clip=False):
+        """
+        Determine partload, power input and COP of requested heat outputs.
+
+        At the requested temperatures, the heat output is interpolated at all
+        support partload ratios and the partload ratio of the requested heat
+        output is found by linear interpolation along this monotone curve.
+        If the heat output is not monotonically increasing with the partload
+        ratio, its running maximum is used. All requests are solved at once.
+
+        Parameters
+        ----------
+        T_hs_ff : float or array
+            Feed flow temperature of the heat source.
+
+        T_cons_ff : float or array
+            Feed flow temperature of the heat sink.
+
+        Q : float or array
+            Requested heat output.
+
+        clip : bool
+            Flag to set if requests outside of the feasible heat output range
+            should be clipped to the minimal or maximal heat output instead of
+            returning NaN. Requests outside of the temperature ranges remain
+            infeasible. Default is `False`.
+
+        Returns
+        -------
+        dict
+            Arrays in the broadcast shape of the inputs with the keys 'pl',
+            'Q', 'P' and 'COP' and the boolean array 'feasible' flagging
+            requests within the heat output range of the characteristic.
+        """
+        T_hs_ff, T_cons_ff, Q = np.broadcast_arrays(
+            np.asarray(T_hs_ff, dtype=float),
+            np.asarray(T_cons_ff, dtype=float),
+            np.asarray(Q, dtype=float)
+            )
+        shape = Q.shape
+        T_hs_ff = T_hs_ff.reshape(-1, 1)
+        T_cons_ff = T_cons_ff.reshape(-1, 1)
+        Q = np.abs(Q.ravel())
+
+        Q_pl = np.asarray(
+            self.evaluate('Q', T_hs_ff, T_cons_ff, self.pl_range),
+            dtype=float
+            )
+        Q_pl = np.maximum.accumulate(Q_pl, axis=1)
+        Q_min = Q_pl[:, 0]
+        Q_max = Q_pl[:, -1]
+
+        feasible = (Q >= Q_min) & (Q <= Q_max)
+        if clip:
+            Q_target = np.clip(Q, Q_min, Q_max)
+            valid = ~np.isnan(Q_target)
+        else:
+            Q_target = Q
+            valid = feasible
+
+        n_pl = len(self.pl_range)
+        upper = (Q_pl < Q_target[:, np.newaxis]).sum(axis=1)
+        upper = np.clip(upper, 1, n_pl - 1)
+        rows = np.arange(len(Q))
+        Q_lower = Q_pl[rows, upper - 1]
+        Q_upper = Q_pl[rows, upper]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            fraction = np.where(
+                Q_upper > Q_lower,
+                (Q_target - Q_lower) / (Q_upper - Q_lower),
+                0.0
+                )
+        pl = (
+            self.pl_range[upper - 1]
+            + fraction * (self.pl_range[upper] - self.pl_range[upper - 1])
+            )
+        pl = np.where(valid, pl, np.nan)
+        Q_target = np.where(valid, Q_target, np.nan)
+
+        P = np.asarray(
+            self.evaluate('P', T_hs_ff.ravel(), T_cons_ff.ravel(), pl),
+            dtype=float
+            )
+
+        result = {
+            'pl': pl, 'Q': Q_target, 'P': P, 'COP': Q_target / P,
+            'feasible': feasible
+            }
+        for key, values in result.items():
+            if key != 'feasible':
+                values = values.astype(self.dtype, copy=False)
+            result[key] = values.reshape(shape)[()]
+
+        return result
+
+    def fill_gaps(self):
+        """
+        Return the characteristic with failed support points filled.
+
+        Support values that are NaN, e.g. of failed offdesign simulations,
+        would otherwise propagate into every interpolated value around them.
+        They are reconstructed by `harmonic_fill` from the valid support
+        values of the same quantity.
+
+        Returns
+        -------
+        PartloadCharacteristic
+            Characteristic with filled support values and the mask of the
+            reconstructed values in its `reconstructed` attribute.
+        """
+        support = {}
+        reconstructed = self.reconstructed.copy()
+        for quantity, array in self.support.items():
+            support[quantity], filled = harmonic_fill(array)
+            reconstructed |= filled
+
+        characteristic = PartloadCharacteristic(
+            *self.grid, support['Q'], support['P'], support['epsilon'],
+            dtype=self.dtype
+            )
+        characteristic.reconstructed = reconstructed
+        return characteristic
+
+    def scale(self, factor):
+        """
+        Return the characteristic of a heat pump scaled in size.
+
+        With unchanged intensive parameters (temperatures, efficiencies,
+        pressure ratios), heat output and power input of the heat pump models
+        are proportional to their nominal heat output, so the characteristic
+        of another size follows without any further simulation.
+
+        Parameters
+        ----------
+        factor : float
+            Ratio of the nominal heat outputs of the scaled and this heat
+            pump.
+
+        Returns
+        -------
+        PartloadCharacteristic
+            Characteristic with scaled heat output and power input.
+        """
+        characteristic = PartloadCharacteristic(
+            *self.grid, self.support['Q'] * factor,
+            self.support['P'] * factor, self.support['epsilon'],
+            dtype=self.dtype
+            )
+        characteristic.reconstructed = self.reconstructed.copy()
+        return characteristic
+
+    def to_lookup(self):
+        """Return a compiled trilinear lookup of the characteristic."""
+        return PartloadLookup(self)
+
+    def to_trajectory_evaluator(self, clamp=True):
+        """Return a batched evaluator of partload trajectories."""
+        return TrajectoryEvaluator(self, clamp=clamp)
+
+    def to_spline(self, degree=3):
+        """
+        Return a smooth spline representation of the characteristic.
+
+        Parameters
+        ----------
+        degree : int
+            Degree of the tensor-product splines. Default is 3 (cubic).
+
+        Returns
+        -------
+        SplineCharacteristic
+            Characteristic with the same support points and dtype.
+        """
+        return SplineCharacteristic(
+            *self.grid, self.support['Q'], self.support['P'],
+            self.support['epsilon'], degree=degree, dtype=self.dtype
+            )
+
+    def fullranges(self, resolution=None):
+        """
+        Return the evaluation ranges of all dimensions at a resolution.
+
+        Parameters
+        ----------
+        resolution : dict
+            Step size per dimension with the keys 'T_hs_ff', 'T_cons_ff' and
+            'pl'. Missing keys default to `default_resolution`, which is 1 K
+            for the temperatures and 0.01 for the partload ratio. The last
+            point of every range is the end of the support range, even if
+            the step does not divide the range.
+        """
+        steps = self.default_resolution.copy()
+        if resolution:
+            unknown = set(resolution) - set(self.dims)
+            if unknown:
+                raise KeyError(
+                    f'Unknown dimensions {sorted(unknown)} in resolution. '
+                    + f'Valid dimensions are: {self.dims}'
+                    )
+            steps.update(resolution)
+
+        fullranges = []
+        for dim, support_range in zip(self.dims, self.grid):
+            start, end = support_range[0], support_range[-1]
+            n_steps = int(np.floor((end - start) / steps[dim] + 1e-9))
+            fullrange = start + steps[dim] * np.arange(n_steps + 1)
+            if end - fullrange[-1] > 1e-9 * steps[dim]:
+                fullrange = np.append(fullrange, end)
+            fullranges += [fullrange]
+        return fullranges
+
+    def _evaluate_grid(self, fullranges):
+        """Evaluate 'Q', 'P' and 'epsilon' on the product of the ranges."""
+        mesh = np.meshgrid(
+            *[np.round(fullrange, 3) for fullrange in fullranges],
+            indexing='ij'
+            )
+        return {
+            quantity: self.evaluate(quantity, *mesh)
+            for quantity in ['Q', 'P', 'epsilon']
+            }
+
+    def resample(self, resolution=None, dtype=None):
+        """
+        Return the characteristic evaluated on a regular grid.
+
+        Parameters
+        ----------
+        resolution : dict
+            Step size per dimension (see `fullranges`). Defaults to 1 K steps
+            of the temperatures and 0.01 steps of the partload ratio.
+
+        dtype : str or np.dtype
+            Floating point type of the new characteristic. Defaults to the
+            dtype of this characteristic.
+
+        Returns
+        -------
+        PartloadCharacteristic
+            Characteristic with the grid points as support points.
+        """
+        fullranges = [
+            np.round(fullrange, 3) for fullrange in self.fullranges(resolution)
+            ]
+        values = self._evaluate_grid(fullranges)
+        return PartloadCharacteristic(
+            *fullranges, values['Q'], values['P'], values['epsilon'],
+            dtype=self.dtype if dtype is None else dtype
+            )
+
+    def to_frame(self, resolution=None, dtype=None):
+        """
+        Evaluate the characteristic on a regular grid as a DataFrame.
+
+        Parameters
+        ----------
+        resolution : dict
+            Step size per dimension (see `fullranges`). Defaults to 1 K steps
+            of the temperatures and 0.01 steps of the partload ratio.
+
+        dtype : str or np.dtype
+            Floating point type of the columns. Defaults to the dtype of the
+            characteristic.
+
+        Returns
+        -------
+        pd.DataFrame
+            Columns 'Q', 'P', 'COP' and 'epsilon' with a MultiIndex of the
+            three variables 'T_hs_ff', 'T_cons_ff' and 'pl'.
+        """
+        dtype = self.dtype if dtype is None else np.dtype(dtype)
+        fullranges = self.fullranges(resolution)
+        multiindex = pd.MultiIndex.from_product(fullranges, names=self.dims)
+
+        values = self._evaluate_grid(fullranges)
+        Q = values['Q'].ravel().astype(dtype, copy=False)
+        P = values['P'].ravel().astype(dtype, copy=False)
+        epsilon = values['epsilon'].ravel().astype(dtype, copy=False)
+
+        return pd.DataFrame(
+            {'Q': Q, 'P': P, 'COP': Q / P, 'epsilon': epsilon},
+            index=multiindex
+            )
+
+
+class PartloadLookup:
+    """
+    Fast trilinear lookup of a partload characteristic.
+
+    The lookup kernels work directly on the support arrays of the
+    characteristic without any input validation or allocation per call and
+    yield the same values as `PartloadCharacteristic.evaluate`. They are
+    compiled with numba if it is installed, reaching sub-microsecond scalar
+    lookups. Otherwise, scalar lookups fall back to plain Python and batched
+    lookups to vectorised NumPy.
+
+    Parameters
+    ----------
+    partload_char : PartloadCharacteristic
+        Characteristic to look up.
+
+    Attributes
+    ----------
+    jit : bool
+        Flag indicating if the kernels are compiled with numba.
+
+    Note
+    ----
+    The scalar kernel of a quantity is compiled on its first lookup, which
+    takes about a second with numba. For the lowest overhead in tight loops,
+    call the function returned by `kernel` directly.
+    """
+
+    jit = njit is not None
+
+    def __init__(self, partload_char):
+        """Store contiguous copies of the support grids and values."""
+        self.grid = tuple(
+            np.ascontiguousarray(support_range, dtype=np.float64)
+            for support_range in partload_char.grid
+            )
+        self.values = {
+            quantity: np.ascontiguousarray(array, dtype=np.float64)
+            for quantity, array in partload_char.support.items()
+            }
+        self._kernels = {}
+        # scratch buffer of the power input of batched COP lookups
+        self._scratch = np.empty(0)
+
+    def kernel(self, quantity):
+        """
+        Return the scalar lookup function of a quantity.
+
+        Parameters
+        ----------
+        quantity : str
+            Quantity to look up. One of 'Q', 'P', 'COP' or 'epsilon'.
+
+        Returns
+        -------
+        callable
+            Function of 'T_hs_ff', 'T_cons_ff' and 'pl' returning the value of
+            the quantity.
+        """
+        if quantity not in self._kernels:
+            if quantity == 'COP':
+                self._kernels[quantity] = _scalar_kernel(
+                    *self.grid, self.values['Q'], self.values['P']
+                    )
+            else:
+                self._kernels[quantity] = _scalar_kernel(
+                    *self.grid, self.values[quantity]
+                    )
+        return self._kernels[quantity]
+
+    def __call__(self, quantity, T_hs_ff, T_cons_ff, pl):
+        """
+        Look up a quantity at a single operating point.
+
+        Parameters
+        ----------
+        quantity : str
+            Quantity to look up. One of 'Q', 'P', 'COP' or 'epsilon'.
+
+        T_hs_ff : float
+            Feed flow temperature of the heat source.
+
+        T_cons_ff : float
+            Feed flow temperature of the heat sink.
+
+        pl : float
+            Partload ratio.
+        """
+        return self.kernel(quantity)(T_hs_ff, T_cons_ff, pl)
+
+    def batch(self, quantity, T_hs_ff, T_cons_ff, pl, out=None):
+        """
+        Look up a quantity at many operating points.
+
+        Parameters
+        ----------
+        quantity : str
+            Quantity to look up. One of 'Q', 'P', 'COP' or 'epsilon'.
+
+        T_hs_ff, T_cons_ff, pl : 1d array of float64
+            Operating points of the same length.
+
+        out : 1d array of float64
+            Array the results are written to. Passing it avoids allocating a
+            new array in every call.
+
+        Returns
+        -------
+        np.ndarray
+            The array `out` containing the looked up values.
+        """
+        if out is None:
+            out = np.empty(len(T_hs_ff))
+        if quantity == 'COP':
+            if len(self._scratch) < len(out):
+                self._scratch = np.empty(len(out))
+            _trilinear_batch(
+                *self.grid, self.values['Q'], T_hs_ff, T_cons_ff, pl, out
+                )
+            out /= _trilinear_batch(
+                *self.grid, self.values['P'], T_hs_ff, T_cons_ff, pl,
+                self._scratch[:len(out)]
+                )
+            return out
+        return _trilinear_batch(
+            *self.grid, self.values[quantity], T_hs_ff, T_cons_ff, pl, out
+            )
+
+
+class TrajectoryEvaluator:
+    """
+    Batched evaluation of partload trajectories, e.g. for predictive control.
+
+    A temperature forecast is interpolated once into curves of heat output
+    and power input over the support partload ratios (`set_forecast`).
+    Every call then only interpolates along the partload ratio, so arrays of
+    candidate trajectories with the shape (candidates, horizon) are evaluated
+    in a single vectorised call within about a millisecond.
+
+    Parameters
+    ----------
+    partload_char : PartloadCharacteristic
+        Characteristic to evaluate.
+
+    clamp : bool
+        Flag to set if temperatures and partload ratios are clamped to the
+        ranges of the characteristic. Otherwise, values out of range are NaN.
+        Default is `True`.
+
+    Note
+    ----
+    Partload ratios of 0 denote the heat pump being off with neither heat
+    output nor power input.
+    """
+
+    def __init__(self, partload_char, clamp=True):
+        """Store the stacked support values of heat output and power input."""
+        self.T_hs_ff_range, self.T_cons_ff_range, self.pl_range = (
+            np.asarray(support_range, dtype=np.float64)
+            for support_range in partload_char.grid
+            )
+        self.values = np.stack(
+            [partload_char.support['Q'], partload_char.support['P']], axis=-1
+            ).astype(np.float64)
+        self.clamp = clamp
+        self._curves = None
+
+    def set_forecast(self, T_hs_ff, T_cons_ff):
+        """
+        Interpolate the characteristic at a temperature forecast.
+
+        Parameters
+        ----------
+        T_hs_ff, T_cons_ff : array
+            Forecast of the feed flow temperatures of heat source and sink,
+            e.g. with the shape (horizon,) shared by all candidates or
+            (candidates, horizon).
+        """
+        T_hs_ff, T_cons_ff = np.broadcast_arrays(
+            np.asarray(T_hs_ff, dtype=np.float64),
+            np.asarray(T_cons_ff, dtype=np.float64)
+            )
+        i0, j0, t0, in0 = _axis_weights(
+            self.T_hs_ff_range, T_hs_ff, self.clamp
+            )
+        i1, j1, t1, in1 = _axis_weights(
+            self.T_cons_ff_range, T_cons_ff, self.clamp
+            )
+        t0 = t0[..., np.newaxis, np.newaxis]
+        t1 = t1[..., np.newaxis, np.newaxis]
+        curves = (
+            (self.values[i0, i1] * (1 - t1) + self.values[i0, j1] * t1)
+            * (1 - t0)
+            + (self.values[j0, i1] * (1 - t1) + self.values[j0, j1] * t1)
+            * t0
+            )
+        curves[~(in0 & in1)] = np.nan
+        self._curves = curves
+
+    def __call__(self, pl, T_hs_ff=None, T_cons_ff=None):
+        """
+        Evaluate partload trajectories.
+
+        Parameters
+        ----------
+        pl : array
+            Partload ratios of the trajectories, e.g. with the shape
+            (candidates, horizon). It has to be broadcastable with the shape
+            of the forecast.
+
+        T_hs_ff, T_cons_ff : array
+            Forecast of the feed flow temperatures. If set, `set_forecast` is
+            called first. Otherwise, the previous forecast is used.
+
+        Returns
+        -------
+        dict
+            Arrays of heat output 'Q', power input 'P' and 'COP' with the
+            broadcast shape of `pl` and the forecast.
+        """
+        if T_hs_ff is not None or T_cons_ff is not None:
+            self.set_forecast(T_hs_ff, T_cons_ff)
+        if self._curves is None:
+            raise AttributeError(
+                'No temperature forecast set. Please pass the forecast or '
+                + 'call set_forecast first.'
+                )
+        pl = np.asarray(pl, dtype=np.float64)
+        shape = np.broadcast_shapes(pl.shape, self._curves.shape[:-2])
+        pl = np.broadcast_to(pl, shape)
+
+        lower, upper, t, inside = _axis_weights(self.pl_range, pl, self.clamp)
+        # flat positions of the forecast time steps in the curves
+        n_pl = len(self.pl_range)
+        forecast_shape = self._curves.shape[:-2]
+        offset = np.broadcast_to(
+            np.arange(
+                0, int(np.prod(forecast_shape)) * n_pl, n_pl
+                ).reshape(forecast_shape),
+            shape
+            )
+        result = {}
+        for q, quantity in enumerate(['Q', 'P']):
+            curves = self._curves[..., q].ravel()
+            lower_values = curves.take(offset + lower)
+            values = lower_values + (
+                curves.take(offset + upper) - lower_values
+                ) * t
+            values[~inside] = np.nan
+            values[pl == 0] = 0.0
+            result[quantity] = values
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            result['COP'] = np.where(
+                pl == 0, np.nan, result['Q'] / result['P']
+                )
+        return result
+
+
+class SplineCharacteristic(PartloadCharacteristic):
+    """
+    Partload characteristic interpolated by smooth tensor-product splines.
+
+    The splines are fitted once through the support points of every quantity
+    and are continuously differentiable (for degrees of at least 2), which
+    suits gradient-based optimisers. `evaluate_gradient` returns values and
+    analytical partial derivatives in one call. Points outside of the support
+    ranges evaluate to NaN. The parameters are the same as of
+    `PartloadCharacteristic` with the addition of:
+
+    Parameters
+    ----------
+    degree : int
+        Degree of the splines. It is reduced along every dimension with fewer
+        than `degree + 1` support points. Default is 3 (cubic).
+    """
+
+    def __init__(self, T_hs_ff_range, T_cons_ff_range, pl_range, Q_array,
+                 P_array, epsilon_array, degree=3, dtype='float64'):
+        """Store support points and determine the spline degrees."""
+        super().__init__(
+            T_hs_ff_range, T_cons_ff_range, pl_range, Q_array, P_array,
+            epsilon_array, dtype=dtype
+            )
+        for quantity, array in self.support.items():
+            if np.isnan(array).any():
+                raise ValueError(
+                    f'The {quantity} array contains NaN values, which can not '
+                    + 'be fitted by splines. Please fill or exclude the '
+                    + 'failed offdesign points first.'
+                    )
+        self.degrees = tuple(
+            min(int(degree), len(support_range) - 1)
+            for support_range in self.grid
+            )
+
+    def _interpolator(self, quantity):
+        """Return (and cache) the tensor-product spline of a quantity."""
+        if quantity not in self._interpolators:
+            coefficients = self.support[quantity].astype(float)
+            knots = []
+            for axis, (support_range, degree) in enumerate(
+                    zip(self.grid, self.degrees)):
+                spline = make_interp_spline(
+                    support_range, np.moveaxis(coefficients, axis, 0),
+                    k=degree
+                    )
+                knots += [spline.t]
+                coefficients = np.moveaxis(spline.c, 0, axis)
+            self._interpolators[quantity] = NdBSpline(
+                tuple(knots), coefficients, self.degrees, extrapolate=False
+                )
+        return self._interpolators[quantity]
+
+    def evaluate_gradient(self, quantity, T_hs_ff, T_cons_ff, pl):
+        """
+        Evaluate a quantity and its partial derivatives.
+
+        Parameters
+        ----------
+        quantity : str
+            Quantity to evaluate. One of 'Q', 'P', 'COP' or 'epsilon'.
+
+        T_hs_ff : float or array
+            Feed flow temperature of the heat source.
+
+        T_cons_ff : float or array
+            Feed flow temperature of the heat sink.
+
+        pl : float or array
+            Partload ratio.
+
+        Returns
+        -------
+        tuple of np.ndarray
+            Values in the broadcast shape of the inputs and the gradients with
+            an additional last axis of the derivatives with respect to
+            'T_hs_ff', 'T_cons_ff' and 'pl'.
+        """
+        if quantity not in self.quantities:
+            raise KeyError(
+                f'Quantity {quantity} is not part of the partload '
+                + f'characteristic. Choose one of {self.quantities}.'
+                )
+        if quantity == 'COP':
+            Q, dQ = self.evaluate_gradient('Q', T_hs_ff, T_cons_ff, pl)
+            P, dP = self.evaluate_gradient('P', T_hs_ff, T_cons_ff, pl)
+            COP = Q / P
+            return COP, (dQ - COP[..., np.newaxis] * dP) / P[..., np.newaxis]
+
+        T_hs_ff, T_cons_ff, pl = np.broadcast_arrays(
+            np.asarray(T_hs_ff, dtype=float),
+            np.asarray(T_cons_ff, dtype=float),
+            np.asarray(pl, dtype=float)
+            )
+        points = np.stack([T_hs_ff, T_cons_ff, pl], axis=-1).reshape(-1, 3)
+        spline = self._interpolator(quantity)
+
+        values = spline(points)
+        gradient = np.stack(
+            [spline(points, nu=nu) for nu in np.eye(3, dtype=int)], axis=-1
+            )
+
+        return (
+            values.reshape(T_hs_ff.shape).astype(self.dtype, copy=False),
+            gradient.reshape(T_hs_ff.shape + (3,)).astype(
+                self.dtype, copy=False
+                )
+            )
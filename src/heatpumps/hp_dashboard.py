@@ -677,7 +677,6 @@ if mode == 'Start':
             - [NumPy](https://numpy.org) (Datenverarbeitung)
             - [pandas](https://pandas.pydata.org) (Datenverarbeitung)
             - [SciPy](https://scipy.org/) (Interpolation)
-            - [scikit-learn](https://scikit-learn.org) (Regression)
             - [Matplotlib](https://matplotlib.org) (Datenvisualisierung)
             - [FluProDia](https://fluprodia.readthedocs.io)
             (Datenvisualisierung)
@@ -11,17 +11,38 @@ import platformdirs
 import plotly.graph_objects as go
 from CoolProp.CoolProp import PropsSI as PSI
 from fluprodia import FluidPropertyDiagram
-from scipy.interpolate import interpn
-from sklearn.linear_model import LinearRegression
 from tespy.networks import Network
 from tespy.tools import ExergyAnalysis
 from tespy.tools.characteristics import CharLine
 from tespy.tools.characteristics import load_default_char as ldc
 
+from heatpumps.characteristic import PartloadCharacteristic
+from heatpumps.characteristic import _axis_weights
+from heatpumps.characteristic import fit_piecewise_linear
+from heatpumps.performance import annual_performance
+from heatpumps.performance import simulate_dispatch
+from heatpumps.storage import iter_table
+from heatpumps.storage import model_metadata
+from heatpumps.storage import write_table
+
 
 class HeatPumpBase:
     """Super class of all concrete heat pump models."""
 
+    # Thermodynamic plausibility checks of offdesign states as
+    # (component type, parameter, comparison with zero indicating a problem)
+    plausibility_checks = {
+        'neg_m_dot': ('Connection', 'm', np.less),
+        'heatex_pos_Q_dot': ('HeatExchanger', 'Q', np.greater),
+        'heatex_neg_ttd_u': ('HeatExchanger', 'ttd_u', np.less_equal),
+        'heatex_neg_ttd_l': ('HeatExchanger', 'ttd_l', np.less_equal),
+        'cond_pos_Q_dot': ('Condenser', 'Q', np.greater),
+        'cond_neg_ttd_u': ('Condenser', 'ttd_u', np.less_equal),
+        'cond_neg_ttd_l': ('Condenser', 'ttd_l', np.less_equal),
+        'comp_neg_P': ('Compressor', 'P', np.less),
+        'comp_neg_pr': ('Compressor', 'pr', np.less_equal)
+        }
+
     def __init__(self, params):
         """Initialize model and set necessary attributes."""
         self.params = params
@@ -43,6 +64,7 @@ class HeatPumpBase:
         self.eta_carnot = np.nan
         self.epsilon = np.nan
         self.solved_design = False
+        self.design_quantities = None
 
         self._init_vals = {
             'm_dot_rel_econ_closed': 0.9,
@@ -65,9 +87,34 @@ class HeatPumpBase:
 
     def init_simulation(self, **kwargs):
         """Perform initial parametrization with starting values."""
+        self._parametrize_init()
+        # Perform initial simulation and unset starting values
+        self._solve_model(**kwargs)
+        self._postprocess_init()
 
     def design_simulation(self, **kwargs):
         """Perform final parametrization and design simulation."""
+        self._parametrize_design()
+        self._solve_model(**kwargs)
+        self._postprocess_design()
+
+    def _parametrize_init(self):
+        """Set parameters and starting values of the initial simulation."""
+
+    def _postprocess_init(self):
+        """Unset starting values after the initial simulation."""
+
+    def _parametrize_design(self):
+        """Set final parameters of the design simulation."""
+
+    def _postprocess_design(self):
+        """Store design mass flow and COP of the design simulation."""
+        self.m_design = self.conns['A0'].m.val
+
+        self.cop = (
+            abs(self.buses['heat output'].P.val)
+            / self.buses['power input'].P.val
+            )
 
     def _solve_model(self, **kwargs):
         """Solve the model in design mode."""
@@ -82,6 +129,7 @@ class HeatPumpBase:
             self.solved_design = True
             os.makedirs(os.path.dirname(self.design_path), exist_ok=True)
             self.nw.save(self.design_path)
+            self.design_quantities = self.get_design_quantities()
 
     def calc_efficiencies(self):
         """Calculate ideal and simulated cycle efficiencies."""
@@ -195,6 +243,81 @@ class HeatPumpBase:
                     results_offdesign.loc[(T_hs_ff, T_cons_ff), 'epsilon'].tolist()
                     )
 
+    def merge_offdesign_results(self, *results, include_current=True):
+        """
+        Merge offdesign results of separately computed sweeps.
+
+        All results are combined on the grid spanned by the union of their
+        'T_hs_ff', 'T_cons_ff' and 'pl' values. Points contained in several
+        results are resolved like in the offdesign simulation: solved points
+        are preferred over failed ones and among those the result with the
+        lowest residual is kept. Points not contained in any result are NaN.
+        The merged results, ranges and arrays are set as instance attributes,
+        so the partload characteristic can be rebuilt directly afterwards.
+
+        Parameters
+        ----------
+        results : pd.DataFrame
+            Offdesign results with the columns 'Q', 'P', 'COP', 'epsilon' and
+            'residual' and a MultiIndex of 'T_hs_ff', 'T_cons_ff' and 'pl'.
+
+        include_current : bool
+            Flag to set if the current `results_offdesign` attribute (if
+            existing) should be merged with the results as well, which allows
+            to extend the characteristic incrementally. Default is `True`.
+
+        Returns
+        -------
+        pd.DataFrame
+            Merged offdesign results.
+        """
+        results = list(results)
+        if include_current and 'results_offdesign' in self.__dict__:
+            results = [self.results_offdesign] + results
+        if not results:
+            raise ValueError('There are no offdesign results to merge.')
+
+        merged = pd.concat(
+            [result.astype(float) for result in results]
+            )
+        # rounding reconciles temperatures differing by float noise
+        merged.index = pd.MultiIndex.from_arrays(
+            [
+                merged.index.get_level_values(name).astype(float).round(3)
+                for name in merged.index.names
+                ],
+            names=merged.index.names
+            )
+        rank = pd.DataFrame(
+            {
+                'failed': merged['Q'].isnull().to_numpy(),
+                'residual': merged['residual'].fillna(np.inf).to_numpy()
+                },
+            index=merged.index
+            )
+        order = np.lexsort((rank['residual'], rank['failed']))
+        merged = merged.iloc[order]
+        merged = merged[~merged.index.duplicated(keep='first')]
+
+        self.T_hs_ff_range = np.unique(
+            merged.index.get_level_values('T_hs_ff')
+            )
+        self.T_cons_ff_range = np.unique(
+            merged.index.get_level_values('T_cons_ff')
+            )
+        self.pl_range = np.unique(merged.index.get_level_values('pl'))
+        multiindex = pd.MultiIndex.from_product(
+            [self.T_hs_ff_range, self.T_cons_ff_range, self.pl_range],
+            names=['T_hs_ff', 'T_cons_ff', 'pl']
+            )
+        merged = merged.reindex(multiindex)
+
+        self.results_offdesign = merged
+        self.__dict__.pop('plausible_array', None)
+        self.df_to_array(merged)
+
+        return merged
+
     def get_pressure_levels(self, T_evap, T_cond, wf=None):
         """Calculate evaporation, condensation and middle pressure in bar."""
         if not wf:
@@ -214,7 +337,7 @@ class HeatPumpBase:
         return p_evap, p_cond, p_mid
 
     def calc_cost(self, ref_year, current_year, k_evap=1500, k_cond=3500,
-                  k_trans=60, k_misc=50, residence_time=10):
+                  k_trans=60, k_misc=50, residence_time=10, scale=1):
         r"""
         Calculate CAPEX based on cost relevant components.
 
@@ -239,6 +362,12 @@ class HeatPumpBase:
 
         residence_time : int or float
             Time of residence in seconds of the refrigerant in flash tanks.
+
+        scale : int or float
+            Factor the design parameters of the components are scaled with
+            to estimate the cost of a heat pump with a nominal heat output
+            scaled by the same factor and unchanged intensive parameters.
+            Defaults to 1.
         """
         cepcipath = str(resources.files('heatpumps').joinpath(
             'models', 'input', 'CEPCI.json'
@@ -251,38 +380,82 @@ class HeatPumpBase:
             current_year = str(current_year)
         cepci_factor = cepci[current_year] / cepci[ref_year]
 
+        design_quantities = self.design_quantities
+        if design_quantities is None:
+            design_quantities = self.get_design_quantities()
+
         self.cost = {}
         self.design_params = {}
         compcost_total = 0
-        for complabel in self.nw.comps.index:
-            comp = self.nw.comps.loc[complabel, 'object']
-            comptype = self.nw.comps.loc[complabel, 'comp_type']
-
+        for complabel, (comptype, quantity) in design_quantities.items():
             if comptype == 'Compressor':
-                val = comp.inl[0].v.val_SI * 3600
+                val = quantity * 3600 * scale
                 self.cost[complabel] = self.eval_costfunc(
                     val, 279.8, 19850, 0.73
                     ) * cepci_factor
-                self.design_params[complabel] = val
 
             elif comptype == 'HeatExchanger':
                 if 'Evaporator' in complabel or 'Economizer' in complabel:
-                    val = comp.kA.val / k_evap
+                    val = quantity / k_evap
                 elif 'Transcritical' in complabel:
-                    val = comp.kA.val / k_trans
+                    val = quantity / k_trans
                 else:
-                    val = comp.kA.val / k_misc
+                    val = quantity / k_misc
+                val *= scale
                 self.cost[complabel] = self.eval_costfunc(
                     val, 42, 15526, 0.80
                     ) * cepci_factor
-                self.design_params[complabel] = val
 
             elif comptype == 'Condenser':
-                val = comp.kA.val / k_cond
+                val = quantity / k_cond * scale
                 self.cost[complabel] = self.eval_costfunc(
                     val, 42, 15526, 0.80
                     ) * cepci_factor
-                self.design_params[complabel] = val
+
+            else:
+                val = quantity * residence_time * scale
+                self.cost[complabel] = self.eval_costfunc(
+                    val, 0.089, 1444, 0.63
+                    ) * cepci_factor
+
+            self.design_params[complabel] = val
+            compcost_total += self.cost[complabel]
+
+        self.cost['Piping & Tanks'] = 0.1 * compcost_total
+        self.cost['Electrical Equipment'] = 0.1 * compcost_total
+        # "the contribution of [refrigerant] cost to the total one is less than 4%."
+        self.cost['Refrigerant'] = (1.2 * compcost_total) * (1/0.96 - 1)
+
+        self.cost_equipment = sum(c for c in self.cost.values())
+        self.cost_total = 6.32 * self.cost_equipment
+
+    def get_design_quantities(self):
+        """
+        Get the quantities of the components the cost are based on.
+
+        The quantities are taken from the current state of the network. After
+        a successful design simulation, they are stored in the
+        'design_quantities' attribute, which is used by `calc_cost`, so that
+        the cost are not affected by subsequent offdesign simulations.
+
+        Returns
+        -------
+        design_quantities : dict
+            Component type and quantity keyed by the component label: the
+            volumetric flow at the inlet of compressors and the total
+            volumetric flow through flash tanks in m³/s and the heat transfer
+            capacity kA of heat exchangers in W/K.
+        """
+        design_quantities = {}
+        for complabel in self.nw.comps.index:
+            comp = self.nw.comps.loc[complabel, 'object']
+            comptype = self.nw.comps.loc[complabel, 'comp_type']
+
+            if comptype == 'Compressor':
+                quantity = comp.inl[0].v.val_SI
+
+            elif comptype in ['HeatExchanger', 'Condenser']:
+                quantity = comp.kA.val
 
             elif comptype == 'DropletSeparator' or comptype == 'Drum':
                 conn_liquid = (
@@ -299,28 +472,17 @@ class HeatPumpBase:
                 p_flash = self.nw.get_conn(conn_vapor).p.val
                 dens_liquid = PSI('D', 'Q', 0, 'P', p_flash*1e5, fluid)
                 dens_vapor = PSI('D', 'Q', 1, 'P', p_flash*1e5, fluid)
-                V_flash = (
-                    (self.nw.get_conn(conn_liquid).m.val  / dens_liquid
-                     + self.nw.get_conn(conn_vapor).m.val / dens_vapor)
-                    * residence_time
+                quantity = (
+                    self.nw.get_conn(conn_liquid).m.val / dens_liquid
+                    + self.nw.get_conn(conn_vapor).m.val / dens_vapor
                     )
-                self.cost[complabel] = self.eval_costfunc(
-                    V_flash, 0.089, 1444, 0.63
-                    ) * cepci_factor
-                self.design_params[complabel] = V_flash
 
             else:
                 continue
 
-            compcost_total += self.cost[complabel]
-
-        self.cost['Piping & Tanks'] = 0.1 * compcost_total
-        self.cost['Electrical Equipment'] = 0.1 * compcost_total
-        # "the contribution of [refrigerant] cost to the total one is less than 4%."
-        self.cost['Refrigerant'] = (1.2 * compcost_total) * (1/0.96 - 1)
+            design_quantities[complabel] = (comptype, quantity)
 
-        self.cost_equipment = sum(c for c in self.cost.values())
-        self.cost_total = 6.32 * self.cost_equipment
+        return design_quantities
 
     def eval_costfunc(self, val, val_ref, cost_ref, alpha):
         r"""
@@ -685,18 +847,110 @@ class HeatPumpBase:
         if return_fig_ax:
             return fig, ax
 
-    def calc_partload_char(self, **kwargs):
+    def calc_partload_char(self, exclude_implausible=False, fill_failed=False,
+                           resolution=None, dtype='float64', **kwargs):
         """
         Interpolate data points of heat output, power input and epsilon.
 
-        Return functions to interpolate values heat output power input
-        and epsilon based on the partload and the feed flow
-        temperatures of the heat source and sink. If there is
-        no data given through keyword arguments, the instances
-        attributes will be searched for the necessary data.
+        Evaluate the partload characteristic returned by `get_partload_char`
+        on a regular grid spanning the offdesign ranges. The keyword
+        arguments are the same as of `get_partload_char`.
 
         Parameters
         ----------
+        exclude_implausible : bool
+            See `get_partload_char`. Default is `False`.
+
+        fill_failed : bool
+            See `get_partload_char`. Default is `False`.
+
+        resolution : dict
+            Step size per dimension with the keys 'T_hs_ff', 'T_cons_ff' and
+            'pl'. Defaults to 1 K steps of the temperatures and 0.01 steps of
+            the partload ratio.
+
+        dtype : str or np.dtype
+            Floating point type of the columns, e.g. 'float32' or 'float64'.
+            Default is 'float64'.
+
+        Returns
+        -------
+        pd.DataFrame
+            Columns 'Q', 'P', 'COP' and 'epsilon' with a MultiIndex of the
+            three variables 'T_hs_ff', 'T_cons_ff' and 'pl'.
+        """
+        partload_char = self.get_partload_char(
+            exclude_implausible=exclude_implausible, fill_failed=fill_failed,
+            dtype=dtype, **kwargs
+            )
+        return partload_char.to_frame(resolution=resolution)
+
+    def get_partload_lookup(self, **kwargs):
+        """
+        Return a fast trilinear lookup of the partload characteristic.
+
+        The lookup is compiled with numba if it is installed. The keyword
+        arguments are the same as of `get_partload_char`.
+
+        Returns
+        -------
+        PartloadLookup
+            Lookup for scalar (`__call__`) and batched (`batch`) queries.
+        """
+        return self.get_partload_char(**kwargs).to_lookup()
+
+    def get_trajectory_evaluator(self, clamp=True, **kwargs):
+        """
+        Return a batched evaluator of partload trajectories.
+
+        The keyword arguments are the same as of `get_partload_char`.
+
+        Parameters
+        ----------
+        clamp : bool
+            See `TrajectoryEvaluator`. Default is `True`.
+
+        Returns
+        -------
+        TrajectoryEvaluator
+            Evaluator of arrays of candidate partload trajectories at a
+            temperature forecast.
+        """
+        return self.get_partload_char(**kwargs).to_trajectory_evaluator(
+            clamp=clamp
+            )
+
+    def get_partload_char(self, exclude_implausible=False, fill_failed=False,
+                          dtype='float64', **kwargs):
+        """
+        Return the partload characteristic of the offdesign simulation.
+
+        The returned characteristic keeps the data points of heat output,
+        power input and epsilon and interpolates them based on the partload
+        and the feed flow temperatures of the heat source and sink when
+        evaluated. If there is no data given through keyword arguments, the
+        instances attributes will be searched for the necessary data.
+
+        Parameters
+        ----------
+        exclude_implausible : bool
+            Flag to set if offdesign points flagged by the
+            `validate_offdesign_results` method should be excluded from the
+            interpolation. The mask is taken from the 'plausible_array'
+            keyword argument or the instance attribute of the same name.
+            Default is `False`.
+
+        fill_failed : bool
+            Flag to set if failed (and excluded) offdesign points should be
+            reconstructed from the valid points by harmonic interpolation
+            instead of leaving holes in the characteristic. The reconstructed
+            points are flagged in the `reconstructed` attribute of the
+            characteristic. Default is `False`.
+
+        dtype : str or np.dtype
+            Floating point type of the stored support values and evaluated
+            values. Default is 'float64'.
+
         kwargs : dict
             Necessary data is:
                 Q_array : 3d array
@@ -705,12 +959,19 @@ class HeatPumpBase:
                 pl_range : 1d array
                 T_hs_ff_range : 1d array
                 T_cons_ff_range : 1d array
+            Optional data is:
+                plausible_array : 3d array of bool
+
+        Returns
+        -------
+        PartloadCharacteristic
+            Characteristic evaluating 'Q', 'P', 'COP' and 'epsilon' on demand.
         """
         necessary_params = [
             'Q_array', 'P_array', 'epsilon_array', 'pl_range', 'T_hs_ff_range',
             'T_cons_ff_range'
             ]
-        if len(kwargs):
+        if set(kwargs) - {'plausible_array'}:
             for nec_param in necessary_params:
                 if nec_param not in kwargs:
                     raise KeyError(
@@ -743,60 +1004,24 @@ class HeatPumpBase:
             T_hs_ff_range = self.T_hs_ff_range
             T_cons_ff_range = self.T_cons_ff_range
 
-        pl_step = 0.01
-        T_hs_ff_step = 1
-        T_cons_ff_step = 1
-
-        pl_fullrange = np.arange(
-            pl_range[0],
-            pl_range[-1]+pl_step,
-            pl_step
-            )
-        T_hs_ff_fullrange = np.arange(
-            T_hs_ff_range[0], T_hs_ff_range[-1]+T_hs_ff_step, T_hs_ff_step
-            )
-        T_cons_ff_fullrange = np.arange(
-            T_cons_ff_range[0], T_cons_ff_range[-1]+T_cons_ff_step,
-            T_cons_ff_step
-            )
-
-        multiindex = pd.MultiIndex.from_product(
-                        [T_hs_ff_fullrange, T_cons_ff_fullrange, pl_fullrange],
-                        names=['T_hs_ff', 'T_cons_ff', 'pl']
-                        )
-
-        partload_char = pd.DataFrame(
-            index=multiindex, columns=['Q', 'P', 'COP', 'epsilon']
+        if exclude_implausible:
+            if 'plausible_array' in kwargs:
+                plausible_array = np.asarray(kwargs['plausible_array'])
+            elif 'plausible_array' in self.__dict__:
+                plausible_array = self.plausible_array
+            else:
+                self.validate_offdesign_results()
+                plausible_array = self.plausible_array
+            Q_array = np.where(plausible_array, Q_array, np.nan)
+            P_array = np.where(plausible_array, P_array, np.nan)
+            epsilon_array = np.where(plausible_array, epsilon_array, np.nan)
+
+        partload_char = PartloadCharacteristic(
+            T_hs_ff_range, T_cons_ff_range, pl_range, Q_array, P_array,
+            epsilon_array, dtype=dtype
             )
-
-        for T_hs_ff in T_hs_ff_fullrange:
-            for T_cons_ff in T_cons_ff_fullrange:
-                for pl in pl_fullrange:
-                    partload_char.loc[(T_hs_ff, T_cons_ff, pl), 'Q'] = abs(
-                        interpn(
-                            (T_hs_ff_range, T_cons_ff_range, pl_range),
-                            Q_array,
-                            (round(T_hs_ff, 3), round(T_cons_ff, 3),
-                             round(pl, 3)),
-                            bounds_error=False
-                            )[0]
-                        )
-                    partload_char.loc[(T_hs_ff, T_cons_ff, pl), 'P'] = interpn(
-                        (T_hs_ff_range, T_cons_ff_range, pl_range),
-                        P_array,
-                        (round(T_hs_ff, 3), round(T_cons_ff, 3), round(pl, 3)),
-                        bounds_error=False
-                        )[0]
-                    partload_char.loc[(T_hs_ff, T_cons_ff, pl), 'COP'] = (
-                        partload_char.loc[(T_hs_ff, T_cons_ff, pl), 'Q']
-                        / partload_char.loc[(T_hs_ff, T_cons_ff, pl), 'P']
-                        )
-                    partload_char.loc[(T_hs_ff, T_cons_ff, pl), 'epsilon'] = interpn(
-                        (T_hs_ff_range, T_cons_ff_range, pl_range),
-                        epsilon_array,
-                        (round(T_hs_ff, 3), round(T_cons_ff, 3), round(pl, 3)),
-                        bounds_error=False
-                        )[0]
+        if fill_failed:
+            partload_char = partload_char.fill_gaps()
 
         return partload_char
 
@@ -808,10 +1033,11 @@ class HeatPumpBase:
 
         Parameters
         ----------
-        partload_char : pd.DataFrame
+        partload_char : pd.DataFrame or PartloadCharacteristic
             DataFrame of the full partload characteristic containing 'Q', 'P'
             and 'COP' with a MultiIndex of the three variables 'T_hs_ff',
-            'T_cons_ff' and 'pl'.
+            'T_cons_ff' and 'pl'. A PartloadCharacteristic is evaluated at
+            its default resolution.
 
         variable : str
             The variable 'x' in the equation 'y = m * x + b'. Either 'P' or 'Q'.
@@ -836,25 +1062,15 @@ class HeatPumpBase:
             operating point.
             Defaults to None and therefore no normalization if it is not set.
         """
+        if isinstance(partload_char, PartloadCharacteristic):
+            partload_char = partload_char.to_frame()
+
         cols = [f'{variable}_max', f'{variable}_min']
         if line_type == 'origin':
             cols += ['COP']
         elif line_type == 'offset':
             cols += ['c_1', 'c_0']
 
-        T_hs_ff_range = set(
-            partload_char.index.get_level_values('T_hs_ff')
-            )
-        T_cons_ff_range = set(
-            partload_char.index.get_level_values('T_cons_ff')
-            )
-
-        multiindex = pd.MultiIndex.from_product(
-            [T_hs_ff_range, T_cons_ff_range],
-            names=['T_hs_ff', 'T_cons_ff']
-            )
-        linear_model = pd.DataFrame(index=multiindex, columns=cols)
-
         if variable == 'P':
             resp_variable = 'Q'
         elif variable == 'Q':
@@ -865,46 +1081,51 @@ class HeatPumpBase:
                 + "Choose either 'P' or 'Q'."
                 )
 
-        for T_hs_ff in T_hs_ff_range:
-            for T_cons_ff in T_cons_ff_range:
-                idx = (T_hs_ff, T_cons_ff)
-                linear_model.loc[idx, f'{variable}_max'] = (
-                    partload_char.loc[idx, variable].max()
+        levels = ['T_hs_ff', 'T_cons_ff']
+        data = partload_char[['Q', 'P']].astype(float)
+        groups = data.groupby(level=levels)
+        maxima = groups.max()
+        minima = groups.min()
+
+        linear_model = pd.DataFrame(index=maxima.index)
+        linear_model[f'{variable}_max'] = maxima[variable]
+        linear_model[f'{variable}_min'] = minima[variable]
+
+        if regression_type == 'MinMax':
+            if line_type == 'origin':
+                linear_model['COP'] = maxima['Q'] / maxima['P']
+            elif line_type == 'offset':
+                linear_model['c_1'] = (
+                    (maxima['Q'] - minima['Q']) / (maxima['P'] - minima['P'])
                     )
-                linear_model.loc[idx, f'{variable}_min'] = (
-                    partload_char.loc[idx, variable].min()
+                linear_model['c_0'] = (
+                    maxima['Q'] - maxima['P'] * linear_model['c_1']
+                    )
+        elif regression_type == 'OLS':
+            valid = data[variable].notna() & data[resp_variable].notna()
+            x = data[variable].where(valid)
+            y = data[resp_variable].where(valid)
+            if line_type == 'origin':
+                sums = pd.DataFrame({'xy': x * y, 'xx': x * x}).groupby(
+                    level=levels
+                    ).sum()
+                linear_model['COP'] = sums['xy'] / sums['xx']
+            elif line_type == 'offset':
+                x_mean = x.groupby(level=levels).transform('mean')
+                y_mean = y.groupby(level=levels).transform('mean')
+                dx = x - x_mean
+                sums = pd.DataFrame(
+                    {'xy': dx * (y - y_mean), 'xx': dx * dx}
+                    ).groupby(level=levels).sum()
+                means = pd.DataFrame({'x': x, 'y': y}).groupby(
+                    level=levels
+                    ).mean()
+                linear_model['c_1'] = sums['xy'] / sums['xx']
+                linear_model['c_0'] = (
+                    means['y'] - linear_model['c_1'] * means['x']
                     )
-                if regression_type == 'MinMax':
-                    if line_type == 'origin':
-                        linear_model.loc[idx, 'COP'] = (
-                            partload_char.loc[idx, 'Q'].max()
-                            / partload_char.loc[idx, 'P'].max()
-                            )
-                    elif line_type == 'offset':
-                        linear_model.loc[idx, 'c_1'] = (
-                            (partload_char.loc[idx, 'Q'].max()
-                             - partload_char.loc[idx, 'Q'].min())
-                            / (partload_char.loc[idx, 'P'].max()
-                               - partload_char.loc[idx, 'P'].min())
-                            )
-                        linear_model.loc[idx, 'c_0'] = (
-                            partload_char.loc[idx, 'Q'].max()
-                            - partload_char.loc[idx, 'P'].max()
-                            * linear_model.loc[idx, 'c_1']
-                            )
-                elif regression_type == 'OLS':
-                    regressor = partload_char.loc[idx, variable].to_numpy()
-                    regressor = regressor.reshape(-1, 1)
-                    response = partload_char.loc[idx, resp_variable].to_numpy()
-                    if line_type == 'origin':
-                        LinReg = LinearRegression(fit_intercept=False).fit(
-                            regressor, response
-                            )
-                        linear_model.loc[idx, 'COP'] = LinReg.coef_[0]
-                    elif line_type == 'offset':
-                        LinReg = LinearRegression().fit(regressor, response)
-                        linear_model.loc[idx, 'c_1'] = LinReg.coef_[0]
-                        linear_model.loc[idx, 'c_0'] = LinReg.intercept_
+
+        linear_model = linear_model.reindex(columns=cols)
 
         if normalize:
             variable_nom = partload_char.loc[
@@ -921,46 +1142,369 @@ class HeatPumpBase:
 
         return linear_model
 
-    def arrange_char_timeseries(self, linear_model, temp_ts):
+    def piecewise_linearize_partload_char(self, partload_char, n_segments=3,
+                                          variable='Q', convex=False,
+                                          normalize=None):
+        """
+        Approximate partload characteristic by piecewise linear functions.
+
+        For every pair of 'T_hs_ff' and 'T_cons_ff', the continuous piecewise
+        linear function with the least squared deviation from the
+        characteristic is fitted. All pairs are fitted at once.
+
+        Parameters
+        ----------
+        partload_char : pd.DataFrame or PartloadCharacteristic
+            DataFrame of the full partload characteristic containing 'Q' and
+            'P' with a MultiIndex of the three variables 'T_hs_ff',
+            'T_cons_ff' and 'pl'. A PartloadCharacteristic is evaluated at
+            its default resolution.
+
+        n_segments : int
+            Number of linear segments, e.g. 2 to 5. Defaults to 3.
+
+        variable : str
+            The variable 'x' of the function 'y = f(x)'. Either 'Q' or 'P'.
+            Defaults to 'Q' (power input as function of heat output).
+
+        convex : bool
+            Flag to set if the functions have to be convex (non-decreasing
+            slopes), which allows formulations without binary variables.
+            Otherwise, the breakpoints are suited for SOS2 formulations.
+            Defaults to `False`.
+
+        normalize : dict
+            Dictionairy containing the keys 'T_hs_ff' and 'T_cons_ff'. These
+            values are interpreted as the nominal operating temperatures. All
+            breakpoints and intercepts are normalized to the maximum of the
+            chosen variable at this operating point.
+            Defaults to None and therefore no normalization if it is not set.
+
+        Returns
+        -------
+        pd.DataFrame
+            Breakpoints '{variable}_k' and '{response}_k' (k = 0 to
+            n_segments) as well as slopes 'c_1_k' and intercepts 'c_0_k'
+            (k = 0 to n_segments - 1) of the segments with a MultiIndex of
+            'T_hs_ff' and 'T_cons_ff'.
+        """
+        if isinstance(partload_char, PartloadCharacteristic):
+            partload_char = partload_char.to_frame()
+
+        if variable == 'P':
+            resp_variable = 'Q'
+        elif variable == 'Q':
+            resp_variable = 'P'
+        else:
+            raise ValueError(
+                f"Argument {variable} for parameter 'variable' is not valid."
+                + "Choose either 'P' or 'Q'."
+                )
+
+        x = partload_char[variable].astype(float).unstack('pl')
+        y = partload_char[resp_variable].astype(float).unstack('pl')
+        x_breakpoints, y_breakpoints, _ = fit_piecewise_linear(
+            x.to_numpy(), y.to_numpy(), n_segments, convex=convex
+            )
+        n_breakpoints = x_breakpoints.shape[1]
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            c_1 = np.diff(y_breakpoints, axis=1) / np.diff(x_breakpoints, axis=1)
+        c_0 = y_breakpoints[:, :-1] - c_1 * x_breakpoints[:, :-1]
+
+        if normalize:
+            variable_nom = partload_char.loc[
+                (np.round(normalize['T_hs_ff'], 3),
+                 np.round(normalize['T_cons_ff'], 3)),
+                variable
+                ].max()
+            x_breakpoints = x_breakpoints / variable_nom
+            y_breakpoints = y_breakpoints / variable_nom
+            c_0 = c_0 / variable_nom
+
+        columns = {}
+        for k in range(n_breakpoints):
+            columns[f'{variable}_{k}'] = x_breakpoints[:, k]
+        for k in range(n_breakpoints):
+            columns[f'{resp_variable}_{k}'] = y_breakpoints[:, k]
+        for k in range(n_breakpoints - 1):
+            columns[f'c_1_{k}'] = c_1[:, k]
+        for k in range(n_breakpoints - 1):
+            columns[f'c_0_{k}'] = c_0[:, k]
+
+        return pd.DataFrame(columns, index=x.index)
+
+    def arrange_char_timeseries(self, linear_model, temp_ts, method='nearest',
+                                clamp=True, return_mask=False):
         """
         Arrange a timeseries of the characteristics based on temperature data.
 
-        If T_cons_ff in temperature timeseries is out of bounds, the closest
-        characteristic (min. or max. temperature).
+        All time steps are mapped to the rows of the characteristic at once.
+        Temperatures outside of the characteristic's ranges are clamped to the
+        closest (min. or max.) temperature of each axis, unless clamping is
+        disabled for the axis.
 
         Parameters
         ----------
         linear_model : pd.DataFrame
             DataFrame of the linearized partload characteristic with a
-            MultiIndex of the three variables 'T_hs_ff' and 'T_cons_ff'.
+            MultiIndex of the two variables 'T_hs_ff' and 'T_cons_ff'.
 
         temp_ts : pd.DataFrame
             Timeseries of 'T_hs_ff' and 'T_cons_ff' as they occur in the period
             observed.
+
+        method : str
+            Lookup method on both temperature axes. Options are 'nearest' for
+            the closest temperature, 'floor' for the closest temperature below
+            and 'interpolate' for a bilinear interpolation of the rows.
+            Defaults to 'nearest'.
+
+        clamp : bool or dict
+            Flag to set if out of bounds temperatures are clamped to the
+            ranges of the characteristic. Can be set per axis with a dict with
+            the keys 'T_hs_ff' and 'T_cons_ff'. Time steps out of bounds of an
+            axis without clamping are NaN. Defaults to `True`.
+
+        return_mask : bool
+            Flag to set if the out of bounds mask should be returned as well.
+            Defaults to `False`.
+
+        Returns
+        -------
+        pd.DataFrame or tuple of pd.DataFrame
+            Timeseries of the characteristic and, if `return_mask` is set, the
+            boolean mask of out of bounds temperatures of both axes.
         """
-        char_ts = pd.DataFrame(
-            index=temp_ts.index, columns=linear_model.columns
+        if method not in ['nearest', 'floor', 'interpolate']:
+            raise ValueError(
+                f"Argument {method} for parameter 'method' is not valid. "
+                + "Choose either 'nearest', 'floor' or 'interpolate'."
+                )
+        axes = ['T_hs_ff', 'T_cons_ff']
+        if not isinstance(clamp, dict):
+            clamp = {axis: clamp for axis in axes}
+
+        ranges = [
+            np.unique(linear_model.index.get_level_values(axis).astype(float))
+            for axis in axes
+            ]
+        grid = linear_model.astype(float).reindex(
+            pd.MultiIndex.from_product(ranges, names=axes)
+            )
+        values = grid.to_numpy().reshape(
+            len(ranges[0]), len(ranges[1]), grid.shape[1]
             )
-        for i in temp_ts.index:
-            try:
-                char_ts.loc[i, :] = linear_model.loc[
-                    (temp_ts.loc[i, 'T_hs_ff'], temp_ts.loc[i, 'T_cons_ff']), :
-                    ]
-            except KeyError:
-                print(temp_ts.loc[i, 'T_cons_ff'], 'not in linear_model.')
-                T_cons_ff_range = linear_model.index.get_level_values('T_cons_ff')
-                if temp_ts.loc[i, 'T_cons_ff'] < min(T_cons_ff_range):
-                    multi_idx = (
-                        temp_ts.loc[i, 'T_hs_ff'], min(T_cons_ff_range)
-                        )
-                elif temp_ts.loc[i, 'T_cons_ff'] > max(T_cons_ff_range):
-                    multi_idx = (
-                        temp_ts.loc[i, 'T_hs_ff'], max(T_cons_ff_range)
-                        )
-                char_ts.loc[i, :] = linear_model.loc[multi_idx, :]
 
+        out_of_bounds = {}
+        valid = np.ones(len(temp_ts), dtype=bool)
+        lookup = []
+        for axis, axis_range in zip(axes, ranges):
+            temp = temp_ts[axis].to_numpy(dtype=float)
+            outside = (temp < axis_range[0]) | (temp > axis_range[-1])
+            out_of_bounds[axis] = outside
+            if not clamp.get(axis, True):
+                valid &= ~outside
+            lower, upper, weight, _ = _axis_weights(
+                axis_range, temp, clamp=True
+                )
+            if method == 'nearest':
+                lower = np.where(weight > 0.5, upper, lower)
+            elif method == 'floor':
+                lower = np.where(weight >= 1, upper, lower)
+            if method != 'interpolate':
+                upper = lower
+                weight = np.zeros(len(temp))
+            valid &= ~np.isnan(temp)
+            lookup += [(lower, upper, weight[:, np.newaxis])]
+
+        (i0, j0, t0), (i1, j1, t1) = lookup
+        char = (
+            (values[i0, i1] * (1 - t1) + values[i0, j1] * t1) * (1 - t0)
+            + (values[j0, i1] * (1 - t1) + values[j0, j1] * t1) * t0
+            )
+        char[~valid] = np.nan
+
+        char_ts = pd.DataFrame(
+            char, index=temp_ts.index, columns=linear_model.columns
+            )
+        if return_mask:
+            return char_ts, pd.DataFrame(out_of_bounds, index=temp_ts.index)
         return char_ts
 
+    def get_milp_coefficients(self, linear_model, temp_ts, method='nearest',
+                              clamp=True, deduplicate=True, dtype='float64',
+                              **kwargs):
+        """
+        Build numeric coefficient arrays of the characteristic per time step.
+
+        The coefficients of all time steps are arranged like in
+        `arrange_char_timeseries`. Identical rows are stored only once in a
+        coefficient table, which is referenced by an index array of all time
+        steps.
+
+        Parameters
+        ----------
+        linear_model : pd.DataFrame or PartloadCharacteristic
+            DataFrame of the linearized partload characteristic with a
+            MultiIndex of the two variables 'T_hs_ff' and 'T_cons_ff'. A
+            PartloadCharacteristic is linearized with
+            `linearize_partload_char` first.
+
+        temp_ts : pd.DataFrame
+            Timeseries of 'T_hs_ff' and 'T_cons_ff' as they occur in the period
+            observed.
+
+        method, clamp :
+            See `arrange_char_timeseries`.
+
+        deduplicate : bool
+            Flag to set if identical rows of coefficients are merged. Otherwise,
+            the table contains one row per time step. Defaults to `True`.
+
+        dtype : str or np.dtype
+            Floating point type of the coefficients. Defaults to 'float64'.
+
+        kwargs : dict
+            Keyword arguments of `linearize_partload_char` if a
+            PartloadCharacteristic is passed, e.g. 'variable' or 'normalize'.
+
+        Returns
+        -------
+        dict
+            Names of the coefficients 'columns', the coefficient table
+            'coefficients' with the shape (rows, columns) and the row of every
+            time step 'index' as the smallest sufficient unsigned integer type.
+        """
+        if isinstance(linear_model, PartloadCharacteristic):
+            linear_model = self.linearize_partload_char(
+                linear_model, **kwargs
+                )
+        elif kwargs:
+            raise ValueError(
+                'Keyword arguments of linearize_partload_char are only valid '
+                + 'if a PartloadCharacteristic is passed.'
+                )
+        char_ts = self.arrange_char_timeseries(
+            linear_model, temp_ts, method=method, clamp=clamp
+            )
+        values = char_ts.to_numpy(dtype=dtype)
+
+        if deduplicate and len(values):
+            table, index = np.unique(values, axis=0, return_inverse=True)
+            index = index.ravel()
+        else:
+            table, index = values, np.arange(len(values))
+        index_dtype = np.min_scalar_type(max(len(table) - 1, 0))
+
+        return {
+            'columns': list(char_ts.columns),
+            'coefficients': np.ascontiguousarray(table),
+            'index': index.astype(index_dtype)
+            }
+
+    def iter_char_timeseries(self, linear_model, temp_ts, chunksize=100000,
+                             **kwargs):
+        """
+        Arrange the timeseries of the characteristics chunk by chunk.
+
+        Streaming version of `arrange_char_timeseries` for temperature data
+        exceeding the memory.
+
+        Parameters
+        ----------
+        linear_model : pd.DataFrame
+            DataFrame of the linearized partload characteristic with a
+            MultiIndex of the two variables 'T_hs_ff' and 'T_cons_ff'.
+
+        temp_ts : str or iterable of pd.DataFrame
+            Path to a CSV, Parquet or Feather file of the columns 'T_hs_ff'
+            and 'T_cons_ff', which is read in chunks with
+            `heatpumps.storage.iter_table`, or an iterable of chunks.
+
+        chunksize : int
+            Maximum number of time steps per chunk read from a file. Defaults
+            to 100000.
+
+        kwargs : dict
+            Keyword arguments of `arrange_char_timeseries`.
+
+        Yields
+        ------
+        pd.DataFrame or tuple of pd.DataFrame
+            Result of `arrange_char_timeseries` for every chunk.
+        """
+        if isinstance(temp_ts, (str, os.PathLike)):
+            path = os.fspath(temp_ts)
+            temp_ts = iter_table(
+                path, chunksize=chunksize,
+                columns=(
+                    None if path.lower().endswith('.csv')
+                    else ['T_hs_ff', 'T_cons_ff']
+                    )
+                )
+        for chunk in temp_ts:
+            yield self.arrange_char_timeseries(linear_model, chunk, **kwargs)
+
+    def calc_annual_performance(self, timeseries, partload_char=None,
+                                **kwargs):
+        """
+        Calculate the seasonal performance of the heat pump.
+
+        Parameters
+        ----------
+        timeseries : pd.DataFrame, iterable of pd.DataFrame or str
+            Timeseries with the columns 'T_hs_ff', 'T_cons_ff' and 'Q_demand'
+            (heat demand in MW) or the path to a file containing them.
+
+        partload_char : PartloadCharacteristic
+            Partload characteristic to evaluate. Defaults to the result of
+            `get_partload_char`.
+
+        kwargs : dict
+            Keyword arguments of `heatpumps.performance.annual_performance`,
+            e.g. 'timestep', 'chunksize' or 'return_timeseries'.
+        """
+        if partload_char is None:
+            partload_char = self.get_partload_char()
+        return annual_performance(partload_char, timeseries, **kwargs)
+
+    def calc_dispatch(self, timeseries, storage_capacity, partload_char=None,
+                      **kwargs):
+        """
+        Simulate the dispatch of the heat pump with thermal storages.
+
+        Parameters
+        ----------
+        timeseries : pd.DataFrame
+            Timeseries with the columns 'T_hs_ff', 'T_cons_ff' and 'Q_demand'
+            (heat demand in MW).
+
+        storage_capacity : float or array
+            Capacities of the storages in MWh simulated in parallel.
+
+        partload_char : PartloadCharacteristic
+            Partload characteristic to evaluate. Defaults to the result of
+            `get_partload_char`.
+
+        kwargs : dict
+            Keyword arguments of `heatpumps.performance.simulate_dispatch`.
+            The minimal partload defaults to the offdesign parameter
+            'partload_min'.
+        """
+        if partload_char is None:
+            partload_char = self.get_partload_char()
+        kwargs.setdefault(
+            'partload_min',
+            max(
+                self.params['offdesign']['partload_min'],
+                partload_char.pl_range[0]
+                )
+            )
+        return simulate_dispatch(
+            partload_char, timeseries, storage_capacity, **kwargs
+            )
+
     def plot_partload_char(self, partload_char, cmap_type='', cmap='viridis',
                            return_fig_ax=False, savefig=False, open_file=False):
         """
@@ -968,10 +1512,11 @@ class HeatPumpBase:
 
         Parameters
         ----------
-        partload_char : pd.DataFrame
+        partload_char : pd.DataFrame or PartloadCharacteristic
             DataFrame of the full partload characteristic containing 'Q', 'P',
             'COP' and epsilon with a MultiIndex of the three variables 'T_hs_ff',
-            'T_cons_ff' and 'pl'.
+            'T_cons_ff' and 'pl'. A PartloadCharacteristic is evaluated at
+            its default resolution.
 
         cmap_type : str
             String of the possible colormap variations, which are 'T_cons_ff',
@@ -988,6 +1533,9 @@ class HeatPumpBase:
                 )
             return
 
+        if isinstance(partload_char, PartloadCharacteristic):
+            partload_char = partload_char.to_frame()
+
         colormap = plt.get_cmap(cmap)
         T_hs_ff_range = set(
             partload_char.index.get_level_values('T_hs_ff')
@@ -1301,15 +1849,8 @@ class HeatPumpBase:
                     + f'not positive. {user_help_prompt}'
                 )
 
-    def offdesign_simulation(self, log_simulations=False):
-        """Perform offdesign parametrization and simulation."""
-        if not self.solved_design:
-            raise RuntimeError(
-                'Heat pump has not been designed via the "design_simulation" '
-                + 'method. Therefore the offdesign simulation will fail.'
-            )
-
-        # Parametrization
+    def _parametrize_offdesign(self):
+        """Set design and offdesign attributes of all network components."""
         kA_char1_default = ldc(
             'heat exchanger', 'kA_char1', 'DEFAULT', CharLine
         )
@@ -1383,6 +1924,16 @@ class HeatPumpBase:
                         + f' in the heat pump base class.'
                     )
 
+    def offdesign_simulation(self, log_simulations=False):
+        """Perform offdesign parametrization and simulation."""
+        if not self.solved_design:
+            raise RuntimeError(
+                'Heat pump has not been designed via the "design_simulation" '
+                + 'method. Therefore the offdesign simulation will fail.'
+            )
+
+        # Parametrization
+        self._parametrize_offdesign()
 
         self.conns['B1'].set_attr(offdesign=['v'])
         self.conns['B2'].set_attr(design=['T'])
@@ -1404,6 +1955,7 @@ class HeatPumpBase:
         results_offdesign = pd.DataFrame(
             index=multiindex, columns=['Q', 'P', 'COP', 'epsilon', 'residual']
         )
+        states = {}
 
         for T_hs_ff in self.T_hs_ff_stablerange:
             self.conns['B1'].set_attr(T=T_hs_ff)
@@ -1504,7 +2056,9 @@ class HeatPumpBase:
                                 results_offdesign.loc[idx, 'Q'] = np.nan
                                 results_offdesign.loc[idx, 'P'] = np.nan
                                 results_offdesign.loc[idx, 'epsilon'] = np.nan
+                                states.pop(idx, None)
                             else:
+                                states[idx] = self.get_offdesign_state()
                                 results_offdesign.loc[idx, 'Q'] = abs(
                                     self.buses['heat output'].P.val * 1e-6
                                 )
@@ -1524,15 +2078,160 @@ class HeatPumpBase:
                             )
 
         if self.params['offdesign']['save_results']:
-            cache_dir = platformdirs.user_cache_dir('heatpumps', 'heatpumps')
-            filepath = os.path.join(cache_dir, 'output')
-            os.makedirs(filepath, exist_ok=True)
-            resultpath = os.path.join(
-                filepath, f'{self.subdirname}_partload.csv'
+            self.save_offdesign_results(results_offdesign)
+
+        self.results_offdesign = results_offdesign
+        self.offdesign_states = self.states_to_frames(
+            states, results_offdesign.index
             )
+        self.df_to_array(results_offdesign)
+
+    def save_offdesign_results(self, results_offdesign):
+        """
+        Save offdesign results to the output directory.
+
+        The file format is set by the 'results_format' key of the offdesign
+        parameters, which is either 'csv' (default), 'parquet' or 'feather'.
+        The columnar formats embed the metadata of `get_metadata`.
+        """
+        results_format = self.params['offdesign'].get('results_format', 'csv')
+        cache_dir = platformdirs.user_cache_dir('heatpumps', 'heatpumps')
+        filepath = os.path.join(cache_dir, 'output')
+        os.makedirs(filepath, exist_ok=True)
+        resultpath = os.path.join(
+            filepath, f'{self.subdirname}_partload.{results_format}'
+        )
+        if results_format == 'csv':
             results_offdesign.to_csv(resultpath, sep=';')
+        else:
+            write_table(
+                results_offdesign, resultpath, metadata=self.get_metadata(),
+                fmt=results_format
+                )
 
-        self.df_to_array(results_offdesign)
+        return resultpath
+
+    def get_metadata(self):
+        """Return metadata identifying the model of exported results."""
+        return model_metadata(self)
+
+    def get_offdesign_state(self):
+        """
+        Get values of all quantities used in the plausibility checks.
+
+        Returns
+        -------
+        state : dict
+            Values of the current simulation with keys of the form
+            (component type, parameter), each a dict of values keyed like the
+            'conns' and 'comps' attributes.
+        """
+        state = {}
+        for comp_type, param, _ in self.plausibility_checks.values():
+            if comp_type == 'Connection':
+                objects = self.conns
+            else:
+                objects = {
+                    key: comp for key, comp in self.comps.items()
+                    if comp.__class__.__name__ == comp_type
+                    }
+            if objects:
+                state[(comp_type, param)] = {
+                    key: obj.get_attr(param).val for key, obj in objects.items()
+                    }
+
+        return state
+
+    def states_to_frames(self, states, index):
+        """
+        Arrange offdesign states of single points to one frame per quantity.
+
+        Parameters
+        ----------
+        states : dict
+            States as returned by `get_offdesign_state` keyed by the
+            operating point. Points without a state are filled with NaN.
+
+        index : pd.MultiIndex
+            Index of the operating points ('T_hs_ff', 'T_cons_ff', 'pl').
+
+        Returns
+        -------
+        offdesign_states : dict
+            pd.DataFrame with the operating points as index and the objects
+            as columns for every (component type, parameter) key.
+        """
+        offdesign_states = {}
+        keys = set(key for state in states.values() for key in state)
+        for key in keys:
+            offdesign_states[key] = pd.DataFrame.from_dict(
+                {idx: state[key] for idx, state in states.items()},
+                orient='index', dtype='float64'
+                ).reindex(index)
+
+        return offdesign_states
+
+    def validate_offdesign_results(self, offdesign_states=None):
+        """
+        Check thermodynamic plausibility of all offdesign points at once.
+
+        The checks are the same as in `check_thermodynamic_results`, but are
+        evaluated on the stored states of all offdesign points and do not
+        raise an error.
+
+        Parameters
+        ----------
+        offdesign_states : dict
+            States as returned by `states_to_frames`. Defaults to the
+            'offdesign_states' attribute set by the offdesign simulation.
+
+        Returns
+        -------
+        plausibility : pd.DataFrame
+            Boolean mask per operating point with one column for every
+            reason of implausibility (see `plausibility_checks`) and the
+            column 'plausible', which is `True` if no check failed.
+        """
+        if offdesign_states is None:
+            if 'offdesign_states' not in self.__dict__:
+                raise AttributeError(
+                    'No offdesign states found. Please perform the '
+                    + 'offdesign_simulation method first or provide the '
+                    + 'states as argument.'
+                    )
+            offdesign_states = self.offdesign_states
+        if not offdesign_states:
+            raise ValueError(
+                'The offdesign states are empty, as none of the offdesign '
+                + 'simulations was successful.'
+                )
+
+        index = next(iter(offdesign_states.values())).index
+        plausibility = pd.DataFrame(
+            False, index=index, columns=list(self.plausibility_checks)
+            )
+        for reason, (comp_type, param, comparison) in (
+                self.plausibility_checks.items()):
+            if (comp_type, param) not in offdesign_states:
+                continue
+            values = offdesign_states[(comp_type, param)].to_numpy()
+            plausibility[reason] = comparison(values, 0).any(axis=1)
+        plausibility['plausible'] = ~plausibility.any(axis=1)
+
+        self.plausibility = plausibility
+        if 'T_hs_ff_range' in self.__dict__:
+            fullindex = pd.MultiIndex.from_product(
+                [self.T_hs_ff_range, self.T_cons_ff_range, self.pl_range]
+                )
+            self.plausible_array = (
+                plausibility['plausible'].reindex(fullindex, fill_value=True)
+                .to_numpy(dtype=bool).reshape(
+                    len(self.T_hs_ff_range), len(self.T_cons_ff_range),
+                    len(self.pl_range)
+                    )
+                )
+
+        return plausibility
 
     def intermediate_states_offdesign(self, T_hs_ff, T_cons_ff, deltaT_hs):
         """Calculates intermediate states during part-load simulation"""
@@ -139,8 +139,8 @@ class HeatPumpCascade(HeatPumpCascadeBase):
 
         self.nw.add_busses(*[bus for bus in self.buses.values()])
 
-    def init_simulation(self, **kwargs):
-        """Perform initial parametrization with starting values."""
+    def _parametrize_init(self):
+        """Set parameters and starting values of the initial simulation."""
         # Components
         self.conns['A4'].set_attr(
             h=Ref(self.conns['A3'], self._init_vals['dh_rel_comp'], 0)
@@ -198,9 +198,8 @@ class HeatPumpCascade(HeatPumpCascadeBase):
             )
         self.conns['C1'].set_attr(T=self.params['C1']['T'])
 
-        # Perform initial simulation and unset starting values
-        self._solve_model(**kwargs)
-
+    def _postprocess_init(self):
+        """Unset starting values after the initial simulation."""
         self.conns['A0'].set_attr(p=None)
         self.conns['A3'].set_attr(p=None)
         self.conns['D0'].set_attr(p=None)
@@ -208,8 +207,8 @@ class HeatPumpCascade(HeatPumpCascadeBase):
         self.conns['A4'].set_attr(h=None)
         self.conns['D4'].set_attr(h=None)
 
-    def design_simulation(self, **kwargs):
-        """Perform final parametrization and design simulation."""
+    def _parametrize_design(self):
+        """Set final parameters of the design simulation."""
         self.comps['LT_comp'].set_attr(eta_s=self.params['LT_comp']['eta_s'])
         self.comps['HT_comp'].set_attr(eta_s=self.params['HT_comp']['eta_s'])
         self.comps['evap'].set_attr(ttd_l=self.params['evap']['ttd_l'])
@@ -217,15 +216,6 @@ class HeatPumpCascade(HeatPumpCascadeBase):
         self.comps['inter'].set_attr(ttd_u=self.params['inter']['ttd_u'])
         self.conns['A3'].set_attr(T=self.T_mid-self.params['inter']['ttd_u']/2)
 
-        self._solve_model(**kwargs)
-
-        self.m_design = self.conns['A0'].m.val
-
-        self.cop = (
-            abs(self.buses['heat output'].P.val)
-            / self.buses['power input'].P.val
-            )
-
     def intermediate_states_offdesign(self, T_hs_ff, T_cons_ff, deltaT_hs):
         """Calculates intermediate states during part-load simulation"""
         self.T_mid = ((T_hs_ff - deltaT_hs) + T_cons_ff) / 2
@@ -232,8 +232,8 @@ class HeatPumpCascadeEconTrans(HeatPumpCascadeBase):
 
         self.nw.add_busses(*[bus for bus in self.buses.values()])
 
-    def init_simulation(self, **kwargs):
-        """Perform initial parametrization with starting values."""
+    def _parametrize_init(self):
+        """Set parameters and starting values of the initial simulation."""
         # Components
         self.conns['A6'].set_attr(
             h=Ref(self.conns['A5'], self._init_vals['dh_rel_comp'], 0)
@@ -317,9 +317,8 @@ class HeatPumpCascadeEconTrans(HeatPumpCascadeBase):
             )
         self.conns['C1'].set_attr(T=self.params['C1']['T'])
 
-        # Perform initial simulation and unset starting values
-        self._solve_model(**kwargs)
-
+    def _postprocess_init(self):
+        """Unset starting values after the initial simulation."""
         self.conns['A0'].set_attr(h=None)
         self.conns['A5'].set_attr(p=None)
         self.conns['D0'].set_attr(p=None)
@@ -332,8 +331,8 @@ class HeatPumpCascadeEconTrans(HeatPumpCascadeBase):
         self.conns['D6'].set_attr(h=None)
         self.conns['D8'].set_attr(h=None)
 
-    def design_simulation(self, **kwargs):
-        """Perform final parametrization and design simulation."""
+    def _parametrize_design(self):
+        """Set final parameters of the design simulation."""
         self.comps['HT_comp1'].set_attr(eta_s=self.params['HT_comp1']['eta_s'])
         self.comps['HT_comp2'].set_attr(eta_s=self.params['HT_comp2']['eta_s'])
         self.comps['LT_comp1'].set_attr(eta_s=self.params['LT_comp1']['eta_s'])
@@ -346,15 +345,6 @@ class HeatPumpCascadeEconTrans(HeatPumpCascadeBase):
             self.comps['econ1'].set_attr(ttd_l=self.params['econ1']['ttd_l'])
             self.comps['econ2'].set_attr(ttd_l=self.params['econ2']['ttd_l'])
 
-        self._solve_model(**kwargs)
-
-        self.m_design = self.conns['A0'].m.val
-
-        self.cop = (
-                abs(self.buses['heat output'].P.val)
-                / self.buses['power input'].P.val
-            )
-
     def intermediate_states_offdesign(self, T_hs_ff, T_cons_ff, deltaT_hs):
         """Calculates intermediate states during part-load simulation"""
         self.T_mid = ((T_hs_ff - deltaT_hs) + T_cons_ff) / 4
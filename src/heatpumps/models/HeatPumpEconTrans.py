@@ -170,8 +170,8 @@ class HeatPumpEconTrans(HeatPumpBase):
 
         self.nw.add_busses(*[bus for bus in self.buses.values()])
 
-    def init_simulation(self, **kwargs):
-        """Perform initial parametrization with starting values."""
+    def _parametrize_init(self):
+        """Set parameters and starting values of the initial simulation."""
         # Components
         self.conns['A6'].set_attr(
             h=Ref(self.conns['A5'], self._init_vals['dh_rel_comp'], 0)
@@ -234,9 +234,8 @@ class HeatPumpEconTrans(HeatPumpBase):
         )
         self.conns['C1'].set_attr(T=self.params['C1']['T'])
 
-        # Perform initial simulation and unset starting values
-        self._solve_model(**kwargs)
-
+    def _postprocess_init(self):
+        """Unset starting values after the initial simulation."""
         if self.econ_type == 'closed':
             self.conns['A2'].set_attr(m=None)
         self.conns['A5'].set_attr(p=None)
@@ -244,8 +243,8 @@ class HeatPumpEconTrans(HeatPumpBase):
         self.conns['A6'].set_attr(h=None)
         self.conns['A8'].set_attr(h=None)
 
-    def design_simulation(self, **kwargs):
-        """Perform final parametrization and design simulation."""
+    def _parametrize_design(self):
+        """Set final parameters of the design simulation."""
         self.comps['comp1'].set_attr(eta_s=self.params['comp1']['eta_s'])
         self.comps['comp2'].set_attr(eta_s=self.params['comp2']['eta_s'])
         self.comps['evap'].set_attr(ttd_l=self.params['evap']['ttd_l'])
@@ -253,15 +252,6 @@ class HeatPumpEconTrans(HeatPumpBase):
         if self.econ_type == 'closed':
             self.comps['econ'].set_attr(ttd_l=self.params['econ']['ttd_l'])
 
-        self._solve_model(**kwargs)
-
-        self.m_design = self.conns['A0'].m.val
-
-        self.cop = (
-                abs(self.buses['heat output'].P.val)
-                / self.buses['power input'].P.val
-        )
-
     def intermediate_states_offdesign(self, T_hs_ff, T_cons_ff, deltaT_hs):
         """Calculates intermediate states during part-load simulation"""
         _, _, p_mid = self.get_pressure_levels(
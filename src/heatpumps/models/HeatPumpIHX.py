@@ -124,8 +124,8 @@ class HeatPumpIHX(HeatPumpBase):
 
         self.nw.add_busses(*[bus for bus in self.buses.values()])
 
-    def init_simulation(self, **kwargs):
-        """Perform initial parametrization with starting values."""
+    def _parametrize_init(self):
+        """Set parameters and starting values of the initial simulation."""
         # Components
         self.conns['A6'].set_attr(
             h=Ref(self.conns['A5'], self._init_vals['dh_rel_comp'], 0)
@@ -181,16 +181,15 @@ class HeatPumpIHX(HeatPumpBase):
             )
         self.conns['C1'].set_attr(T=self.params['C1']['T'])
 
-        # Perform initial simulation and unset starting values
-        self._solve_model(**kwargs)
-
+    def _postprocess_init(self):
+        """Unset starting values after the initial simulation."""
         self.conns['A4'].set_attr(p=None)
         self.conns['A0'].set_attr(p=None)
         self.conns['A5'].set_attr(h=None)
         self.conns['A6'].set_attr(h=None)
 
-    def design_simulation(self, **kwargs):
-        """Perform final parametrization and design simulation."""
+    def _parametrize_design(self):
+        """Set final parameters of the design simulation."""
         self.comps['comp'].set_attr(eta_s=self.params['comp']['eta_s'])
         self.comps['evap'].set_attr(ttd_l=self.params['evap']['ttd_l'])
         self.comps['cond'].set_attr(ttd_u=self.params['cond']['ttd_u'])
@@ -198,15 +197,6 @@ class HeatPumpIHX(HeatPumpBase):
             T=Ref(self.conns['A4'], 1, self.params['ihx']['dT_sh'])
             )
 
-        self._solve_model(**kwargs)
-
-        self.m_design = self.conns['A0'].m.val
-
-        self.cop = (
-            abs(self.buses['heat output'].P.val)
-            / self.buses['power input'].P.val
-            )
-
     def get_plotting_states(self, **kwargs):
         """Generate data of states to plot in state diagram."""
         data = {}
@@ -0,0 +1,535 @@
+import copy
+import os
+
+import numpy as np
+import pandas as pd
+import platformdirs
+from tespy.networks import Network
+from tespy.tools import ExergyAnalysis
+
+
+class _StackedNetwork(Network):
+    """
+    TESPy network recording the residual norms of the stacked copies.
+
+    The norm of the residuals of the equations of every copy is stored in
+    every iteration, so that the convergence of the copies can be judged
+    separately. The copy of every component, connection and bus is looked up
+    by its label in the 'owners' attribute.
+    """
+
+    def __init__(self, n_instances, **kwargs):
+        """Initialize network with empty residual history of the copies."""
+        super().__init__(**kwargs)
+        self.n_instances = n_instances
+        self.owners = {}
+        self.member_residual_history = np.empty((0, n_instances))
+
+    def solve_control(self):
+        """Perform a Newton iteration and record the residuals by copy."""
+        if self.iter == 0:
+            # Same order of the equations as in the residual vector
+            rows = []
+            for comp in self.comps['object']:
+                rows += [self.owners[comp.label]] * comp.num_eq
+            for conn in self.conns['object']:
+                rows += [self.owners[conn.label]] * conn.num_eq
+            for bus in self.busses.values():
+                if bus.P.is_set:
+                    rows.append(self.owners[bus.label])
+            self._member_rows = np.array(rows, dtype=int)
+            self.member_residual_history = np.empty((0, self.n_instances))
+
+        super().solve_control()
+
+        residual = np.asarray(self.residual)[:len(self._member_rows)]
+        norms = np.sqrt(np.bincount(
+            self._member_rows, weights=residual**2,
+            minlength=self.n_instances
+            ))
+        self.member_residual_history = np.vstack([
+            self.member_residual_history, norms
+            ])
+
+
+class HeatPumpStack:
+    """
+    Independent copies of a heat pump model solved in a single network.
+
+    The components and connections of the reference model are generated
+    `n_instances` times via its `generate_components` and
+    `generate_connections` methods and added to one TESPy network. Every copy
+    can be given its own boundary conditions, the network is solved once for
+    all of them and the results are split back into per copy values. This
+    amortises the solver setup and Python overhead of a single TESPy solve
+    over many operating points.
+
+    Parameters
+    ----------
+    hp : HeatPumpBase
+        Instance of the heat pump model to stack. It does not have to be
+        solved beforehand.
+
+    n_instances : int
+        Number of independent copies in the stacked network. As the Jacobian
+        of the whole network is inverted in every iteration, moderate numbers
+        (e.g. up to 20) are the most efficient.
+
+    Attributes
+    ----------
+    residual_tol : float
+        Tolerance of the norm of the residuals of the equations of a single
+        copy. Every copy is judged separately, so that its points are
+        accepted with the same criterion as in a single model. Default is
+        1e-3.
+
+    max_iter : int
+        Maximum number of iterations of every offdesign solve. Default is 25.
+    """
+
+    def __init__(self, hp, n_instances):
+        """Initialize stacked network and generate all copies of the model."""
+        if n_instances < 1:
+            raise ValueError(
+                'The number of stacked instances has to be at least 1.'
+            )
+        self.hp = hp
+        self.n_instances = int(n_instances)
+
+        self.nw = _StackedNetwork(
+            self.n_instances, T_unit='C', p_unit='bar', h_unit='kJ / kg',
+            m_unit='kg / s'
+            )
+
+        self.members = []
+        for i in range(self.n_instances):
+            self.members.append(self._generate_member(i))
+
+        self.solved_design = False
+        self.results_design = None
+        self.residual_tol = 1e-3
+        self.max_iter = 25
+
+        cache_dir = platformdirs.user_cache_dir('heatpumps', 'heatpumps')
+        self.design_path = os.path.join(
+            cache_dir, 'stable',
+            f'{self.hp.subdirname}_stack{self.n_instances}_design.json'
+            )
+
+    def _generate_member(self, i):
+        """Generate a relabeled copy of the model and add it to the network."""
+        member = copy.copy(self.hp)
+        member.params = copy.deepcopy(self.hp.params)
+        member.comps = dict()
+        member.conns = dict()
+        member.buses = dict()
+        member.solved_design = False
+        member.design_quantities = None
+
+        # Components and connections are generated in a scratch network as
+        # their labels are not unique before the instance suffix is appended
+        member.nw = Network(
+            T_unit='C', p_unit='bar', h_unit='kJ / kg', m_unit='kg / s'
+            )
+        member.generate_components()
+        member.generate_connections()
+
+        suffix = f' [{i}]'
+        for comp in {
+                c.source for c in member.conns.values()
+                } | {c.target for c in member.conns.values()}:
+            comp.label += suffix
+            comp.fkt_group = comp.label
+        for conn in member.conns.values():
+            conn.label += suffix
+        for bus in member.buses.values():
+            bus.label += suffix
+            self.nw.owners[bus.label] = i
+        for conn in member.conns.values():
+            self.nw.owners[conn.label] = i
+            self.nw.owners[conn.source.label] = i
+            self.nw.owners[conn.target.label] = i
+
+        member.nw = self.nw
+        self.nw.add_conns(*[conn for conn in member.conns.values()])
+        self.nw.add_busses(*[bus for bus in member.buses.values()])
+
+        return member
+
+    def run_model(self, params=None, exergy_analysis=True, **kwargs):
+        """
+        Run the initialization and design simulation of all copies at once.
+
+        For the initial and the design simulation, every copy is parametrised
+        via its `_parametrize_init` and `_parametrize_design` methods, the
+        stacked network is solved once and every copy postprocesses its part
+        of the results via `_postprocess_init` and `_postprocess_design`.
+
+        Parameters
+        ----------
+        params : list of dict
+            Parameter dictionaries of the copies, e.g. with different
+            boundary conditions for a design sweep. Has to be of length
+            `n_instances`. Defaults to the parameters of the reference model
+            for all copies.
+
+        exergy_analysis : bool
+            Flag to set if epsilon should be evaluated for every copy.
+            Default is `True`.
+        """
+        if params is None:
+            params = [self.hp.params] * self.n_instances
+        if len(params) != self.n_instances:
+            raise ValueError(
+                f'Expected {self.n_instances} parameter sets, got '
+                + f'{len(params)}.'
+            )
+        for member, member_params in zip(self.members, params):
+            member.params = copy.deepcopy(member_params)
+
+        if 'iterinfo' in kwargs:
+            self.nw.set_attr(iterinfo=kwargs['iterinfo'])
+        for stage in ['init', 'design']:
+            for member in self.members:
+                getattr(member, f'_parametrize_{stage}')()
+            converged = self._solve_network('design')
+            for member in self.members:
+                getattr(member, f'_postprocess_{stage}')()
+
+        if converged.all():
+            self.solved_design = True
+            os.makedirs(os.path.dirname(self.design_path), exist_ok=True)
+            self.nw.save(self.design_path)
+        for member in self.members:
+            member.solved_design = self.solved_design
+
+        # every copy keeps the design quantities of its own components
+        design_quantities = self.members[0].get_design_quantities()
+        for i, member in enumerate(self.members):
+            if not converged[i]:
+                continue
+            suffix = f' [{i}]'
+            member.design_quantities = {
+                label[:-len(suffix)]: quantity
+                for label, quantity in design_quantities.items()
+                if self.nw.owners[label] == i
+                }
+
+        # Checks are performed on the results of the whole network
+        self.members[0].check_consistency()
+
+        if exergy_analysis:
+            epsilon = self.split_exergy_analysis()
+        else:
+            epsilon = [np.nan] * self.n_instances
+
+        results = []
+        for member, eps in zip(self.members, epsilon):
+            member.calc_efficiencies()
+            member.epsilon = eps
+            results.append([
+                abs(member.buses['heat output'].P.val) * 1e-6,
+                member.buses['power input'].P.val * 1e-6,
+                member.cop, member.epsilon
+                ])
+        self.results_design = pd.DataFrame(
+            results, columns=['Q', 'P', 'COP', 'epsilon'], dtype='float64'
+            )
+        self.results_design.index.name = 'instance'
+
+        return self.results_design
+
+    def split_exergy_analysis(self):
+        """
+        Perform exergy analysis of stacked network and split it by copy.
+
+        Returns
+        -------
+        epsilon : list of float
+            Exergetic efficiency of every copy.
+        """
+        E_F_buses = []
+        E_P_buses = []
+        for member in self.members:
+            E_F_buses += [member.buses['power input'], member.buses['heat input']]
+            E_P_buses += [member.buses['heat output']]
+
+        self.ean = ExergyAnalysis(self.nw, E_F=E_F_buses, E_P=E_P_buses)
+        self.ean.analyse(
+            pamb=self.hp.params['ambient']['p'],
+            Tamb=self.hp.params['ambient']['T']
+            )
+
+        # Same bus balance as in the network data of the exergy analysis
+        epsilon = []
+        for member in self.members:
+            E_F = 0
+            E_P = 0
+            bus_groups = [
+                (member.buses['power input'], 1, 0),
+                (member.buses['heat input'], 1, 0),
+                (member.buses['heat output'], 0, 1)
+                ]
+            for bus, is_fuel, is_product in bus_groups:
+                for comp in bus.comps.index:
+                    if bus.comps.loc[comp, 'base'] == 'bus':
+                        E = self.ean.bus_data.loc[comp.label, 'E_F']
+                        E_F += is_fuel * E
+                        E_P -= is_product * E
+                    else:
+                        E = self.ean.bus_data.loc[comp.label, 'E_P']
+                        E_F -= is_fuel * E
+                        E_P += is_product * E
+            epsilon.append(abs(E_P) / abs(E_F))
+
+        return epsilon
+
+    def offdesign_simulation(self, points=None, ramp_steps=3):
+        """
+        Perform offdesign simulation of many operating points in batches.
+
+        The operating points are split into `n_instances` contiguous chunks,
+        so that every copy steps through neighbouring points and is
+        initialized with the results of its previous point. In every solve
+        all copies are calculated at once and the convergence of every copy
+        is judged by the residuals of its own equations. The copies are moved
+        from the design point to their first operating point in `ramp_steps`
+        intermediate solves. If a copy does not converge, all copies are
+        moved to their next points starting from the design point again.
+        If the stacked solve fails altogether, e.g. because of infeasible
+        fluid properties of a single copy, the points of that solve are
+        solved again in halves with the other copies held at their design
+        point, until the failing points are isolated.
+
+        Parameters
+        ----------
+        points : pd.MultiIndex or list of tuple
+            Operating points given as ('T_hs_ff', 'T_cons_ff', 'pl'). Defaults
+            to the full product of the offdesign ranges of the reference
+            model. In that case the results are also stored in the reference
+            model's 'Q_array', 'P_array' and 'epsilon_array' attributes, so
+            that its `calc_partload_char` method can be used directly. The
+            states of all points are stored in the 'offdesign_states'
+            attribute for the plausibility checks of the reference model.
+
+        ramp_steps : int
+            Number of intermediate solves used to approach the first points
+            from the design point. Default is 3.
+
+        Returns
+        -------
+        results_offdesign : pd.DataFrame
+            Heat output, power input, COP, epsilon and residual norm of the
+            equations of the respective copy of all points.
+        """
+        if not self.solved_design:
+            raise RuntimeError(
+                'Heat pump stack has not been designed via the "run_model" '
+                + 'method. Therefore the offdesign simulation will fail.'
+            )
+
+        full_sweep = points is None
+        if full_sweep:
+            self.hp.create_ranges()
+            points = self._serpentine_points(
+                self.hp.T_hs_ff_range, self.hp.T_cons_ff_range,
+                self.hp.pl_range
+                )
+        elif not isinstance(points, pd.MultiIndex):
+            points = pd.MultiIndex.from_tuples(
+                points, names=['T_hs_ff', 'T_cons_ff', 'pl']
+                )
+
+        # The component parametrization covers the whole stacked network
+        self.members[0]._parametrize_offdesign()
+        for member in self.members:
+            member.conns['B1'].set_attr(offdesign=['v'])
+            member.conns['B2'].set_attr(design=['T'])
+
+        design_points = np.array([
+            [member.params['B1']['T'], member.params['C3']['T'], 1.0]
+            for member in self.members
+            ])
+        results = np.full((len(points), 5), np.nan)
+        states = {}
+        chunks = np.array_split(np.arange(len(points)), self.n_instances)
+        n_steps = max(len(chunk) for chunk in chunks)
+
+        from_design = True
+        for step in range(n_steps):
+            # Copies with exhausted chunks stay at their last point
+            idxs = [chunk[min(step, len(chunk) - 1)] for chunk in chunks]
+            targets = np.array([points[idx] for idx in idxs], dtype=float)
+
+            records, from_design = self._solve_offdesign_batch(
+                targets, np.ones(self.n_instances, dtype=bool), design_points,
+                from_design, ramp_steps
+                )
+            for chunk, record in zip(chunks, records):
+                if step >= len(chunk) or record is None:
+                    continue
+                idx = chunk[step]
+                results[idx, [0, 1, 3, 4]] = record[:4]
+                if record[4] is not None:
+                    states[points[idx]] = record[4]
+        results[:, 2] = results[:, 0] / results[:, 1]
+
+        results_offdesign = pd.DataFrame(
+            results, index=points,
+            columns=['Q', 'P', 'COP', 'epsilon', 'residual']
+            )
+
+        self.offdesign_states = self.hp.states_to_frames(states, points)
+
+        if full_sweep:
+            results_offdesign = results_offdesign.sort_index()
+            self.offdesign_states = {
+                key: frame.sort_index()
+                for key, frame in self.offdesign_states.items()
+                }
+            if self.hp.params['offdesign']['save_results']:
+                self.hp.save_offdesign_results(results_offdesign)
+            self.hp.results_offdesign = results_offdesign
+            self.hp.offdesign_states = self.offdesign_states
+            self.hp.df_to_array(results_offdesign)
+
+        return results_offdesign
+
+    @staticmethod
+    def _serpentine_points(T_hs_ff_range, T_cons_ff_range, pl_range):
+        """Order the full product of ranges so that neighbours are adjacent."""
+        points = []
+        for i, T_hs_ff in enumerate(T_hs_ff_range):
+            T_cons_ff_order = T_cons_ff_range[::(-1) ** i]
+            for j, T_cons_ff in enumerate(T_cons_ff_order):
+                pl_order = pl_range[::-1] if (i + j) % 2 == 0 else pl_range
+                for pl in pl_order:
+                    points.append((T_hs_ff, T_cons_ff, pl))
+
+        return pd.MultiIndex.from_tuples(
+            points, names=['T_hs_ff', 'T_cons_ff', 'pl']
+            )
+
+    def _solve_offdesign_batch(self, targets, active, design_points,
+                               from_design, ramp_steps):
+        """
+        Solve the active copies at their targets and collect their results.
+
+        Inactive copies are held at their design point. If the stacked solve
+        raises an error, the active copies are split in halves, which are
+        solved separately starting from the design point.
+
+        Returns
+        -------
+        records : list
+            Heat output, power input, epsilon, residual norm and state of
+            every active copy. Results of copies that did not converge are
+            NaN with a state of None. Inactive copies and copies of failed
+            solves are None.
+
+        from_design : bool
+            Flag if the next solve has to start from the design point, as not
+            all copies are at a converged state of their targets.
+        """
+        targets = np.where(active[:, np.newaxis], targets, design_points)
+
+        init_path = None
+        if from_design:
+            init_path = self.design_path
+            for frac in np.linspace(0, 1, ramp_steps + 2)[1:-1]:
+                self._solve_offdesign_step(
+                    design_points + frac * (targets - design_points),
+                    init_path=init_path
+                    )
+                init_path = None
+        converged = self._solve_offdesign_step(targets, init_path=init_path)
+        if converged is not None and converged.any():
+            try:
+                epsilon = self.split_exergy_analysis()
+            except ValueError:
+                converged = None
+
+        records = [None] * self.n_instances
+        if converged is None:
+            if active.sum() > 1:
+                for half in np.array_split(np.flatnonzero(active), 2):
+                    part = np.zeros_like(active)
+                    part[half] = True
+                    part_records, _ = self._solve_offdesign_batch(
+                        targets, part, design_points, True, ramp_steps
+                        )
+                    for i in half:
+                        records[i] = part_records[i]
+            return records, True
+
+        for i, member in enumerate(self.members):
+            if not active[i]:
+                continue
+            if converged[i]:
+                records[i] = (
+                    abs(member.buses['heat output'].P.val * 1e-6),
+                    member.buses['power input'].P.val * 1e-6,
+                    round(epsilon[i], 3), self.residuals[i],
+                    member.get_offdesign_state()
+                    )
+            else:
+                records[i] = (np.nan, np.nan, np.nan, self.residuals[i], None)
+
+        return records, not converged.all()
+
+    def _solve_offdesign_step(self, targets, init_path=None):
+        """Solve stacked network with every copy at its target point."""
+        for member, target in zip(self.members, targets):
+            self._set_offdesign_point(member, *target)
+        try:
+            converged = self._solve_network(
+                'offdesign', design_path=self.design_path, init_path=init_path,
+                max_iter=self.max_iter
+                )
+        except ValueError:
+            self.nw.reset_topology_reduction_specifications()
+            converged = None
+
+        return converged
+
+    def _solve_network(self, mode, **kwargs):
+        """
+        Solve stacked network and return the convergence of every copy.
+
+        The residuals of a converged copy fluctuate around the accuracy of the
+        fluid property calculations, so that they are rarely small in the
+        same iteration for all copies. A copy is converged if the norm of its
+        residuals fell below `residual_tol` in any iteration without exceeding
+        ten times the tolerance afterwards.
+        """
+        self.nw.solve(mode, **kwargs)
+        history = self.nw.member_residual_history
+        if not len(history):
+            self.residuals = np.full(self.n_instances, np.nan)
+            return np.zeros(self.n_instances, dtype=bool)
+        self.residuals = history[-1]
+        settled = np.cumprod(
+            (history < 10 * self.residual_tol)[::-1], axis=0
+            )[::-1].astype(bool)
+        converged = (settled & (history < self.residual_tol)).any(axis=0)
+        # TESPy only postprocesses if the whole network converged
+        if converged.any() and not self.nw.converged:
+            self.nw.postprocessing()
+
+        return converged
+
+    def _set_offdesign_point(self, member, T_hs_ff, T_cons_ff, pl):
+        """Set boundary conditions of an operating point for one copy."""
+        deltaT_hs = member.params['B1']['T'] - member.params['B2']['T']
+
+        member.conns['B1'].set_attr(T=T_hs_ff)
+        if T_hs_ff <= 7:
+            member.conns['B2'].set_attr(T=2)
+        else:
+            member.conns['B2'].set_attr(T=T_hs_ff - deltaT_hs)
+        member.conns['C3'].set_attr(T=T_cons_ff)
+
+        member.intermediate_states_offdesign(T_hs_ff, T_cons_ff, deltaT_hs)
+
+        member.comps['cons'].set_attr(Q=None)
+        member.conns['A0'].set_attr(m=pl * member.m_design)
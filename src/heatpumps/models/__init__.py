@@ -25,6 +25,7 @@ from .HeatPumpPCIHXTrans import HeatPumpPCIHXTrans
 from .HeatPumpPCTrans import HeatPumpPCTrans
 from .HeatPumpSimple import HeatPumpSimple
 from .HeatPumpSimpleTrans import HeatPumpSimpleTrans
+from .HeatPumpStack import HeatPumpStack
 from .HeatPumpCascadeEcon import HeatPumpCascadeEcon
 from .HeatPumpCascadeEconIHX import HeatPumpCascadeEconIHX
 from .HeatPumpCascadeEconIHXTrans import HeatPumpCascadeEconIHXTrans
@@ -52,7 +53,7 @@ __all__ = [
     'HeatPumpIHX', 'HeatPumpIHXEcon', 'HeatPumpIHXEconTrans', 'HeatPumpIHXPC',
     'HeatPumpIHXPCIHX', 'HeatPumpIHXPCIHXTrans', 'HeatPumpIHXPCTrans',
     'HeatPumpIHXTrans', 'HeatPumpPC', 'HeatPumpPCIHX', 'HeatPumpPCIHXTrans',
-    'HeatPumpPCTrans', 'HeatPumpSimple', 'HeatPumpSimpleTrans',
+    'HeatPumpPCTrans', 'HeatPumpSimple', 'HeatPumpSimpleTrans', 'HeatPumpStack',
     'HeatPumpCascadeEcon', 'HeatPumpCascadeEconIHX', 'HeatPumpCascadeEconIHXTrans',
     'HeatPumpCascadeEconTrans', 'HeatPumpCascadeFlash', 'HeatPumpCascadeFlashTrans',
     'HeatPumpCascadeIC', 'HeatPumpCascadeICTrans', 'HeatPumpCascadeIHXEcon',
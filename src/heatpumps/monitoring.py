@@ -0,0 +1,192 @@
+import numpy as np
+import pandas as pd
+from scipy.signal import lfilter
+
+from heatpumps.performance import evaluate_demand
+
+MEASUREMENT_COLUMNS = ['T_hs_ff', 'T_cons_ff', 'Q', 'P']
+
+
+class PerformanceMonitor:
+    """
+    Streaming comparison of measured operation with the characteristic.
+
+    For every measurement of feed flow temperatures, heat output and power
+    input, the expected COP at the measured heat output is looked up from
+    the characteristic. The relative residual of the power input
+    (`P / P_expected - 1`) is smoothed by an exponentially weighted moving
+    average and standard deviation, which are updated batch by batch with
+    vectorised recursive filters. A sustained excess of power input, e.g.
+    due to fouling of heat exchangers or loss of refrigerant, raises an alert
+    once the smoothed residual exceeds the threshold.
+
+    Parameters
+    ----------
+    partload_char : PartloadCharacteristic
+        Characteristic of the designed heat pump.
+
+    halflife : float
+        Number of valid measurements after which the weight of a measurement
+        in the moving statistics is halved. Defaults to 96.
+
+    threshold : float
+        Absolute value of the smoothed relative residual above which an
+        alert is raised. Defaults to 0.1.
+
+    min_samples : int
+        Number of valid measurements needed before alerts are raised.
+        Defaults to 24.
+
+    capacity_tolerance : float
+        Relative tolerance of measured heat outputs above the maximal heat
+        output of the characteristic. Measurements further above are not
+        evaluated. Defaults to 0.05.
+
+    clamp : bool
+        See `heatpumps.performance.evaluate_demand`. Default is `True`.
+
+    Attributes
+    ----------
+    n_samples : int
+        Number of valid measurements evaluated so far.
+
+    mean, std : float
+        Current moving average and standard deviation of the relative
+        residual of the power input.
+
+    alerts : pd.DataFrame
+        Start (index of the measurement) and smoothed residual of every alert
+        raised so far.
+    """
+
+    def __init__(self, partload_char, halflife=96, threshold=0.1,
+                 min_samples=24, capacity_tolerance=0.05, clamp=True):
+        """Set up the monitor with empty statistics."""
+        self.partload_char = partload_char
+        self.alpha = 1 - 0.5**(1 / halflife)
+        self.threshold = threshold
+        self.min_samples = min_samples
+        self.capacity_tolerance = capacity_tolerance
+        self.clamp = clamp
+        self.reset()
+
+    def reset(self):
+        """Reset the moving statistics and alerts."""
+        self.n_samples = 0
+        self.mean = 0.0
+        self._mean_square = 0.0
+        self.alert_active = False
+        self.alerts = pd.DataFrame(
+            {'start': pd.Series(dtype=object),
+             'residual': pd.Series(dtype=float)}
+            )
+
+    @property
+    def std(self):
+        """Return the moving standard deviation of the residual."""
+        return np.sqrt(max(self._mean_square - self.mean**2, 0.0))
+
+    def _smooth(self, values, initial):
+        """Return the exponentially weighted moving average of values."""
+        if self.n_samples == 0:
+            # start from the first value instead of the initial state
+            initial = values[0]
+        smoothed, _ = lfilter(
+            [self.alpha], [1, self.alpha - 1], values,
+            zi=[(1 - self.alpha) * initial]
+            )
+        return smoothed
+
+    def update(self, measurements):
+        """
+        Evaluate a batch of measurements and update the statistics.
+
+        Parameters
+        ----------
+        measurements : pd.DataFrame
+            Measurements with the columns 'T_hs_ff', 'T_cons_ff', heat output
+            'Q' and power input 'P' in the units of the characteristic.
+            Measurements while the heat pump is off or with missing values
+            are not evaluated.
+
+        Returns
+        -------
+        pd.DataFrame
+            Expected power input 'P_expected' and 'COP_expected', relative
+            residual 'residual', its moving average 'residual_mean' and
+            standard deviation 'residual_std' and the 'alert' state for
+            every measurement.
+        """
+        missing = set(MEASUREMENT_COLUMNS) - set(measurements.columns)
+        if missing:
+            raise KeyError(
+                f'Necessary columns {sorted(missing)} not in measurements. '
+                + f'The necessary columns are: {MEASUREMENT_COLUMNS}'
+                )
+        Q = measurements['Q'].to_numpy(dtype=float)
+        P = measurements['P'].to_numpy(dtype=float)
+        expected = evaluate_demand(
+            self.partload_char, measurements['T_hs_ff'].to_numpy(),
+            measurements['T_cons_ff'].to_numpy(), Q, clamp=self.clamp
+            )
+        with np.errstate(divide='ignore', invalid='ignore'):
+            P_expected = Q / expected['COP']
+            residual = P / P_expected - 1
+        valid = (
+            (Q > 0) & (P > 0) & np.isfinite(residual)
+            & (expected['Q_unmet'] <= self.capacity_tolerance * expected['Q'])
+            )
+        residual[~valid] = np.nan
+
+        n = len(Q)
+        if self.n_samples > 0:
+            previous = (self.mean, self._mean_square)
+        else:
+            previous = (np.nan, np.nan)
+        values = residual[valid]
+        if len(values):
+            smoothed = self._smooth(values, self.mean)
+            smoothed_square = self._smooth(values**2, self._mean_square)
+            self.mean = smoothed[-1]
+            self._mean_square = smoothed_square[-1]
+        else:
+            smoothed = smoothed_square = np.empty(0)
+
+        # measurements without evaluation keep the previous statistics
+        last = np.cumsum(valid) - 1
+        mean = np.where(
+            last >= 0,
+            smoothed[np.maximum(last, 0)] if len(values) else np.nan,
+            previous[0]
+            )
+        mean_square = np.where(
+            last >= 0,
+            smoothed_square[np.maximum(last, 0)] if len(values) else np.nan,
+            previous[1]
+            )
+        std = np.sqrt(np.maximum(mean_square - mean**2, 0))
+        count = self.n_samples + last + 1
+
+        alert = (count >= self.min_samples) & (np.abs(mean) > self.threshold)
+        before = np.concatenate([[self.alert_active], alert[:-1]])
+        starts = np.flatnonzero(alert & ~before)
+        if len(starts):
+            self.alerts = pd.concat([
+                self.alerts,
+                pd.DataFrame({
+                    'start': measurements.index[starts],
+                    'residual': mean[starts]
+                    })
+                ], ignore_index=True)
+
+        self.n_samples = int(count[-1]) if n else self.n_samples
+        self.alert_active = bool(alert[-1]) if n else self.alert_active
+
+        return pd.DataFrame(
+            {
+                'P_expected': P_expected, 'COP_expected': expected['COP'],
+                'residual': residual, 'residual_mean': mean,
+                'residual_std': std, 'alert': alert
+                },
+            index=measurements.index
+            )
@@ -0,0 +1,599 @@
+import os
+
+import numpy as np
+import pandas as pd
+from scipy.sparse import csr_matrix
+
+from heatpumps.characteristic import _axis_weights
+from heatpumps.storage import iter_table
+
+TIMESERIES_COLUMNS = ['T_hs_ff', 'T_cons_ff', 'Q_demand']
+
+
+def _iter_chunks(timeseries, chunksize):
+    """Yield chunks of a DataFrame, an iterable of DataFrames or a file."""
+    if isinstance(timeseries, pd.DataFrame):
+        timeseries = [timeseries]
+    elif isinstance(timeseries, (str, os.PathLike)):
+        timeseries = iter_table(
+            os.fspath(timeseries), columns=TIMESERIES_COLUMNS,
+            chunksize=chunksize
+            )
+    for frame in timeseries:
+        missing = set(TIMESERIES_COLUMNS) - set(frame.columns)
+        if missing:
+            raise KeyError(
+                f'Necessary columns {sorted(missing)} not in timeseries. The '
+                + f'necessary columns are: {TIMESERIES_COLUMNS}'
+                )
+        for start in range(0, len(frame), chunksize):
+            yield frame.iloc[start:start + chunksize]
+
+
+def evaluate_demand(partload_char, T_hs_ff, T_cons_ff, Q_demand, clamp=True):
+    """
+    Evaluate a heat pump covering heat demands at given temperatures.
+
+    Demands above the maximum heat output are covered partially, demands
+    below the minimal heat output are covered by cycling at minimal partload
+    with its COP. Operating points the characteristic has no values for can
+    not be covered at all.
+
+    Parameters
+    ----------
+    partload_char : PartloadCharacteristic
+        Partload characteristic of the heat pump.
+
+    T_hs_ff, T_cons_ff : array
+        Feed flow temperatures of heat source and heat sink.
+
+    Q_demand : array
+        Heat demand in the unit of the heat output of the characteristic.
+
+    clamp : bool
+        Flag to set if temperatures are clamped to the ranges of the
+        characteristic. Otherwise, the demand of time steps out of range is
+        unmet. Default is `True`.
+
+    Returns
+    -------
+    dict
+        Arrays of the (average) partload 'pl', delivered heat output 'Q',
+        power input 'P', 'COP' and unmet heat demand 'Q_unmet'.
+    """
+    T_hs_ff = np.asarray(T_hs_ff, dtype=float)
+    T_cons_ff = np.asarray(T_cons_ff, dtype=float)
+    Q_demand = np.maximum(np.asarray(Q_demand, dtype=float), 0)
+    if clamp:
+        T_hs_ff = np.clip(
+            T_hs_ff, partload_char.T_hs_ff_range[0],
+            partload_char.T_hs_ff_range[-1]
+            )
+        T_cons_ff = np.clip(
+            T_cons_ff, partload_char.T_cons_ff_range[0],
+            partload_char.T_cons_ff_range[-1]
+            )
+
+    pl_range = partload_char.pl_range
+    Q_pl, P_pl = _evaluate_partload(
+        partload_char, T_hs_ff, T_cons_ff, pl_range
+        )
+    return _cover_demand(Q_pl, P_pl, pl_range, Q_demand)
+
+
+def _evaluate_partload(partload_char, T_hs_ff, T_cons_ff, pl_range):
+    """Evaluate heat output and power input at partload ratios (last axis)."""
+    T_hs_ff = np.asarray(T_hs_ff, dtype=float)[..., np.newaxis]
+    T_cons_ff = np.asarray(T_cons_ff, dtype=float)[..., np.newaxis]
+    return (
+        partload_char.evaluate('Q', T_hs_ff, T_cons_ff, pl_range),
+        partload_char.evaluate('P', T_hs_ff, T_cons_ff, pl_range)
+        )
+
+
+def _cover_demand(Q_pl, P_pl, pl_range, Q_demand):
+    """
+    Determine the operation covering heat demands (see `evaluate_demand`).
+
+    Parameters
+    ----------
+    Q_pl, P_pl : np.ndarray
+        Heat output and power input at the support partload ratios of the
+        characteristic with the partload ratios on the last axis.
+
+    pl_range : np.ndarray
+        Support partload ratios of the characteristic.
+
+    Q_demand : np.ndarray
+        Heat demand with the shape of `Q_pl` without the last axis.
+    """
+    Q_demand = np.maximum(np.asarray(Q_demand, dtype=float), 0)
+    Q_pl = np.maximum.accumulate(np.asarray(Q_pl, dtype=float), axis=-1)
+    P_pl = np.asarray(P_pl, dtype=float)
+    Q_target = np.clip(Q_demand, Q_pl[..., 0], Q_pl[..., -1])
+
+    n_pl = len(pl_range)
+    upper = np.minimum(
+        (Q_pl < Q_target[..., np.newaxis]).sum(axis=-1), n_pl - 1
+        )[..., np.newaxis]
+    lower = np.maximum(upper - 1, 0)
+    Q_lower = np.take_along_axis(Q_pl, lower, axis=-1)[..., 0]
+    Q_upper = np.take_along_axis(Q_pl, upper, axis=-1)[..., 0]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        fraction = np.where(
+            Q_upper > Q_lower, (Q_target - Q_lower) / (Q_upper - Q_lower), 0.0
+            )
+    pl = (
+        pl_range[lower[..., 0]]
+        + fraction * (pl_range[upper[..., 0]] - pl_range[lower[..., 0]])
+        )
+    P_lower = np.take_along_axis(P_pl, lower, axis=-1)[..., 0]
+    P_upper = np.take_along_axis(P_pl, upper, axis=-1)[..., 0]
+    P = P_lower + fraction * (P_upper - P_lower)
+    Q = Q_target
+
+    # cycling at minimal partload below the minimal heat output
+    cycling = Q_demand < Q
+    with np.errstate(divide='ignore', invalid='ignore'):
+        share = np.where(cycling, Q_demand / Q, 1.0)
+    pl = pl * share
+    P = P * share
+    Q = np.where(cycling, Q_demand, Q)
+
+    available = ~np.isnan(Q) & ~np.isnan(P)
+    off = ~available | (Q_demand == 0)
+    Q = np.where(off, 0.0, Q)
+    P = np.where(off, 0.0, P)
+    pl = np.where(off, 0.0, pl)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        COP = np.where(off, np.nan, Q / P)
+
+    return {
+        'pl': pl, 'Q': Q, 'P': P, 'COP': COP,
+        'Q_unmet': np.maximum(Q_demand - Q, 0)
+        }
+
+
+def annual_performance(partload_char, timeseries, timestep=1.0,
+                       chunksize=8760, clamp=True, return_timeseries=True):
+    """
+    Calculate the seasonal performance of a heat pump.
+
+    The timeseries are evaluated in chunks, so the memory needed for the
+    evaluation is bounded by the chunk size. Inputs exceeding the memory can
+    be passed as an iterable of DataFrames or a file path, which is read
+    chunk by chunk from disk, in combination with `return_timeseries=False`.
+
+    Parameters
+    ----------
+    partload_char : PartloadCharacteristic
+        Partload characteristic of the heat pump.
+
+    timeseries : pd.DataFrame, iterable of pd.DataFrame or str
+        Timeseries with the columns 'T_hs_ff', 'T_cons_ff' and 'Q_demand'
+        (heat demand in the unit of the heat output of the characteristic).
+        A path to a CSV, Parquet or Feather file is read in chunks with
+        `heatpumps.storage.iter_table`.
+
+    timestep : float
+        Duration of a time step in hours. Defaults to 1.
+
+    chunksize : int
+        Number of time steps evaluated at once. Defaults to 8760.
+
+    clamp : bool
+        See `evaluate_demand`. Default is `True`.
+
+    return_timeseries : bool
+        Flag to set if the timeseries of the results should be returned as
+        well. Default is `True`.
+
+    Returns
+    -------
+    pd.Series or tuple
+        Summary of heat demand, delivered heat, unmet heat demand and
+        electricity use (energies in the unit of the heat output multiplied
+        by hours), the seasonal performance factor 'SPF' and the operating
+        hours. If `return_timeseries` is set, the DataFrame of the hourly
+        results ('pl', 'Q', 'P', 'COP', 'Q_unmet') is returned as well.
+    """
+    totals = {
+        'heat_demand': 0.0, 'heat_delivered': 0.0, 'heat_unmet': 0.0,
+        'electricity': 0.0, 'operating_hours': 0.0
+        }
+    frames = []
+    for chunk in _iter_chunks(timeseries, chunksize):
+        result = evaluate_demand(
+            partload_char, chunk['T_hs_ff'].to_numpy(),
+            chunk['T_cons_ff'].to_numpy(), chunk['Q_demand'].to_numpy(),
+            clamp=clamp
+            )
+        totals['heat_demand'] += (
+            np.maximum(chunk['Q_demand'].to_numpy(dtype=float), 0).sum()
+            * timestep
+            )
+        totals['heat_delivered'] += result['Q'].sum() * timestep
+        totals['heat_unmet'] += result['Q_unmet'].sum() * timestep
+        totals['electricity'] += result['P'].sum() * timestep
+        totals['operating_hours'] += (result['Q'] > 0).sum() * timestep
+        if return_timeseries:
+            frames += [pd.DataFrame(result, index=chunk.index)]
+
+    summary = pd.Series(totals)
+    if summary['electricity'] > 0:
+        summary['SPF'] = summary['heat_delivered'] / summary['electricity']
+    else:
+        summary['SPF'] = np.nan
+
+    if return_timeseries:
+        if frames:
+            results = pd.concat(frames)
+        else:
+            results = pd.DataFrame(
+                columns=['pl', 'Q', 'P', 'COP', 'Q_unmet'], dtype=float
+                )
+        return summary, results
+    return summary
+
+
+def evaluate_fleet(characteristics, sites, scale=None, timestep=1.0,
+                   max_elements=2**23):
+    """
+    Evaluate many heat pumps at many sites.
+
+    All combinations of heat pump units and sites are evaluated like in
+    `annual_performance` (with clamped temperatures). Units sharing the same
+    support grid are evaluated together by broadcasting their stacked support
+    arrays against the timeseries of all sites. The timeseries are processed
+    in chunks, so that no intermediate array exceeds `max_elements` values,
+    and only the summary metrics are accumulated.
+
+    Parameters
+    ----------
+    characteristics : dict, list or CharacteristicStore
+        Partload characteristics of the units, e.g. from `get_partload_char`,
+        as a dict or list, or a store of which all designs are evaluated.
+
+    sites : dict or list of pd.DataFrame
+        Timeseries of equal length of all sites with the columns 'T_hs_ff',
+        'T_cons_ff' and 'Q_demand'.
+
+    scale : float or array
+        Factor the heat demand of the sites is multiplied with per unit, e.g.
+        to scale normalized demand profiles to the size of each unit. Either
+        a scalar, an array with the shape (units,) or (units, sites).
+        Defaults to 1.
+
+    timestep : float
+        Duration of a time step in hours. Defaults to 1.
+
+    max_elements : int
+        Maximum number of values of the intermediate arrays of a chunk.
+
+    Returns
+    -------
+    pd.DataFrame
+        Summary metrics of `annual_performance` with a MultiIndex of 'unit'
+        and 'site'.
+    """
+    if hasattr(characteristics, 'load') and hasattr(characteristics, 'keys'):
+        characteristics = {
+            key: characteristics.load(key) for key in characteristics.keys()
+            }
+    elif not isinstance(characteristics, dict):
+        characteristics = dict(enumerate(characteristics))
+    if not isinstance(sites, dict):
+        sites = dict(enumerate(sites))
+
+    units = list(characteristics)
+    site_names = list(sites)
+    n_units = len(units)
+    n_sites = len(site_names)
+    lengths = {len(site) for site in sites.values()}
+    if len(lengths) > 1:
+        raise ValueError(
+            'The timeseries of all sites have to be of equal length.'
+            )
+    n_steps = lengths.pop() if lengths else 0
+
+    T_hs_ff = np.stack(
+        [site['T_hs_ff'].to_numpy(dtype=float) for site in sites.values()]
+        )
+    T_cons_ff = np.stack(
+        [site['T_cons_ff'].to_numpy(dtype=float) for site in sites.values()]
+        )
+    Q_demand = np.maximum(np.stack(
+        [site['Q_demand'].to_numpy(dtype=float) for site in sites.values()]
+        ), 0)
+    scale = np.broadcast_to(
+        np.asarray(1.0 if scale is None else scale, dtype=float).reshape(
+            (-1, 1) if np.ndim(scale) == 1 else np.shape(scale)
+            ),
+        (n_units, n_sites)
+        )
+
+    metrics = [
+        'heat_demand', 'heat_delivered', 'heat_unmet', 'electricity',
+        'operating_hours'
+        ]
+    totals = {metric: np.zeros((n_units, n_sites)) for metric in metrics}
+    totals['heat_demand'] += scale * Q_demand.sum(axis=1) * timestep
+
+    groups = {}
+    for u, unit in enumerate(units):
+        grid_key = tuple(
+            support_range.tobytes()
+            for support_range in characteristics[unit].grid
+            )
+        groups.setdefault(grid_key, []).append(u)
+
+    for members in groups.values():
+        reference = characteristics[units[members[0]]]
+        n_T_hs_ff = len(reference.T_hs_ff_range)
+        n_T_cons_ff = len(reference.T_cons_ff_range)
+        n_pl = len(reference.pl_range)
+        # support values as (temperature nodes, units * partload ratios)
+        supports = {
+            quantity: np.stack(
+                [characteristics[units[u]].support[quantity] for u in members],
+                axis=2
+                ).reshape(n_T_hs_ff * n_T_cons_ff, len(members) * n_pl)
+            for quantity in ['Q', 'P']
+            }
+
+        chunksize = max(
+            1, max_elements // max(1, len(members) * n_sites * n_pl)
+            )
+        for start in range(0, n_steps, chunksize):
+            stop = min(start + chunksize, n_steps)
+            n_points = n_sites * (stop - start)
+            i0, j0, t0, _ = _axis_weights(
+                reference.T_hs_ff_range, T_hs_ff[:, start:stop].ravel(),
+                clamp=True
+                )
+            i1, j1, t1, _ = _axis_weights(
+                reference.T_cons_ff_range, T_cons_ff[:, start:stop].ravel(),
+                clamp=True
+                )
+            weights = csr_matrix(
+                (
+                    np.concatenate([
+                        (1 - t0) * (1 - t1), (1 - t0) * t1,
+                        t0 * (1 - t1), t0 * t1
+                        ]),
+                    (
+                        np.tile(np.arange(n_points), 4),
+                        np.concatenate([
+                            i0 * n_T_cons_ff + i1, i0 * n_T_cons_ff + j1,
+                            j0 * n_T_cons_ff + i1, j0 * n_T_cons_ff + j1
+                            ])
+                        )
+                    ),
+                shape=(n_points, n_T_hs_ff * n_T_cons_ff)
+                )
+            shape = (n_points, len(members), n_pl)
+            demand = (
+                Q_demand[:, start:stop].reshape(1, n_sites, -1)
+                * scale[members][:, :, np.newaxis]
+                ).reshape(len(members), n_points).T
+            result = _cover_demand(
+                (weights @ supports['Q']).reshape(shape),
+                (weights @ supports['P']).reshape(shape),
+                reference.pl_range, demand
+                )
+
+            sums = {
+                'heat_delivered': result['Q'],
+                'heat_unmet': result['Q_unmet'],
+                'electricity': result['P'],
+                'operating_hours': result['Q'] > 0
+                }
+            for metric, values in sums.items():
+                totals[metric][members] += (
+                    values.T.reshape(len(members), n_sites, -1).sum(axis=2)
+                    * timestep
+                    )
+
+    summary = pd.DataFrame(
+        {metric: values.ravel() for metric, values in totals.items()},
+        index=pd.MultiIndex.from_product(
+            [units, site_names], names=['unit', 'site']
+            )
+        )
+    with np.errstate(divide='ignore', invalid='ignore'):
+        summary['SPF'] = np.where(
+            summary['electricity'] > 0,
+            summary['heat_delivered'] / summary['electricity'],
+            np.nan
+            )
+    return summary
+
+
+def simulate_dispatch(partload_char, timeseries, storage_capacity,
+                      timestep=1.0, partload_min=None, soc_initial=0.5,
+                      soc_on=0.0, storage_loss=0.0, min_runtime=0.0,
+                      clamp=True, return_timeseries=False):
+    """
+    Simulate the rule-based dispatch of a heat pump with a thermal storage.
+
+    The heat pump is switched on as soon as the storage can not cover the
+    heat demand of a time step without falling below the state of charge
+    `soc_on`. Once running, it covers the demand and charges the storage
+    with up to its temperature dependent maximum heat output until the
+    storage is full (and at least for `min_runtime`). Heat outputs below the
+    minimal partload are covered by cycling. Temperatures of the heat sink
+    are taken from the timeseries and are not affected by the storage.
+
+    All storage capacities are simulated in parallel, so only the time steps
+    are iterated.
+
+    Parameters
+    ----------
+    partload_char : PartloadCharacteristic
+        Partload characteristic of the heat pump.
+
+    timeseries : pd.DataFrame
+        Timeseries with the columns 'T_hs_ff', 'T_cons_ff' and 'Q_demand'
+        (heat demand in the unit of the heat output of the characteristic).
+
+    storage_capacity : float or array
+        Capacities of the storages in the unit of the heat output multiplied
+        by hours. A capacity of 0 corresponds to operation without storage.
+
+    timestep : float
+        Duration of a time step in hours. Defaults to 1.
+
+    partload_min : float
+        Minimal partload ratio of the heat pump, e.g. the offdesign parameter
+        'partload_min'. Defaults to the smallest partload ratio of the
+        characteristic.
+
+    soc_initial : float
+        Initial state of charge relative to the capacities. Defaults to 0.5.
+
+    soc_on : float
+        Relative state of charge below which the heat pump is switched on.
+        Defaults to 0.
+
+    storage_loss : float
+        Relative loss of the stored heat per hour. Defaults to 0.
+
+    min_runtime : float
+        Minimal duration in hours the heat pump runs after a start. Defaults
+        to 0.
+
+    clamp : bool
+        See `evaluate_demand`. Default is `True`.
+
+    return_timeseries : bool
+        Flag to set if the timeseries of the results should be returned as
+        well. Default is `False`.
+
+    Returns
+    -------
+    pd.DataFrame or tuple
+        Summary per storage capacity: heat demand, heat delivered to the
+        consumer, heat produced by the heat pump, unmet heat demand,
+        electricity use, operating hours, number of starts and the seasonal
+        performance factor 'SPF' of the heat pump. If `return_timeseries` is
+        set, a dict of the arrays of heat output 'Q', power input 'P', unmet
+        heat demand 'Q_unmet', state of charge 'soc' (at the end of each time
+        step) and on/off state 'on' with the shape (time steps, capacities)
+        is returned as well.
+    """
+    missing = set(TIMESERIES_COLUMNS) - set(timeseries.columns)
+    if missing:
+        raise KeyError(
+            f'Necessary columns {sorted(missing)} not in timeseries. The '
+            + f'necessary columns are: {TIMESERIES_COLUMNS}'
+            )
+    capacity = np.atleast_1d(np.asarray(storage_capacity, dtype=float))
+    if capacity.ndim > 1 or (capacity < 0).any():
+        raise ValueError(
+            'Storage capacities have to be a one-dimensional array of '
+            + 'non-negative values.'
+            )
+
+    pl_range = partload_char.pl_range
+    if partload_min is not None:
+        if not pl_range[0] <= partload_min < pl_range[-1]:
+            raise ValueError(
+                f'Minimal partload {partload_min} is out of the partload '
+                + f'range [{pl_range[0]}, {pl_range[-1]}) of the '
+                + 'characteristic.'
+                )
+        pl_range = np.concatenate([
+            [partload_min], pl_range[pl_range > partload_min]
+            ])
+
+    T_hs_ff = timeseries['T_hs_ff'].to_numpy(dtype=float)
+    T_cons_ff = timeseries['T_cons_ff'].to_numpy(dtype=float)
+    Q_demand = np.maximum(timeseries['Q_demand'].to_numpy(dtype=float), 0)
+    if clamp:
+        T_hs_ff = np.clip(
+            T_hs_ff, partload_char.T_hs_ff_range[0],
+            partload_char.T_hs_ff_range[-1]
+            )
+        T_cons_ff = np.clip(
+            T_cons_ff, partload_char.T_cons_ff_range[0],
+            partload_char.T_cons_ff_range[-1]
+            )
+    Q_pl, P_pl = _evaluate_partload(
+        partload_char, T_hs_ff, T_cons_ff, pl_range
+        )
+    Q_max = np.maximum.accumulate(Q_pl, axis=-1)[:, -1]
+    available = ~np.isnan(Q_max) & ~np.isnan(P_pl).any(axis=-1)
+    Q_max = np.where(available, Q_max, 0.0)
+
+    n_steps = len(Q_demand)
+    n_storages = len(capacity)
+    retention = 1 - storage_loss * timestep
+    soc_threshold = soc_on * capacity
+    runtime_steps = int(np.ceil(min_runtime / timestep - 1e-9))
+
+    Q = np.zeros((n_steps, n_storages))
+    unmet = np.zeros((n_steps, n_storages))
+    soc_ts = np.zeros((n_steps, n_storages))
+    on_ts = np.zeros((n_steps, n_storages), dtype=bool)
+
+    soc = soc_initial * capacity
+    on = np.zeros(n_storages, dtype=bool)
+    runtime = np.zeros(n_storages, dtype=int)
+    for t in range(n_steps):
+        soc = soc * retention
+        demand = Q_demand[t] * timestep
+        needed = soc - demand < soc_threshold
+        on = available[t] & (
+            needed | (on & ((soc < capacity) | (runtime < runtime_steps)))
+            )
+        runtime = np.where(on, runtime + 1, 0)
+
+        # charge the storage to its capacity while running
+        Q_t = np.where(
+            on,
+            np.minimum(
+                np.maximum(Q_demand[t] + (capacity - soc) / timestep, 0),
+                Q_max[t]
+                ),
+            0.0
+            )
+        soc = soc + Q_t * timestep - demand
+        unmet[t] = np.maximum(-soc, 0) / timestep
+        soc = np.clip(soc, 0, capacity)
+        Q[t] = Q_t
+        soc_ts[t] = soc
+        on_ts[t] = on
+
+    result = _cover_demand(
+        Q_pl[:, np.newaxis, :], P_pl[:, np.newaxis, :], pl_range, Q
+        )
+    P = result['P']
+
+    starts = (on_ts & ~np.vstack([np.zeros((1, n_storages), bool),
+                                  on_ts[:-1]])).sum(axis=0)
+    summary = pd.DataFrame(
+        {
+            'heat_demand': np.full(n_storages, Q_demand.sum() * timestep),
+            'heat_delivered': (
+                (Q_demand[:, np.newaxis] - unmet).sum(axis=0) * timestep
+                ),
+            'heat_produced': Q.sum(axis=0) * timestep,
+            'heat_unmet': unmet.sum(axis=0) * timestep,
+            'electricity': P.sum(axis=0) * timestep,
+            'operating_hours': (Q > 0).sum(axis=0) * timestep,
+            'starts': starts
+            },
+        index=pd.Index(capacity, name='storage_capacity')
+        )
+    with np.errstate(divide='ignore', invalid='ignore'):
+        summary['SPF'] = np.where(
+            summary['electricity'] > 0,
+            summary['heat_produced'] / summary['electricity'],
+            np.nan
+            )
+
+    if return_timeseries:
+        return summary, {
+            'Q': Q, 'P': P, 'Q_unmet': unmet, 'soc': soc_ts, 'on': on_ts
+            }
+    return summary
@@ -0,0 +1,376 @@
+import numpy as np
+import pandas as pd
+
+from heatpumps.performance import TIMESERIES_COLUMNS
+from heatpumps.performance import annual_performance
+
+
+def _kmeans_plusplus(distances_to, n_points, n_clusters, rng):
+    """Choose initial centers spread out by squared distance sampling."""
+    centers = [rng.integers(n_points)]
+    closest = distances_to(centers[0])
+    for _ in range(1, n_clusters):
+        total = closest.sum()
+        if total > 0:
+            center = rng.choice(n_points, p=closest / total)
+        else:
+            center = rng.integers(n_points)
+        centers += [center]
+        closest = np.minimum(closest, distances_to(center))
+    return np.array(centers)
+
+
+def _kmeans(profiles, n_clusters, rng, max_iter):
+    """Cluster profiles by Lloyd's algorithm; return labels and centers."""
+    centers = profiles[_kmeans_plusplus(
+        lambda i: ((profiles - profiles[i])**2).sum(axis=1),
+        len(profiles), n_clusters, rng
+        )]
+    labels = None
+    for _ in range(max_iter):
+        distances = (
+            (profiles**2).sum(axis=1)[:, np.newaxis]
+            - 2 * profiles @ centers.T
+            + (centers**2).sum(axis=1)[np.newaxis, :]
+            )
+        new_labels = distances.argmin(axis=1)
+        if labels is not None and (new_labels == labels).all():
+            break
+        labels = new_labels
+        counts = np.bincount(labels, minlength=n_clusters)
+        sums = np.zeros_like(centers)
+        np.add.at(sums, labels, profiles)
+        # keep the previous center of clusters that became empty
+        filled = counts > 0
+        centers[filled] = sums[filled] / counts[filled, np.newaxis]
+
+    cost = ((profiles - centers[labels])**2).sum()
+    return labels, centers, cost
+
+
+def _kmedoids(profiles, n_clusters, rng, max_iter):
+    """Cluster profiles by alternating k-medoids; return labels and medoids."""
+    distances = np.sqrt(np.maximum(
+        (profiles**2).sum(axis=1)[:, np.newaxis]
+        - 2 * profiles @ profiles.T
+        + (profiles**2).sum(axis=1)[np.newaxis, :],
+        0
+        ))
+    medoids = _kmeans_plusplus(
+        lambda i: distances[i]**2, len(profiles), n_clusters, rng
+        )
+    for _ in range(max_iter):
+        labels = distances[:, medoids].argmin(axis=1)
+        new_medoids = medoids.copy()
+        for cluster in range(n_clusters):
+            members = np.flatnonzero(labels == cluster)
+            if len(members):
+                within = distances[np.ix_(members, members)].sum(axis=1)
+                new_medoids[cluster] = members[within.argmin()]
+        if (new_medoids == medoids).all():
+            break
+        medoids = new_medoids
+
+    labels = distances[:, medoids].argmin(axis=1)
+    cost = distances[np.arange(len(profiles)), medoids[labels]].sum()
+    return labels, medoids, cost
+
+
+class RepresentativePeriods:
+    """
+    Representative periods of a timeseries with their weights.
+
+    Instances are created by `cluster_periods`.
+
+    Attributes
+    ----------
+    timeseries : pd.DataFrame
+        Concatenated timeseries of the representative periods with a
+        MultiIndex of 'period' and 'step'.
+
+    weights : pd.Series
+        Number of original periods represented by every representative
+        period.
+
+    labels : np.ndarray
+        Representative period of every original period.
+
+    period_length : int
+        Number of time steps per period.
+
+    n_steps : int
+        Number of time steps of the original timeseries.
+
+    medoids : np.ndarray or None
+        Original period of every representative period if clustered by
+        k-medoids, otherwise `None`.
+    """
+
+    def __init__(self, timeseries, weights, labels, period_length, n_steps,
+                 medoids=None):
+        """Set up representative periods."""
+        self.timeseries = timeseries
+        self.weights = weights
+        self.labels = labels
+        self.period_length = period_length
+        self.n_steps = n_steps
+        self.medoids = medoids
+
+    @property
+    def step_weights(self):
+        """Weight of every time step of the representative timeseries."""
+        return self.weights.reindex(
+            self.timeseries.index.get_level_values('period')
+            ).to_numpy()
+
+    def expand(self, values):
+        """
+        Map values of the representative timeseries to the original one.
+
+        Parameters
+        ----------
+        values : pd.DataFrame, pd.Series or np.ndarray
+            Values of every time step of the representative timeseries, e.g.
+            the result of `arrange_char_timeseries` for `timeseries`.
+
+        Returns
+        -------
+        pd.DataFrame, pd.Series or np.ndarray
+            Values of every time step of the original timeseries with a
+            RangeIndex.
+        """
+        offsets = np.append(
+            0, np.cumsum(
+                self.timeseries.groupby(level='period', sort=False).size()
+                )
+            )
+        period_start = dict(zip(self.weights.index, offsets[:-1]))
+        positions = np.concatenate([
+            period_start[label] + np.arange(
+                min(self.period_length, self.n_steps - i * self.period_length)
+                )
+            for i, label in enumerate(self.labels)
+            ])
+        if isinstance(values, (pd.DataFrame, pd.Series)):
+            expanded = values.iloc[positions]
+            expanded.index = pd.RangeIndex(len(positions))
+            return expanded
+        return np.asarray(values)[positions]
+
+
+def cluster_periods(timeseries, n_clusters, period_length=24,
+                    method='kmedoids', columns=None, n_init=10, max_iter=100,
+                    random_state=None):
+    """
+    Cluster a timeseries into representative periods.
+
+    The timeseries is split into periods (e.g. days or weeks), every column is
+    normalised to the range [0, 1] over the whole timeseries and the
+    concatenated profiles of all columns are clustered. A trailing period
+    shorter than `period_length` is kept as its own representative.
+
+    Parameters
+    ----------
+    timeseries : pd.DataFrame
+        Numeric timeseries, e.g. of the columns 'T_hs_ff', 'T_cons_ff' and
+        'Q_demand'.
+
+    n_clusters : int
+        Number of representative periods (of full length).
+
+    period_length : int
+        Number of time steps per period. Defaults to 24.
+
+    method : str
+        Clustering method. Options are 'kmedoids', which selects original
+        periods as representatives, and 'kmeans', which uses the mean
+        profiles of the clusters. Defaults to 'kmedoids'.
+
+    columns : list
+        Columns to cluster by. Defaults to all columns. The representative
+        periods contain all columns.
+
+    n_init : int
+        Number of runs with different initial centers, of which the one with
+        the lowest cost is kept. Defaults to 10.
+
+    max_iter : int
+        Maximum number of iterations per run. Defaults to 100.
+
+    random_state : int or np.random.Generator
+        Seed of the random initialisation.
+
+    Returns
+    -------
+    RepresentativePeriods
+        Representative periods with their weights.
+    """
+    if method not in ['kmedoids', 'kmeans']:
+        raise ValueError(
+            f"Argument {method} for parameter 'method' is not valid. "
+            + "Choose either 'kmedoids' or 'kmeans'."
+            )
+    if columns is None:
+        columns = list(timeseries.columns)
+    n_steps = len(timeseries)
+    n_periods = n_steps // period_length
+    if not 0 < n_clusters <= n_periods:
+        raise ValueError(
+            f'Number of clusters {n_clusters} has to be between 1 and the '
+            + f'number of full periods {n_periods}.'
+            )
+
+    values = timeseries[columns].to_numpy(dtype=float)
+    minimum = values.min(axis=0)
+    span = values.max(axis=0) - minimum
+    normalised = (values - minimum) / np.where(span > 0, span, 1)
+    profiles = normalised[:n_periods * period_length].reshape(
+        n_periods, period_length, len(columns)
+        ).transpose(0, 2, 1).reshape(n_periods, -1)
+
+    rng = np.random.default_rng(random_state)
+    cluster = _kmedoids if method == 'kmedoids' else _kmeans
+    best = None
+    for _ in range(n_init):
+        result = cluster(profiles, n_clusters, rng, max_iter)
+        if best is None or result[2] < best[2]:
+            best = result
+    labels, centers, _ = best
+
+    counts = np.bincount(labels, minlength=n_clusters)
+    used = np.flatnonzero(counts)
+    labels = np.searchsorted(used, labels)
+    # representatives contain all columns, not only the clustered ones
+    all_values = timeseries.to_numpy(dtype=float)
+    full = all_values[:n_periods * period_length].reshape(
+        n_periods, period_length, timeseries.shape[1]
+        )
+    if method == 'kmedoids':
+        medoids = centers[used]
+        representatives = list(full[medoids])
+    else:
+        medoids = None
+        representatives = [
+            full[labels == cluster].mean(axis=0)
+            for cluster in range(len(used))
+            ]
+    weights = list(counts[used].astype(float))
+
+    if n_steps > n_periods * period_length:
+        representatives += [all_values[n_periods * period_length:]]
+        weights += [1.0]
+        labels = np.append(labels, len(used))
+
+    representative_ts = pd.DataFrame(
+        np.concatenate(representatives), columns=timeseries.columns,
+        index=pd.MultiIndex.from_tuples(
+            [
+                (period, step)
+                for period, representative in enumerate(representatives)
+                for step in range(len(representative))
+                ],
+            names=['period', 'step']
+            )
+        )
+
+    weights = pd.Series(
+        weights, index=pd.RangeIndex(len(weights), name='period'),
+        name='weight'
+        )
+    return RepresentativePeriods(
+        representative_ts, weights, labels, period_length, n_steps,
+        medoids=medoids
+        )
+
+
+def representative_performance(partload_char, periods, timestep=1.0,
+                               clamp=True):
+    """
+    Calculate the seasonal performance of a heat pump from representatives.
+
+    Parameters
+    ----------
+    partload_char : PartloadCharacteristic
+        Partload characteristic of the heat pump.
+
+    periods : RepresentativePeriods
+        Representative periods of a timeseries with the columns 'T_hs_ff',
+        'T_cons_ff' and 'Q_demand'.
+
+    timestep : float
+        Duration of a time step in hours. Defaults to 1.
+
+    clamp : bool
+        See `heatpumps.performance.evaluate_demand`. Default is `True`.
+
+    Returns
+    -------
+    pd.Series
+        Summary of `heatpumps.performance.annual_performance` with every
+        representative time step weighted by its number of occurrences.
+    """
+    _, results = annual_performance(
+        partload_char, periods.timeseries[TIMESERIES_COLUMNS],
+        timestep=timestep, chunksize=max(1, len(periods.timeseries)),
+        clamp=clamp
+        )
+    weights = periods.step_weights * timestep
+    demand = np.maximum(
+        periods.timeseries['Q_demand'].to_numpy(dtype=float), 0
+        )
+    summary = pd.Series({
+        'heat_demand': (weights * demand).sum(),
+        'heat_delivered': (weights * results['Q'].to_numpy()).sum(),
+        'heat_unmet': (weights * results['Q_unmet'].to_numpy()).sum(),
+        'electricity': (weights * results['P'].to_numpy()).sum(),
+        'operating_hours': (weights * (results['Q'].to_numpy() > 0)).sum()
+        })
+    if summary['electricity'] > 0:
+        summary['SPF'] = summary['heat_delivered'] / summary['electricity']
+    else:
+        summary['SPF'] = np.nan
+    return summary
+
+
+def approximation_error(partload_char, timeseries, periods, timestep=1.0,
+                        clamp=True):
+    """
+    Compare the seasonal performance of representatives and full timeseries.
+
+    Parameters
+    ----------
+    partload_char : PartloadCharacteristic
+        Partload characteristic of the heat pump.
+
+    timeseries : pd.DataFrame
+        Full timeseries the representative periods were clustered from.
+
+    periods : RepresentativePeriods
+        Representative periods of `timeseries`.
+
+    timestep : float
+        Duration of a time step in hours. Defaults to 1.
+
+    clamp : bool
+        See `heatpumps.performance.evaluate_demand`. Default is `True`.
+
+    Returns
+    -------
+    pd.DataFrame
+        Summary metrics of the full timeseries ('full') and of the
+        representatives ('representative') with their absolute ('error') and
+        relative error ('relative_error').
+    """
+    report = pd.DataFrame({
+        'full': annual_performance(
+            partload_char, timeseries, timestep=timestep, clamp=clamp,
+            return_timeseries=False
+            ),
+        'representative': representative_performance(
+            partload_char, periods, timestep=timestep, clamp=clamp
+            )
+        })
+    report['error'] = report['representative'] - report['full']
+    with np.errstate(divide='ignore', invalid='ignore'):
+        report['relative_error'] = report['error'] / report['full'].abs()
+    return report
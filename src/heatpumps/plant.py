@@ -0,0 +1,253 @@
+import numpy as np
+import pandas as pd
+from scipy.interpolate import RegularGridInterpolator
+
+from heatpumps.characteristic import PartloadCharacteristic
+from heatpumps.performance import _cover_demand
+
+
+class PlantCharacteristic:
+    """
+    Characteristic of a plant of heat pumps operated in parallel.
+
+    For every pair of feed flow temperatures and every total heat output on
+    an equidistant grid, the load split between the units minimising the
+    total power input is determined by dynamic programming over the units,
+    vectorised over all temperature pairs. Units either are off or run
+    between the minimal and maximal heat output of their characteristic at
+    the respective temperatures. The resulting plant map is queried with
+    `evaluate` or exported as one table with `to_frame`.
+
+    Parameters
+    ----------
+    units : dict or list
+        Partload characteristics of the units or heat pump models (e.g. of
+        different topologies), whose `get_partload_char` is used. Keys of a
+        dict are used as unit names.
+
+    T_hs_ff_range, T_cons_ff_range : array
+        Feed flow temperatures of heat source and sink of the plant map.
+        Default to all support temperatures of the units.
+
+    Q_step : float
+        Step size of the total heat output. The heat outputs of the units are
+        resolved in multiples of it. Defaults to the maximal total heat
+        output divided by `n_steps`.
+
+    n_steps : int
+        Number of steps of the total heat output if `Q_step` is not set.
+        Defaults to 200.
+
+    Attributes
+    ----------
+    Q_range : np.ndarray
+        Total heat outputs of the plant map.
+
+    P : np.ndarray
+        Minimal total power input with the shape (T_hs_ff, T_cons_ff, Q). It
+        is NaN for infeasible total heat outputs.
+
+    Q_units : np.ndarray
+        Optimal heat output of every unit with the shape
+        (T_hs_ff, T_cons_ff, Q, units).
+
+    n_running : np.ndarray
+        Number of running units with the shape (T_hs_ff, T_cons_ff, Q).
+    """
+
+    dims = ['T_hs_ff', 'T_cons_ff', 'Q']
+
+    def __init__(self, units, T_hs_ff_range=None, T_cons_ff_range=None,
+                 Q_step=None, n_steps=200):
+        """Compute the optimal load splits of the plant map."""
+        if not isinstance(units, dict):
+            units = {f'unit_{i}': unit for i, unit in enumerate(units)}
+        self.units = {
+            name: (
+                unit if isinstance(unit, PartloadCharacteristic)
+                else unit.get_partload_char()
+                )
+            for name, unit in units.items()
+            }
+        if not self.units:
+            raise ValueError('A plant needs at least one unit.')
+
+        if T_hs_ff_range is None:
+            T_hs_ff_range = np.unique(np.concatenate([
+                unit.T_hs_ff_range for unit in self.units.values()
+                ]))
+        if T_cons_ff_range is None:
+            T_cons_ff_range = np.unique(np.concatenate([
+                unit.T_cons_ff_range for unit in self.units.values()
+                ]))
+        self.T_hs_ff_range = np.asarray(T_hs_ff_range, dtype=float)
+        self.T_cons_ff_range = np.asarray(T_cons_ff_range, dtype=float)
+
+        # heat output and power input of the units at the support partload
+        # ratios for all temperature pairs; NaN where a unit has no data
+        T_hs_ff, T_cons_ff = np.meshgrid(
+            self.T_hs_ff_range, self.T_cons_ff_range, indexing='ij'
+            )
+        curves = {}
+        for name, unit in self.units.items():
+            curves[name] = [
+                unit.evaluate(
+                    quantity, T_hs_ff[..., np.newaxis],
+                    T_cons_ff[..., np.newaxis], unit.pl_range
+                    )
+                for quantity in ['Q', 'P']
+                ]
+
+        Q_total_max = sum(
+            np.nanmax(Q_pl, initial=0) for Q_pl, _ in curves.values()
+            )
+        if not Q_total_max > 0:
+            raise ValueError('The units do not have any positive heat output.')
+        if Q_step is None:
+            Q_step = Q_total_max / n_steps
+        else:
+            n_steps = int(np.ceil(Q_total_max / Q_step - 1e-9))
+        self.Q_step = Q_step
+        self.Q_range = np.arange(n_steps + 1) * Q_step
+
+        costs = [
+            self._unit_costs(unit, *curves[name])
+            for name, unit in self.units.items()
+            ]
+        self.P, self.Q_units = self._split(costs)
+        self.n_running = np.where(
+            np.isnan(self.P), np.nan, (self.Q_units > 0).sum(axis=-1)
+            )
+        self._interpolators = {}
+
+    @property
+    def names(self):
+        """Return the names of the units."""
+        return list(self.units)
+
+    @property
+    def grid(self):
+        """Return the support ranges of the plant map."""
+        return self.T_hs_ff_range, self.T_cons_ff_range, self.Q_range
+
+    def _unit_costs(self, unit, Q_pl, P_pl):
+        """Return the power input of a unit at the grid of heat outputs."""
+        shape = Q_pl.shape[:-1] + (len(self.Q_range), Q_pl.shape[-1])
+        result = _cover_demand(
+            np.broadcast_to(Q_pl[..., np.newaxis, :], shape),
+            np.broadcast_to(P_pl[..., np.newaxis, :], shape),
+            unit.pl_range, self.Q_range
+            )
+        Q_sorted = np.maximum.accumulate(Q_pl, axis=-1)
+        tolerance = 1e-9 * self.Q_step
+        feasible = (
+            (self.Q_range >= Q_sorted[..., :1] - tolerance)
+            & (self.Q_range <= Q_sorted[..., -1:] + tolerance)
+            & ~np.isnan(result['P'])
+            )
+        costs = np.where(feasible, result['P'], np.inf)
+        costs[..., 0] = 0.0
+        return costs
+
+    def _split(self, costs):
+        """Minimise the total power input by dynamic programming."""
+        n_Q = len(self.Q_range)
+        total = costs[0]
+        choices = [None]
+        for unit_costs in costs[1:]:
+            best = np.full_like(total, np.inf)
+            choice = np.zeros(total.shape, dtype=np.intp)
+            # min-plus convolution: unit runs at step j, the others at k - j
+            for j in range(n_Q):
+                candidate = total[..., :n_Q - j] + unit_costs[..., j:j + 1]
+                better = candidate < best[..., j:]
+                best[..., j:] = np.where(better, candidate, best[..., j:])
+                choice[..., j:] = np.where(better, j, choice[..., j:])
+            total = best
+            choices += [choice]
+
+        # backtrack the steps of all units for all grid points at once
+        steps = np.broadcast_to(np.arange(n_Q), total.shape).copy()
+        Q_units = np.zeros(total.shape + (len(costs),))
+        for i in range(len(costs) - 1, 0, -1):
+            step = np.take_along_axis(choices[i], steps, axis=-1)
+            Q_units[..., i] = step * self.Q_step
+            steps -= step
+        Q_units[..., 0] = steps * self.Q_step
+
+        feasible = np.isfinite(total)
+        Q_units[~feasible] = np.nan
+        return np.where(feasible, total, np.nan), Q_units
+
+    def evaluate(self, T_hs_ff, T_cons_ff, Q):
+        """
+        Evaluate the plant map.
+
+        The power input is interpolated linearly, the load split and number
+        of running units are taken from the closest point of the plant map.
+
+        Parameters
+        ----------
+        T_hs_ff, T_cons_ff : float or array
+            Feed flow temperatures of heat source and sink.
+
+        Q : float or array
+            Total heat output of the plant.
+
+        Returns
+        -------
+        dict
+            Total power input 'P', 'COP', number of running units 'n_running'
+            and heat output of the units 'Q_units' (with the units on the
+            last axis). Out of range or infeasible points are NaN.
+        """
+        T_hs_ff, T_cons_ff, Q = np.broadcast_arrays(
+            np.asarray(T_hs_ff, dtype=float),
+            np.asarray(T_cons_ff, dtype=float),
+            np.asarray(Q, dtype=float)
+            )
+        points = np.stack([T_hs_ff, T_cons_ff, Q], axis=-1)
+        if 'linear' not in self._interpolators:
+            self._interpolators['linear'] = RegularGridInterpolator(
+                self.grid, self.P, bounds_error=False, fill_value=np.nan
+                )
+            self._interpolators['nearest'] = RegularGridInterpolator(
+                self.grid,
+                np.concatenate(
+                    [self.Q_units, self.n_running[..., np.newaxis]], axis=-1
+                    ),
+                method='nearest', bounds_error=False, fill_value=np.nan
+                )
+        P = self._interpolators['linear'](points)
+        nearest = self._interpolators['nearest'](points)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            COP = np.where(P > 0, Q / P, np.nan)
+        return {
+            'P': P, 'COP': COP, 'n_running': nearest[..., -1],
+            'Q_units': nearest[..., :-1]
+            }
+
+    def to_frame(self):
+        """
+        Return the plant map as a DataFrame.
+
+        Returns
+        -------
+        pd.DataFrame
+            Total power input 'P', 'COP', number of running units 'n_running'
+            and the heat output of every unit with a MultiIndex of 'T_hs_ff',
+            'T_cons_ff' and 'Q'.
+        """
+        multiindex = pd.MultiIndex.from_product(self.grid, names=self.dims)
+        plant_map = pd.DataFrame(index=multiindex)
+        plant_map['P'] = self.P.ravel()
+        with np.errstate(divide='ignore', invalid='ignore'):
+            plant_map['COP'] = np.where(
+                plant_map['P'] > 0,
+                plant_map.index.get_level_values('Q') / plant_map['P'],
+                np.nan
+                )
+        plant_map['n_running'] = self.n_running.ravel()
+        for i, name in enumerate(self.names):
+            plant_map[f'Q_{name}'] = self.Q_units[..., i].ravel()
+        return plant_map
@@ -0,0 +1,156 @@
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from heatpumps.performance import simulate_dispatch
+
+
+def annuity_factor(interest_rate, lifetime):
+    """Return the factor converting an investment into annual payments."""
+    if interest_rate == 0:
+        return 1 / lifetime
+    growth = (1 + interest_rate)**lifetime
+    return interest_rate * growth / (growth - 1)
+
+
+def _evaluate_capacity(partload_char, timeseries, storage_capacities,
+                       dispatch_kwargs):
+    """Evaluate the operation of one heat pump size with all storages."""
+    return simulate_dispatch(
+        partload_char, timeseries, storage_capacities, **dispatch_kwargs
+        )
+
+
+def size_capacity(hp, timeseries, capacities, ref_year, current_year,
+                  electricity_price, storage_capacities=0.0,
+                  storage_cost=0.0, unmet_penalty=1e4, interest_rate=0.05,
+                  lifetime=20, partload_char=None, n_jobs=1,
+                  cost_kwargs=None, **kwargs):
+    """
+    Size the heat pump (and storage) for a heat demand profile.
+
+    All combinations of candidate heat pump capacities and storage capacities
+    are evaluated by their total annual cost consisting of the annuity of the
+    investment (`calc_cost` of the heat pump and a specific storage cost),
+    the cost of the electricity use and a penalty for unmet heat demand.
+
+    Neither design nor offdesign simulations are repeated for the candidates:
+    with unchanged intensive parameters, the characteristic and the design
+    parameters of the components of the heat pump scale linearly with the
+    nominal heat output, so they are derived from the simulated heat pump.
+    The storage capacities of a heat pump size are simulated together with
+    `heatpumps.performance.simulate_dispatch` and the heat pump sizes can be
+    evaluated in parallel processes.
+
+    Parameters
+    ----------
+    hp : HeatPumpBase
+        Heat pump model of which the design simulation was run. The
+        investment is based on the component quantities stored after the
+        design simulation, so that offdesign simulations run before do not
+        affect it.
+
+    timeseries : pd.DataFrame
+        Timeseries with the columns 'T_hs_ff', 'T_cons_ff' and 'Q_demand'
+        (heat demand in MW).
+
+    capacities : array
+        Candidate nominal heat outputs of the heat pump in MW.
+
+    ref_year, current_year : int or str
+        See `calc_cost`.
+
+    electricity_price : float
+        Price of electricity in the currency of the component cost per MWh.
+
+    storage_capacities : float or array
+        Candidate capacities of the thermal storage in MWh. Defaults to 0
+        (without storage).
+
+    storage_cost : float
+        Specific investment of the storage per MWh of capacity. Defaults to
+        0.
+
+    unmet_penalty : float
+        Penalty per MWh of unmet heat demand. Defaults to 1e4.
+
+    interest_rate : float
+        Interest rate of the annuity. Defaults to 0.05.
+
+    lifetime : int
+        Lifetime of the investments in years. Defaults to 20.
+
+    partload_char : PartloadCharacteristic
+        Partload characteristic of `hp`. Defaults to the result of
+        `hp.get_partload_char`.
+
+    n_jobs : int
+        Number of processes evaluating the heat pump sizes in parallel.
+        Defaults to 1.
+
+    cost_kwargs : dict
+        Further keyword arguments of `calc_cost`, e.g. heat transfer
+        coefficients.
+
+    kwargs : dict
+        Keyword arguments of `heatpumps.performance.simulate_dispatch`, e.g.
+        'timestep' or 'soc_on'. The minimal partload defaults to the
+        offdesign parameter 'partload_min'.
+
+    Returns
+    -------
+    tuple
+        Series of the optimal candidate and DataFrame of all candidates with
+        a MultiIndex of 'capacity' and 'storage_capacity', containing the
+        investments, the annual cost and the summary of `simulate_dispatch`.
+    """
+    if partload_char is None:
+        partload_char = hp.get_partload_char()
+    cost_kwargs = cost_kwargs or {}
+    kwargs.setdefault(
+        'partload_min',
+        max(hp.params['offdesign']['partload_min'], partload_char.pl_range[0])
+        )
+
+    capacities = np.atleast_1d(np.asarray(capacities, dtype=float))
+    storage_capacities = np.atleast_1d(
+        np.asarray(storage_capacities, dtype=float)
+        )
+    Q_nom = abs(hp.params['cons']['Q']) * 1e-6
+    factors = capacities / Q_nom
+
+    investments = []
+    for factor in factors:
+        hp.calc_cost(ref_year, current_year, scale=factor, **cost_kwargs)
+        investments += [hp.cost_total]
+    # restore the cost of the simulated design
+    hp.calc_cost(ref_year, current_year, **cost_kwargs)
+
+    jobs = [
+        (partload_char.scale(factor), timeseries, storage_capacities, kwargs)
+        for factor in factors
+        ]
+    if n_jobs > 1:
+        with ProcessPoolExecutor(max_workers=n_jobs) as executor:
+            summaries = list(executor.map(_evaluate_capacity, *zip(*jobs)))
+    else:
+        summaries = [_evaluate_capacity(*job) for job in jobs]
+
+    results = pd.concat(
+        summaries, keys=capacities, names=['capacity', 'storage_capacity']
+        )
+    results.insert(
+        0, 'investment_hp', np.repeat(investments, len(storage_capacities))
+        )
+    results.insert(
+        1, 'investment_storage',
+        results.index.get_level_values('storage_capacity') * storage_cost
+        )
+    annuity = annuity_factor(interest_rate, lifetime)
+    results['annual_cost'] = (
+        (results['investment_hp'] + results['investment_storage']) * annuity
+        + results['electricity'] * electricity_price
+        + results['heat_unmet'] * unmet_penalty
+        )
+    return results.loc[results['annual_cost'].idxmin()], results
@@ -0,0 +1,586 @@
+import hashlib
+import json
+import os
+import queue
+import threading
+from importlib.metadata import PackageNotFoundError
+from importlib.metadata import version
+
+import numpy as np
+import pandas as pd
+
+from heatpumps.characteristic import PartloadCharacteristic
+
+METADATA_KEY = b'heatpumps'
+TABLE_FORMATS = {
+    '.parquet': 'parquet', '.pq': 'parquet',
+    '.feather': 'feather', '.arrow': 'feather'
+    }
+
+
+def _import_pyarrow():
+    """Import pyarrow, which is an optional dependency of heatpumps."""
+    try:
+        import pyarrow
+    except ImportError as e:
+        raise ImportError(
+            'Columnar export and import of results requires pyarrow. Please '
+            + 'install it, e.g. with "pip install heatpumps[io]".'
+            ) from e
+    return pyarrow
+
+
+def _table_format(path, fmt=None):
+    """Return the table format of a file path."""
+    if fmt is None:
+        ext = os.path.splitext(path)[1].lower()
+        if ext not in TABLE_FORMATS:
+            raise ValueError(
+                f'Can not infer the table format of file extension "{ext}". '
+                + f'Valid extensions are: {list(TABLE_FORMATS)}'
+                )
+        fmt = TABLE_FORMATS[ext]
+    if fmt not in ['parquet', 'feather']:
+        raise ValueError(
+            f'Table format {fmt} is not valid. Choose either "parquet" or '
+            + '"feather".'
+            )
+    return fmt
+
+
+def params_hash(params):
+    """Return a short hash identifying a parameter dictionary."""
+    serialized = json.dumps(params, sort_keys=True, default=str)
+    return hashlib.sha256(serialized.encode()).hexdigest()[:16]
+
+
+def model_metadata(hp):
+    """
+    Collect metadata identifying the heat pump model of exported results.
+
+    Parameters
+    ----------
+    hp : HeatPumpBase
+        Instance of the heat pump model the results belong to.
+
+    Returns
+    -------
+    dict
+        Parameter hash, topology, refrigerant(s) and software versions.
+    """
+    setup = hp.params['setup']
+    if 'refrig' in setup:
+        refrigerant = setup['refrig']
+    else:
+        refrigerant = [setup['refrig1'], setup['refrig2']]
+
+    versions = {}
+    for package in ['heatpumps', 'tespy', 'CoolProp', 'numpy', 'pandas']:
+        try:
+            versions[package] = version(package)
+        except PackageNotFoundError:
+            versions[package] = None
+
+    return {
+        'params_hash': params_hash(hp.params),
+        'topology': setup['type'],
+        'refrigerant': refrigerant,
+        'versions': versions
+        }
+
+
+def write_table(df, path, metadata=None, fmt=None):
+    """
+    Write a DataFrame to a typed, columnar Parquet or Feather file.
+
+    The index is stored as regular columns and restored on reading.
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        DataFrame to write, e.g. `results_offdesign`, a partload
+        characteristic or a linear model.
+
+    path : str
+        Path of the file to write.
+
+    metadata : dict
+        JSON serializable metadata embedded in the file schema, e.g. the
+        result of `model_metadata`.
+
+    fmt : str
+        Table format, either 'parquet' or 'feather'. Inferred from the file
+        extension if not set.
+    """
+    pa = _import_pyarrow()
+    fmt = _table_format(path, fmt)
+
+    table = pa.Table.from_pandas(df.infer_objects())
+    schema_metadata = dict(table.schema.metadata or {})
+    schema_metadata[METADATA_KEY] = json.dumps(metadata or {}).encode()
+    table = table.replace_schema_metadata(schema_metadata)
+
+    if fmt == 'parquet':
+        import pyarrow.parquet as pq
+        pq.write_table(table, path)
+    else:
+        import pyarrow.feather as feather
+        feather.write_feather(table, path)
+
+
+def _read_schema(path, fmt):
+    """Read the schema of a Parquet or Feather file without its data."""
+    pa = _import_pyarrow()
+    if fmt == 'parquet':
+        import pyarrow.parquet as pq
+        return pq.read_schema(path)
+    else:
+        return pa.ipc.open_file(pa.memory_map(path, 'r')).schema
+
+
+def read_metadata(path, fmt=None):
+    """Read the metadata embedded by `write_table` without reading data."""
+    schema = _read_schema(path, _table_format(path, fmt))
+    return json.loads((schema.metadata or {}).get(METADATA_KEY, b'{}'))
+
+
+def read_table(path, columns=None, fmt=None):
+    """
+    Read a DataFrame written by `write_table`.
+
+    Parameters
+    ----------
+    path : str
+        Path of the file to read.
+
+    columns : list
+        Columns to read. Only these columns (and the index) are loaded from
+        the file. Reads all columns if not set.
+
+    fmt : str
+        Table format, either 'parquet' or 'feather'. Inferred from the file
+        extension if not set.
+
+    Returns
+    -------
+    pd.DataFrame
+        DataFrame with the restored index.
+    """
+    _import_pyarrow()
+    fmt = _table_format(path, fmt)
+
+    if columns is not None:
+        pandas_metadata = _read_schema(path, fmt).pandas_metadata or {}
+        index_columns = [
+            col for col in pandas_metadata.get('index_columns', [])
+            if isinstance(col, str)
+            ]
+        columns = index_columns + [
+            col for col in columns if col not in index_columns
+            ]
+
+    if fmt == 'parquet':
+        import pyarrow.parquet as pq
+        table = pq.read_table(path, columns=columns, memory_map=True)
+    else:
+        import pyarrow.feather as feather
+        table = feather.read_table(path, columns=columns, memory_map=True)
+
+    return table.to_pandas()
+
+
+def _prefetch(iterator, size):
+    """Read items of an iterator ahead in a background thread."""
+    buffer = queue.Queue(maxsize=size)
+    stop = threading.Event()
+    done = object()
+
+    def produce():
+        try:
+            for item in iterator:
+                while not stop.is_set():
+                    try:
+                        buffer.put((item, None), timeout=0.1)
+                        break
+                    except queue.Full:
+                        continue
+                if stop.is_set():
+                    return
+            buffer.put((done, None))
+        except Exception as e:
+            buffer.put((done, e))
+
+    thread = threading.Thread(target=produce, daemon=True)
+    thread.start()
+    try:
+        while True:
+            item, error = buffer.get()
+            if error is not None:
+                raise error
+            if item is done:
+                return
+            yield item
+    finally:
+        stop.set()
+
+
+def iter_table(path, columns=None, chunksize=100000, fmt=None, prefetch=1,
+               **kwargs):
+    """
+    Iterate over a CSV, Parquet or Feather file in chunks of rows.
+
+    Only one chunk (plus the prefetched ones) is held in memory at a time, so
+    files larger than the memory can be evaluated, e.g. by passing the chunks
+    to `heatpumps.performance.annual_performance`. The next chunks are read
+    in a background thread while the current one is processed.
+
+    Parameters
+    ----------
+    path : str
+        Path of the file to read.
+
+    columns : list
+        Columns to read. Reads all columns if not set. For CSV files, they are
+        passed on as `usecols`, so they have to include the index column.
+
+    chunksize : int
+        Maximum number of rows per chunk. Defaults to 100000.
+
+    fmt : str
+        File format, either 'csv', 'parquet' or 'feather'. Inferred from the
+        file extension if not set.
+
+    prefetch : int
+        Number of chunks read ahead in a background thread. Chunks are read
+        on demand if set to 0. Defaults to 1.
+
+    kwargs : dict
+        Keyword arguments of `pd.read_csv` for CSV files, e.g. 'sep' or
+        'index_col'.
+
+    Yields
+    ------
+    pd.DataFrame
+        Chunk of the table.
+    """
+    if fmt is None and os.path.splitext(path)[1].lower() == '.csv':
+        fmt = 'csv'
+    if fmt == 'csv':
+        chunks = pd.read_csv(
+            path, usecols=columns, chunksize=chunksize, **kwargs
+            )
+    else:
+        fmt = _table_format(path, fmt)
+        chunks = _iter_columnar(path, columns, chunksize, fmt)
+
+    if prefetch > 0:
+        chunks = _prefetch(chunks, prefetch)
+    yield from chunks
+
+
+def _iter_columnar(path, columns, chunksize, fmt):
+    """Yield chunks of a Parquet or Feather file as DataFrames."""
+    pa = _import_pyarrow()
+    if columns is not None:
+        pandas_metadata = _read_schema(path, fmt).pandas_metadata or {}
+        index_columns = [
+            col for col in pandas_metadata.get('index_columns', [])
+            if isinstance(col, str)
+            ]
+        columns = index_columns + [
+            col for col in columns if col not in index_columns
+            ]
+
+    if fmt == 'parquet':
+        import pyarrow.parquet as pq
+        batches = pq.ParquetFile(path, memory_map=True).iter_batches(
+            batch_size=chunksize, columns=columns
+            )
+    else:
+        reader = pa.ipc.open_file(pa.memory_map(path, 'r'))
+        batches = (
+            reader.get_batch(i).slice(offset, chunksize)
+            for i in range(reader.num_record_batches)
+            for offset in range(0, reader.get_batch(i).num_rows, chunksize)
+            )
+    for batch in batches:
+        if fmt == 'feather' and columns is not None:
+            batch = batch.select(columns)
+        yield batch.to_pandas()
+
+
+def write_partload_char(partload_char, path, metadata=None, fmt=None):
+    """
+    Write the support points of a partload characteristic to a file.
+
+    Parameters
+    ----------
+    partload_char : PartloadCharacteristic
+        Characteristic to write. Only its support points are stored, which
+        are sufficient to restore it with `read_partload_char`.
+
+    path : str
+        Path of the file to write.
+
+    metadata : dict
+        JSON serializable metadata embedded in the file schema.
+
+    fmt : str
+        Table format, either 'parquet' or 'feather'. Inferred from the file
+        extension if not set.
+    """
+    multiindex = pd.MultiIndex.from_product(
+        partload_char.grid, names=partload_char.dims
+        )
+    support = pd.DataFrame(
+        {
+            quantity: array.ravel()
+            for quantity, array in partload_char.support.items()
+            },
+        index=multiindex
+        )
+    support['reconstructed'] = partload_char.reconstructed.ravel()
+    write_table(support, path, metadata=metadata, fmt=fmt)
+
+
+def read_partload_char(path, fmt=None):
+    """Restore a partload characteristic written by `write_partload_char`."""
+    support = read_table(path, fmt=fmt)
+    grid = [
+        np.unique(support.index.get_level_values(dim))
+        for dim in PartloadCharacteristic.dims
+        ]
+    shape = tuple(len(support_range) for support_range in grid)
+    support = support.sort_index()
+
+    partload_char = PartloadCharacteristic(
+        *grid,
+        *[support[quantity].to_numpy().reshape(shape)
+          for quantity in ['Q', 'P', 'epsilon']],
+        dtype=support['Q'].dtype
+        )
+    partload_char.reconstructed = (
+        support['reconstructed'].to_numpy().reshape(shape)
+        )
+    return partload_char
+
+
+def write_milp_coefficients(coefficients, path, metadata=None,
+                            compress=False):
+    """
+    Write MILP coefficients to a NumPy archive readable without pandas.
+
+    The archive contains the arrays 'columns', 'coefficients' and 'index' of
+    `HeatPumpBase.get_milp_coefficients` and the JSON serialized 'metadata'.
+    It is read with `np.load(path)` or `read_milp_coefficients`.
+
+    Parameters
+    ----------
+    coefficients : dict
+        Result of `HeatPumpBase.get_milp_coefficients`.
+
+    path : str
+        Path of the file to write (usually with the extension '.npz').
+
+    metadata : dict
+        JSON serializable metadata, e.g. the result of `model_metadata`.
+
+    compress : bool
+        Flag to set if the archive is compressed. Default is `False`.
+    """
+    save = np.savez_compressed if compress else np.savez
+    save(
+        path,
+        columns=np.asarray(coefficients['columns'], dtype=str),
+        coefficients=coefficients['coefficients'],
+        index=coefficients['index'],
+        metadata=np.asarray(json.dumps(metadata or {}))
+        )
+
+
+def read_milp_coefficients(path):
+    """
+    Read MILP coefficients written by `write_milp_coefficients`.
+
+    Returns
+    -------
+    tuple
+        Dict of 'columns', 'coefficients' and 'index' like the result of
+        `HeatPumpBase.get_milp_coefficients` and the metadata dict.
+    """
+    with np.load(path, allow_pickle=False) as archive:
+        coefficients = {
+            'columns': archive['columns'].tolist(),
+            'coefficients': archive['coefficients'],
+            'index': archive['index']
+            }
+        metadata = json.loads(archive['metadata'].item())
+    return coefficients, metadata
+
+
+class CharacteristicStore:
+    """
+    Memory-mapped store of the partload characteristics of many designs.
+
+    Every characteristic is stored as one binary NumPy file containing the
+    tensor of 'Q', 'P', 'COP' and 'epsilon' with the shape
+    (4, T_hs_ff, T_cons_ff, pl) in a common directory. An index file maps the
+    keys of the designs (e.g. `params_hash` of the model parameters) to their
+    files, grids and metadata. Reading maps the files into memory, so only
+    the slices actually accessed are loaded and no deserialisation is needed.
+
+    Parameters
+    ----------
+    path : str
+        Directory of the store. It is created if it does not exist.
+    """
+
+    quantities = ['Q', 'P', 'COP', 'epsilon']
+    index_file = 'index.json'
+
+    def __init__(self, path):
+        """Open or create store directory and read index."""
+        self.path = path
+        os.makedirs(self.path, exist_ok=True)
+        index_path = os.path.join(self.path, self.index_file)
+        if os.path.isfile(index_path):
+            with open(index_path, 'r', encoding='utf-8') as file:
+                self.index = json.load(file)
+        else:
+            self.index = {}
+
+    def __contains__(self, key):
+        """Check if a design is part of the store."""
+        return key in self.index
+
+    def __len__(self):
+        """Return the number of designs in the store."""
+        return len(self.index)
+
+    def keys(self):
+        """Return the keys of all designs in the store."""
+        return list(self.index)
+
+    def _write_index(self):
+        """Write the index file of the store."""
+        index_path = os.path.join(self.path, self.index_file)
+        tmp_path = index_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as file:
+            json.dump(self.index, file, indent=4)
+        os.replace(tmp_path, index_path)
+
+    def add(self, key, partload_char, resolution=None, dtype=None,
+            metadata=None):
+        """
+        Add the characteristic of a design to the store.
+
+        Parameters
+        ----------
+        key : str
+            Key of the design, e.g. `params_hash` of the model parameters. An
+            existing design with the same key is overwritten.
+
+        partload_char : PartloadCharacteristic
+            Characteristic of the design.
+
+        resolution : dict
+            Step size per dimension the characteristic is stored in (see
+            `PartloadCharacteristic.fullranges`). The support points are
+            stored if not set.
+
+        dtype : str or np.dtype
+            Floating point type of the stored tensor. Defaults to the dtype of
+            the characteristic.
+
+        metadata : dict
+            JSON serializable metadata of the design, e.g. the result of
+            `model_metadata`.
+        """
+        if resolution is not None:
+            partload_char = partload_char.resample(resolution=resolution)
+        dtype = partload_char.dtype if dtype is None else np.dtype(dtype)
+
+        filename = f'{hashlib.sha256(key.encode()).hexdigest()[:16]}.npy'
+        shape = (len(self.quantities),) + partload_char.support['Q'].shape
+        # the support arrays may be mapped from the file of the design, so
+        # the tensor is written to a temporary file replacing it afterwards
+        tensor_path = os.path.join(self.path, filename)
+        tmp_path = tensor_path + '.tmp'
+        tensor = np.lib.format.open_memmap(
+            tmp_path, mode='w+', dtype=dtype, shape=shape
+            )
+        tensor[0] = partload_char.support['Q']
+        tensor[1] = partload_char.support['P']
+        tensor[2] = partload_char.support['Q'] / partload_char.support['P']
+        tensor[3] = partload_char.support['epsilon']
+        tensor.flush()
+        del tensor
+        os.replace(tmp_path, tensor_path)
+
+        self.index[key] = {
+            'file': filename,
+            'coords': {
+                dim: support_range.tolist()
+                for dim, support_range in partload_char.coords.items()
+                },
+            'metadata': metadata or {}
+            }
+        self._write_index()
+
+    def remove(self, key):
+        """Remove a design and its file from the store."""
+        entry = self.index.pop(key)
+        os.remove(os.path.join(self.path, entry['file']))
+        self._write_index()
+
+    def coords(self, key):
+        """Return the grid of a design labelled by its dimensions."""
+        return {
+            dim: np.asarray(values)
+            for dim, values in self.index[key]['coords'].items()
+            }
+
+    def metadata(self, key):
+        """Return the metadata of a design."""
+        return self.index[key]['metadata']
+
+    def get(self, key, quantity=None):
+        """
+        Return a read-only memory-mapped view of the tensor of a design.
+
+        Parameters
+        ----------
+        key : str
+            Key of the design.
+
+        quantity : str
+            Quantity to return, one of 'Q', 'P', 'COP' and 'epsilon'. Returns
+            the tensor of all quantities if not set.
+
+        Returns
+        -------
+        np.memmap
+            View with the shape (T_hs_ff, T_cons_ff, pl) of a quantity or
+            (4, T_hs_ff, T_cons_ff, pl) of all quantities.
+        """
+        if key not in self.index:
+            raise KeyError(f'Design {key} is not part of the store.')
+        tensor = np.load(
+            os.path.join(self.path, self.index[key]['file']), mmap_mode='r'
+            )
+        if quantity is None:
+            return tensor
+        if quantity not in self.quantities:
+            raise KeyError(
+                f'Quantity {quantity} is not part of the store. Choose one '
+                + f'of {self.quantities}.'
+                )
+        return tensor[self.quantities.index(quantity)]
+
+    def load(self, key):
+        """Return the characteristic of a design backed by the store files."""
+        tensor = self.get(key)
+        return PartloadCharacteristic(
+            *self.coords(key).values(), tensor[0], tensor[1], tensor[3],
+            dtype=tensor.dtype, absolute=True
+            )
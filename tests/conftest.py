@@ -0,0 +1,54 @@
+import numpy as np
+import pytest
+
+from heatpumps.characteristic import PartloadCharacteristic
+from heatpumps.models import HeatPumpSimple
+from heatpumps.parameters import get_params
+
+
+def synthetic_model(design=False):
+    """Return a HeatPumpSimple with synthetic offdesign results."""
+    params = get_params('HeatPumpSimple')
+    params['offdesign'].update({
+        'T_hs_ff_start': 5, 'T_hs_ff_end': 15, 'T_hs_ff_steps': 3,
+        'T_cons_ff_start': 60, 'T_cons_ff_end': 80, 'T_cons_ff_steps': 3,
+        'partload_min': 0.4, 'partload_max': 1.0, 'partload_steps': 4
+        })
+    hp = HeatPumpSimple(params=params)
+    if design:
+        hp.run_model(iterinfo=False)
+    hp.create_ranges()
+
+    T_hs, T_cons, pl = np.meshgrid(
+        hp.T_hs_ff_range, hp.T_cons_ff_range, hp.pl_range, indexing='ij'
+        )
+    hp.Q_array = 10 * pl * (1 + 0.01 * (T_hs - 10) - 0.002 * (T_cons - 70))
+    hp.P_array = hp.Q_array / (6 + 0.1 * (T_hs - T_cons) / 10 + 2 * pl)
+    hp.epsilon_array = 0.3 + 0.1 * pl + 0.001 * (T_cons - T_hs)
+
+    return hp
+
+
+@pytest.fixture
+def hp_model():
+    return synthetic_model()
+
+
+@pytest.fixture(scope='module')
+def hp_model_design():
+    return synthetic_model(design=True)
+
+
+@pytest.fixture
+def partload_char():
+    T_hs_ff_range = np.array([0.0, 10.0, 20.0])
+    T_cons_ff_range = np.array([50.0, 70.0])
+    pl_range = np.array([0.5, 1.0])
+    T_hs_ff, T_cons_ff, pl = np.meshgrid(
+        T_hs_ff_range, T_cons_ff_range, pl_range, indexing='ij'
+        )
+    Q = 10 * pl
+    COP = 4 + 0.05 * T_hs_ff - 0.02 * (T_cons_ff - 50) + (1 - pl)
+    return PartloadCharacteristic(
+        T_hs_ff_range, T_cons_ff_range, pl_range, Q, Q / COP, 0.5 * pl
+        )
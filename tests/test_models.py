@@ -1,4 +1,7 @@
 
+import copy
+
+import numpy as np
 import pytest
 
 from heatpumps.models import (HeatPumpCascade, HeatPumpCascade2IHX,
@@ -23,7 +26,7 @@ from heatpumps.models import (HeatPumpCascade, HeatPumpCascade2IHX,
                               HeatPumpIHXPCTrans, HeatPumpIHXTrans, HeatPumpPC,
                               HeatPumpPCIHX, HeatPumpPCIHXTrans,
                               HeatPumpPCTrans, HeatPumpSimple,
-                              HeatPumpSimpleTrans)
+                              HeatPumpSimpleTrans, HeatPumpStack)
 from heatpumps.parameters import get_params
 
 
@@ -818,3 +821,48 @@ class TestHeatPumpSimpleTrans:
     def test_run_model(self, hp_model):
         hp_model.run_model()
 
+
+
+class TestHeatPumpStack:
+
+    @pytest.fixture
+    def hp_stack(self):
+        self.params = get_params('HeatPumpSimple')
+        self.params['offdesign']['save_results'] = False
+        return HeatPumpStack(HeatPumpSimple(params=self.params), 2)
+
+    def test_run_model(self, hp_stack):
+        params = [copy.deepcopy(self.params) for _ in range(2)]
+        params[1]['C3']['T'] -= 10
+        results = hp_stack.run_model(params=params)
+
+        hp = HeatPumpSimple(params=params[1])
+        hp.run_model()
+        assert hp_stack.solved_design
+        assert results.loc[1, 'COP'] == pytest.approx(hp.cop, rel=1e-6)
+        assert results.loc[0, 'COP'] < results.loc[1, 'COP']
+
+        # every copy is priced by its own components only
+        member = hp_stack.members[1]
+        member.calc_cost(2013, 2019)
+        hp.calc_cost(2013, 2019)
+        assert member.cost.keys() == hp.cost.keys()
+        assert member.cost_total == pytest.approx(hp.cost_total, rel=1e-6)
+
+    def test_offdesign_simulation(self, hp_stack):
+        hp_stack.run_model()
+        points = [(10, 70, 1.0), (10, 70, 0.5), (10, 75, 1.0)]
+        results = hp_stack.offdesign_simulation(points=points)
+        assert not results['Q'].isnull().any()
+        assert np.all(results['Q'].to_numpy() > 0)
+        assert results.loc[(10, 70, 0.5), 'Q'] < results.loc[(10, 70, 1.0), 'Q']
+
+    def test_offdesign_failed_point(self, hp_stack):
+        hp_stack.run_model()
+        points = [(10, 70, 1.0), (10, 400, 1.0), (10, 70, 0.5), (10, 75, 1.0)]
+        results = hp_stack.offdesign_simulation(points=points)
+        # the infeasible point does not fail the points of the other copy
+        assert np.isnan(results.loc[(10, 400, 1.0), 'Q'])
+        valid = results.drop(index=(10, 400, 1.0))
+        assert not valid['Q'].isnull().any()
+        assert np.all(valid['residual'].to_numpy() < 1e-2)
@@ -0,0 +1,60 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from heatpumps.monitoring import PerformanceMonitor
+
+
+@pytest.fixture
+def measurements(partload_char):
+    rng = np.random.default_rng(0)
+    n = 400
+    T_hs_ff = rng.uniform(0, 20, n)
+    T_cons_ff = rng.uniform(50, 70, n)
+    pl = rng.uniform(0.5, 1, n)
+    degradation = np.where(np.arange(n) >= 200, 0.2, 0.0)
+    Q = partload_char.Q(T_hs_ff, T_cons_ff, pl)
+    P = partload_char.P(T_hs_ff, T_cons_ff, pl) * (1 + degradation)
+    Q[::10] = 0
+    return pd.DataFrame(
+        {'T_hs_ff': T_hs_ff, 'T_cons_ff': T_cons_ff, 'Q': Q, 'P': P}
+        )
+
+
+class TestPerformanceMonitor:
+
+    def test_update(self, partload_char, measurements):
+        monitor = PerformanceMonitor(
+            partload_char, halflife=10, threshold=0.1, min_samples=5
+            )
+        results = pd.concat([
+            monitor.update(measurements.iloc[start:start + 64])
+            for start in range(0, len(measurements), 64)
+            ])
+
+        assert results.index.equals(measurements.index)
+        residual = results['residual']
+        assert residual.iloc[:200].dropna().to_numpy() == pytest.approx(0)
+        assert residual.iloc[200:].dropna().to_numpy() == pytest.approx(0.2)
+        assert residual.iloc[::10].isna().all()
+        assert monitor.n_samples == 360
+
+        residual = residual.dropna()
+        expected = residual.ewm(alpha=monitor.alpha, adjust=False).mean()
+        assert results.loc[residual.index, 'residual_mean'].to_numpy() == (
+            pytest.approx(expected.to_numpy())
+            )
+        assert results['residual_mean'].iloc[::10].iloc[1:].notna().all()
+
+        assert not results['alert'].iloc[:200].any()
+        assert results['alert'].iloc[-1]
+        assert len(monitor.alerts) == 1
+        assert 200 < monitor.alerts['start'].iloc[0] < 220
+        assert monitor.mean == pytest.approx(0.2, rel=1e-4)
+        assert monitor.std == pytest.approx(0, abs=1e-3)
+
+        monitor.reset()
+        assert monitor.n_samples == 0
+        assert monitor.alerts.empty
+        with pytest.raises(KeyError):
+            monitor.update(measurements.drop(columns='P'))
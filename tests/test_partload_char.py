@@ -0,0 +1,536 @@
+import numpy as np
+import pandas as pd
+import pytest
+from scipy.interpolate import interpn
+
+from heatpumps.characteristic import PartloadCharacteristic
+from heatpumps.characteristic import SplineCharacteristic
+from heatpumps.characteristic import fit_piecewise_linear
+from heatpumps.characteristic import harmonic_fill
+from heatpumps.storage import read_milp_coefficients
+from heatpumps.storage import write_milp_coefficients
+
+
+class TestOffdesignPlausibility:
+
+    def test_validate_offdesign_results(self, hp_model):
+        index = pd.MultiIndex.from_product(
+            [hp_model.T_hs_ff_range, hp_model.T_cons_ff_range,
+             hp_model.pl_range],
+            names=['T_hs_ff', 'T_cons_ff', 'pl']
+            )
+        states = {
+            idx: {
+                ('Connection', 'm'): {'A0': 1.0, 'B1': 2.0},
+                ('HeatExchanger', 'ttd_l'): {'evap': 2.0},
+                ('Compressor', 'pr'): {'comp': 5.0}
+                }
+            for idx in index
+            }
+        states[index[1]][('HeatExchanger', 'ttd_l')]['evap'] = -0.5
+        states[index[5]][('Connection', 'm')]['B1'] = -1.0
+        del states[index[7]]
+
+        offdesign_states = hp_model.states_to_frames(states, index)
+        plausibility = hp_model.validate_offdesign_results(offdesign_states)
+
+        assert plausibility.loc[index[1], 'heatex_neg_ttd_l']
+        assert plausibility.loc[index[5], 'neg_m_dot']
+        assert not plausibility.loc[index[1], 'plausible']
+        assert not plausibility.loc[index[5], 'plausible']
+        assert plausibility.loc[index[7], 'plausible']
+        assert plausibility['plausible'].sum() == len(index) - 2
+        assert hp_model.plausible_array.shape == np.shape(hp_model.Q_array)
+        assert not hp_model.plausible_array.flat[1]
+
+
+class TestPartloadChar:
+
+    def test_calc_partload_char(self, hp_model):
+        partload_char = hp_model.calc_partload_char()
+
+        assert partload_char.shape == (11 * 21 * 61, 4)
+        assert list(partload_char.columns) == ['Q', 'P', 'COP', 'epsilon']
+        assert not partload_char.isna().any().any()
+
+        T_hs_ff, T_cons_ff, pl = partload_char.index[1234]
+        Q = interpn(
+            (hp_model.T_hs_ff_range, hp_model.T_cons_ff_range,
+             hp_model.pl_range),
+            hp_model.Q_array, (T_hs_ff, T_cons_ff, pl)
+            )[0]
+        assert partload_char['Q'].iloc[1234] == pytest.approx(Q)
+        assert partload_char['COP'].to_numpy() == pytest.approx(
+            (partload_char['Q'] / partload_char['P']).to_numpy()
+            )
+
+    def test_lazy_partload_char(self, hp_model):
+        partload_char = hp_model.get_partload_char()
+
+        assert isinstance(partload_char, PartloadCharacteristic)
+        assert partload_char.Q(10, 70, 1.0) == pytest.approx(10)
+        assert np.isnan(partload_char.P(20, 70, 1.0))
+
+        pl = np.linspace(0.4, 1.0, 7)
+        COP = partload_char.COP(10, 70, pl)
+        assert COP.shape == pl.shape
+        assert COP == pytest.approx(
+            partload_char.Q(10, 70, pl) / partload_char.P(10, 70, pl)
+            )
+
+        frame = partload_char.to_frame()
+        assert frame.equals(hp_model.calc_partload_char())
+        coarse = partload_char.to_frame(resolution={'T_hs_ff': 5, 'pl': 0.2})
+        assert coarse.shape == (3 * 21 * 4, 4)
+
+    def test_partload_char_dtype_and_resample(self, hp_model):
+        partload_char = hp_model.get_partload_char(dtype='float32')
+        assert partload_char.support['Q'].dtype == np.float32
+        assert partload_char.P(10, 70, [0.5, 1.0]).dtype == np.float32
+
+        frame = hp_model.calc_partload_char(
+            resolution={'T_cons_ff': 10, 'pl': 0.1}, dtype='float32'
+            )
+        assert (frame.dtypes == np.float32).all()
+
+        resampled = partload_char.resample(resolution={'pl': 0.1})
+        assert list(resampled.coords) == ['T_hs_ff', 'T_cons_ff', 'pl']
+        assert resampled.support['P'].shape == (11, 21, 7)
+        assert resampled.coords['pl'] == pytest.approx(np.linspace(0.4, 1, 7))
+        assert resampled.Q(12.5, 66, 0.55) == pytest.approx(
+            partload_char.Q(12.5, 66, 0.55), rel=1e-5
+            )
+
+        with pytest.raises(ValueError):
+            hp_model.get_partload_char(dtype='int64')
+
+    def test_resolution_not_dividing_range(self, hp_model):
+        partload_char = hp_model.get_partload_char()
+        resolution = {'T_hs_ff': 3, 'pl': 0.25}
+        T_hs_ff_range, _, pl_range = partload_char.fullranges(resolution)
+        assert T_hs_ff_range == pytest.approx([5, 8, 11, 14, 15])
+        assert pl_range == pytest.approx([0.4, 0.65, 0.9, 1])
+
+        frame = partload_char.to_frame(resolution=resolution)
+        assert len(frame) == 5 * 21 * 4
+        assert not frame.isna().any().any()
+
+        resampled = partload_char.resample(resolution=resolution)
+        assert not np.isnan(resampled.support['Q']).any()
+        assert resampled.Q(14.5, 70, 1) == pytest.approx(
+            partload_char.Q(14.5, 70, 1)
+            )
+
+    def test_linearize_lazy_partload_char(self, hp_model):
+        partload_char = hp_model.get_partload_char()
+        linear_model = hp_model.linearize_partload_char(partload_char)
+        linear_model_frame = hp_model.linearize_partload_char(
+            partload_char.to_frame()
+            )
+
+        assert linear_model.astype(float).equals(
+            linear_model_frame.astype(float)
+            )
+
+    def test_inverse_partload_char(self, hp_model):
+        partload_char = hp_model.get_partload_char()
+
+        T_hs_ff = np.array([7, 10, 12.5, 10, 30])
+        T_cons_ff = np.array([62, 70, 75, 70, 70])
+        pl = np.array([0.45, 0.7, 1.0, 0.5, 0.5])
+        Q = partload_char.Q(T_hs_ff, T_cons_ff, pl)
+        Q[3] = 100
+
+        result = partload_char.inverse(T_hs_ff, T_cons_ff, Q)
+
+        assert result['pl'][:3] == pytest.approx(pl[:3])
+        assert result['P'][:3] == pytest.approx(
+            partload_char.P(T_hs_ff, T_cons_ff, pl)[:3]
+            )
+        assert list(result['feasible']) == [True, True, True, False, False]
+        assert np.isnan(result['pl'][3:]).all()
+
+        clipped = partload_char.inverse(10, 70, 100, clip=True)
+        assert not clipped['feasible']
+        assert clipped['pl'] == pytest.approx(1.0)
+        assert clipped['Q'] == pytest.approx(partload_char.Q(10, 70, 1.0))
+
+    def test_spline_partload_char(self, hp_model):
+        spline_char = hp_model.get_partload_char().to_spline()
+
+        assert isinstance(spline_char, SplineCharacteristic)
+        assert spline_char.degrees == (2, 2, 3)
+        assert spline_char.Q(10, 70, 0.6) == pytest.approx(6)
+        assert np.isnan(spline_char.Q(30, 70, 0.6))
+
+        COP, gradient = spline_char.evaluate_gradient(
+            'COP', [8, 12], [65, 72], [0.5, 0.9]
+            )
+        assert gradient.shape == (2, 3)
+
+        h = 1e-5
+        for i, delta in enumerate(np.eye(3) * h):
+            finite_difference = (
+                spline_char.COP(8 + delta[0], 65 + delta[1], 0.5 + delta[2])
+                - spline_char.COP(8 - delta[0], 65 - delta[1], 0.5 - delta[2])
+                ) / (2 * h)
+            assert gradient[0, i] == pytest.approx(finite_difference, rel=1e-4)
+
+        hp_model.Q_array[0, 0, 0] = np.nan
+        with pytest.raises(ValueError):
+            hp_model.get_partload_char().to_spline()
+
+    def test_fill_failed_points(self, hp_model):
+        Q_expected = hp_model.Q_array[1, 1, 1]
+        for array in [hp_model.Q_array, hp_model.P_array,
+                      hp_model.epsilon_array]:
+            array[1, 1, 1] = np.nan
+
+        assert hp_model.calc_partload_char().isna().any().any()
+
+        partload_char = hp_model.get_partload_char(fill_failed=True)
+        assert partload_char.reconstructed.sum() == 1
+        assert partload_char.reconstructed[1, 1, 1]
+        assert partload_char.support['Q'][1, 1, 1] == pytest.approx(
+            Q_expected
+            )
+        assert not hp_model.calc_partload_char(
+            fill_failed=True
+            ).isna().any().any()
+
+    def test_harmonic_fill(self):
+        array = np.arange(12, dtype=float).reshape(3, 4)
+        array[1, 1:3] = np.nan
+        filled, reconstructed = harmonic_fill(array)
+
+        assert filled[1, 1:3] == pytest.approx([5, 6])
+        assert reconstructed.sum() == 2
+
+        filled, reconstructed = harmonic_fill(np.full((2, 2), np.nan))
+        assert np.isnan(filled).all()
+        assert not reconstructed.any()
+
+    def test_partload_lookup(self, hp_model):
+        partload_char = hp_model.get_partload_char()
+        lookup = hp_model.get_partload_lookup()
+
+        rng = np.random.default_rng(42)
+        T_hs_ff = rng.uniform(3, 17, 200)
+        T_cons_ff = rng.uniform(58, 82, 200)
+        pl = rng.uniform(0.35, 1.02, 200)
+
+        out = np.empty(200)
+        for quantity in ['Q', 'P', 'COP', 'epsilon']:
+            expected = partload_char.evaluate(quantity, T_hs_ff, T_cons_ff, pl)
+            result = lookup.batch(quantity, T_hs_ff, T_cons_ff, pl, out=out)
+            assert result is out
+            np.testing.assert_allclose(result, expected, equal_nan=True)
+
+            scalar = [
+                lookup(quantity, *point)
+                for point in zip(T_hs_ff[:20], T_cons_ff[:20], pl[:20])
+                ]
+            np.testing.assert_allclose(scalar, expected[:20], equal_nan=True)
+
+        assert lookup.kernel('Q')(15.0, 80.0, 1.0) == pytest.approx(
+            partload_char.Q(15, 80, 1.0)
+            )
+
+        # batched COP lookups reuse the scratch buffer of the power input
+        scratch = lookup._scratch
+        lookup.batch('COP', T_hs_ff[:50], T_cons_ff[:50], pl[:50], out[:50])
+        assert lookup._scratch is scratch
+
+    @pytest.mark.parametrize('variable', ['P', 'Q'])
+    def test_linearize_partload_char_ols(self, hp_model, variable):
+        partload_char = hp_model.calc_partload_char(
+            resolution={'T_hs_ff': 5, 'T_cons_ff': 10}
+            )
+        resp_variable = 'Q' if variable == 'P' else 'P'
+
+        offset_model = hp_model.linearize_partload_char(
+            partload_char, variable=variable
+            )
+        origin_model = hp_model.linearize_partload_char(
+            partload_char, variable=variable, line_type='origin'
+            )
+        assert len(offset_model) == 3 * 3
+        assert list(offset_model.columns) == [
+            f'{variable}_max', f'{variable}_min', 'c_1', 'c_0'
+            ]
+
+        for idx in [(5.0, 60.0), (10.0, 70.0), (15.0, 80.0)]:
+            x = partload_char.loc[idx, variable].to_numpy()
+            y = partload_char.loc[idx, resp_variable].to_numpy()
+            c_1, c_0 = np.polyfit(x, y, 1)
+            assert offset_model.loc[idx, 'c_1'] == pytest.approx(c_1)
+            assert offset_model.loc[idx, 'c_0'] == pytest.approx(c_0)
+            assert offset_model.loc[idx, f'{variable}_max'] == x.max()
+            assert origin_model.loc[idx, 'COP'] == pytest.approx(
+                np.dot(x, y) / np.dot(x, x)
+                )
+
+    def test_linearize_partload_char_minmax(self, hp_model):
+        partload_char = hp_model.calc_partload_char(
+            resolution={'T_hs_ff': 5, 'T_cons_ff': 10}
+            )
+        linear_model = hp_model.linearize_partload_char(
+            partload_char, regression_type='MinMax',
+            normalize={'T_hs_ff': 10, 'T_cons_ff': 70}
+            )
+
+        group = partload_char.loc[(10.0, 70.0)]
+        P_nom = group['P'].max()
+        c_1 = (
+            (group['Q'].max() - group['Q'].min())
+            / (group['P'].max() - group['P'].min())
+            )
+        assert linear_model.loc[(10.0, 70.0), 'P_max'] == pytest.approx(1)
+        assert linear_model.loc[(10.0, 70.0), 'c_1'] == pytest.approx(
+            c_1 / P_nom
+            )
+        assert linear_model.loc[(10.0, 70.0), 'c_0'] == pytest.approx(
+            (group['Q'].max() - group['P'].max() * c_1) / P_nom
+            )
+
+    def test_piecewise_linearize_partload_char(self, hp_model):
+        partload_char = hp_model.calc_partload_char(
+            resolution={'T_hs_ff': 5, 'T_cons_ff': 10}
+            )
+        piecewise_model = hp_model.piecewise_linearize_partload_char(
+            partload_char, n_segments=3
+            )
+
+        assert len(piecewise_model) == 3 * 3
+        assert list(piecewise_model.columns[:4]) == ['Q_0', 'Q_1', 'Q_2', 'Q_3']
+        assert not piecewise_model.isna().any().any()
+
+        group = partload_char.loc[(10.0, 70.0)]
+        breakpoints = piecewise_model.loc[(10.0, 70.0)]
+        assert breakpoints['Q_0'] == pytest.approx(group['Q'].min())
+        assert breakpoints['Q_3'] == pytest.approx(group['Q'].max())
+        P_approx = np.interp(
+            group['Q'], breakpoints[[f'Q_{k}' for k in range(4)]],
+            breakpoints[[f'P_{k}' for k in range(4)]]
+            )
+        assert P_approx == pytest.approx(group['P'].to_numpy(), rel=1e-3)
+        assert breakpoints['P_1'] == pytest.approx(
+            breakpoints['c_1_0'] * breakpoints['Q_1'] + breakpoints['c_0_0']
+            )
+
+        normalized_model = hp_model.piecewise_linearize_partload_char(
+            partload_char, n_segments=3,
+            normalize={'T_hs_ff': 10, 'T_cons_ff': 70}
+            )
+        assert normalized_model.loc[(10.0, 70.0), 'Q_3'] == pytest.approx(1)
+
+    @pytest.mark.parametrize('convex', [False, True])
+    def test_fit_piecewise_linear(self, convex):
+        x = np.tile(np.linspace(0, 1, 21), (2, 1))
+        y = np.maximum(x, 3 * x - 1.2)
+        y[1] = np.maximum(y[1], 6 * x[1] - 3.6)
+
+        x_breakpoints, y_breakpoints, sse = fit_piecewise_linear(
+            x, y, 3, convex=convex
+            )
+        assert sse == pytest.approx([0, 0], abs=1e-12)
+        assert x_breakpoints[1] == pytest.approx([0, 0.6, 0.8, 1])
+        assert y_breakpoints[1] == pytest.approx([0, 0.6, 1.2, 2.4])
+
+        chunked = fit_piecewise_linear(
+            x, y, 3, convex=convex, max_elements=21**2
+            )
+        for result, chunked_result in zip(
+                [x_breakpoints, y_breakpoints, sse], chunked):
+            assert np.array_equal(result, chunked_result)
+
+        concave = fit_piecewise_linear(x, -y, 3, convex=True)
+        assert not np.isnan(concave[0]).any()
+        assert np.diff(concave[0], axis=1).min() > 0
+
+    def test_arrange_char_timeseries(self, hp_model, tmp_path):
+        partload_char = hp_model.calc_partload_char(
+            resolution={'T_hs_ff': 5, 'T_cons_ff': 10}
+            )
+        linear_model = hp_model.linearize_partload_char(partload_char)
+        temp_ts = pd.DataFrame({
+            'T_hs_ff': [10.0, 7.0, 7.5, 2.0, 20.0],
+            'T_cons_ff': [70.0, 66.0, 66.0, 60.0, 90.0]
+            })
+
+        char_ts, out_of_bounds = hp_model.arrange_char_timeseries(
+            linear_model, temp_ts, return_mask=True
+            )
+        assert char_ts.loc[0].to_numpy() == pytest.approx(
+            linear_model.loc[(10.0, 70.0)].to_numpy()
+            )
+        assert char_ts.loc[1].to_numpy() == pytest.approx(
+            linear_model.loc[(5.0, 70.0)].to_numpy()
+            )
+        assert char_ts.loc[3].to_numpy() == pytest.approx(
+            linear_model.loc[(5.0, 60.0)].to_numpy()
+            )
+        assert out_of_bounds['T_hs_ff'].tolist() == [
+            False, False, False, True, True
+            ]
+        assert out_of_bounds['T_cons_ff'].tolist() == [
+            False, False, False, False, True
+            ]
+
+        floor_ts = hp_model.arrange_char_timeseries(
+            linear_model, temp_ts, method='floor'
+            )
+        assert floor_ts.loc[1].to_numpy() == pytest.approx(
+            linear_model.loc[(5.0, 60.0)].to_numpy()
+            )
+
+        interp_ts = hp_model.arrange_char_timeseries(
+            linear_model, temp_ts, method='interpolate'
+            )
+        expected = (
+            0.5 * 0.4 * linear_model.loc[(5.0, 60.0)]
+            + 0.5 * 0.6 * linear_model.loc[(5.0, 70.0)]
+            + 0.5 * 0.4 * linear_model.loc[(10.0, 60.0)]
+            + 0.5 * 0.6 * linear_model.loc[(10.0, 70.0)]
+            )
+        assert interp_ts.loc[2].to_numpy() == pytest.approx(
+            expected.to_numpy()
+            )
+
+        unclamped_ts = hp_model.arrange_char_timeseries(
+            linear_model, temp_ts, clamp={'T_hs_ff': False, 'T_cons_ff': True}
+            )
+        assert unclamped_ts.loc[3:].isna().all().all()
+        assert not unclamped_ts.loc[:2].isna().any().any()
+
+        path = tmp_path / 'temp_ts.csv'
+        temp_ts.to_csv(path, index=False)
+        streamed_ts = pd.concat(hp_model.iter_char_timeseries(
+            linear_model, path, chunksize=2, method='interpolate'
+            ))
+        pd.testing.assert_frame_equal(
+            streamed_ts, interp_ts, check_index_type=False
+            )
+
+    def test_milp_coefficients(self, hp_model, tmp_path):
+        partload_char = hp_model.get_partload_char()
+        linear_model = hp_model.linearize_partload_char(partload_char)
+        temp_ts = pd.DataFrame({
+            'T_hs_ff': [10.0, 10.2, 5.0, 10.0, 15.0],
+            'T_cons_ff': [70.0, 70.1, 60.0, 70.0, 80.0]
+            })
+        char_ts = hp_model.arrange_char_timeseries(linear_model, temp_ts)
+
+        coefficients = hp_model.get_milp_coefficients(
+            partload_char, temp_ts, normalize=None
+            )
+        assert coefficients['columns'] == list(linear_model.columns)
+        assert coefficients['coefficients'].shape == (3, 4)
+        assert coefficients['index'].dtype == np.uint8
+        assert np.array_equal(
+            coefficients['coefficients'][coefficients['index']],
+            char_ts.to_numpy(), equal_nan=True
+            )
+
+        path = str(tmp_path / 'coefficients.npz')
+        write_milp_coefficients(coefficients, path, metadata={'site': 'A'})
+        restored, metadata = read_milp_coefficients(path)
+        assert metadata == {'site': 'A'}
+        assert restored['columns'] == coefficients['columns']
+        for key in ['coefficients', 'index']:
+            assert np.array_equal(
+                restored[key], coefficients[key], equal_nan=True
+                )
+
+        full = hp_model.get_milp_coefficients(
+            linear_model, temp_ts, deduplicate=False, dtype='float32'
+            )
+        assert full['coefficients'].shape == (5, 4)
+        assert full['coefficients'].dtype == np.float32
+
+    def test_trajectory_evaluator(self, hp_model):
+        partload_char = hp_model.get_partload_char()
+        evaluator = hp_model.get_trajectory_evaluator()
+        with pytest.raises(AttributeError):
+            evaluator(np.ones(3))
+
+        T_hs_ff = np.array([5.0, 7.5, 12.0, 20.0])
+        T_cons_ff = np.array([60.0, 65.0, 72.0, 80.0])
+        pl = np.array([
+            [0.4, 0.6, 1.0, 0.9],
+            [0.0, 0.5, 0.7, 1.0],
+            [1.0, 1.0, 0.45, 0.0]
+            ])
+        result = evaluator(pl, T_hs_ff, T_cons_ff)
+
+        assert result['Q'].shape == (3, 4)
+        running = pl > 0
+        T_hs_ff_clamped = np.minimum(T_hs_ff, 15.0)
+        for quantity in ['Q', 'P', 'COP']:
+            expected = partload_char.evaluate(
+                quantity, T_hs_ff_clamped, T_cons_ff, np.maximum(pl, 0.4)
+                )
+            assert result[quantity][running] == pytest.approx(
+                expected[running]
+                )
+        assert (result['Q'][~running] == 0).all()
+        assert (result['P'][~running] == 0).all()
+        assert np.isnan(result['COP'][~running]).all()
+
+        unclamped = partload_char.to_trajectory_evaluator(clamp=False)
+        result = unclamped(pl, T_hs_ff, T_cons_ff)
+        assert np.isnan(result['Q'][:2, 3]).all()
+        assert np.isfinite(result['Q'][:, :3]).all()
+
+
+class TestMergeOffdesignResults:
+
+    @staticmethod
+    def sweep(T_hs_ff_range, residual):
+        multiindex = pd.MultiIndex.from_product(
+            [T_hs_ff_range, [60.0, 70.0], [0.5, 1.0]],
+            names=['T_hs_ff', 'T_cons_ff', 'pl']
+            )
+        results = pd.DataFrame(
+            index=multiindex, columns=['Q', 'P', 'COP', 'epsilon', 'residual']
+            )
+        T_hs_ff = multiindex.get_level_values('T_hs_ff').to_numpy()
+        pl = multiindex.get_level_values('pl').to_numpy()
+        results['Q'] = 10 * pl + 0.1 * T_hs_ff
+        results['P'] = 2 * pl
+        results['COP'] = results['Q'] / results['P']
+        results['epsilon'] = 0.5
+        results['residual'] = residual
+        return results
+
+    def test_merge_offdesign_results(self, hp_model):
+        first = self.sweep([5.0, 10.0], 1e-4)
+        second = self.sweep([10.0, 15.0], 1e-6)
+        second.loc[(10.0, 60.0, 0.5), 'Q'] = 99
+        second.loc[(10.0, 60.0, 1.0), ['Q', 'P', 'COP', 'epsilon']] = np.nan
+        first.loc[(10.0, 70.0, 1.0), ['Q', 'P', 'COP', 'epsilon']] = np.nan
+
+        merged = hp_model.merge_offdesign_results(
+            first, second, include_current=False
+            )
+
+        assert len(merged) == 3 * 2 * 2
+        assert list(hp_model.T_hs_ff_range) == [5, 10, 15]
+        assert merged.loc[(10.0, 60.0, 0.5), 'Q'] == 99
+        assert merged.loc[(10.0, 70.0, 1.0), 'Q'] == pytest.approx(11)
+        assert merged.loc[(10.0, 60.0, 1.0), 'Q'] == pytest.approx(11)
+        assert np.shape(hp_model.Q_array) == (3, 2, 2)
+
+        noisy = self.sweep([15.0000001, 20.0], 1e-6)
+        merged = hp_model.merge_offdesign_results(
+            first, second, noisy, include_current=False
+            )
+        assert len(merged) == 4 * 2 * 2
+        assert list(hp_model.T_hs_ff_range) == [5, 10, 15, 20]
+
+        third = self.sweep([20.0], 1e-6)
+        merged = hp_model.merge_offdesign_results(third)
+        assert list(hp_model.T_hs_ff_range) == [5, 10, 15, 20]
+        assert hp_model.get_partload_char().Q(17.5, 65, 0.75) == pytest.approx(
+            9.25
+            )
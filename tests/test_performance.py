@@ -0,0 +1,154 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from heatpumps.characteristic import PartloadCharacteristic
+from heatpumps.performance import annual_performance
+from heatpumps.performance import evaluate_demand
+from heatpumps.performance import evaluate_fleet
+from heatpumps.performance import simulate_dispatch
+
+
+@pytest.fixture
+def timeseries():
+    return pd.DataFrame({
+        'T_hs_ff': [10.0, 10.0, 10.0, 10.0, -5.0],
+        'T_cons_ff': [50.0, 50.0, 50.0, 50.0, 50.0],
+        'Q_demand': [7.5, 12.0, 2.5, 0.0, 5.0]
+        })
+
+
+class TestAnnualPerformance:
+
+    def test_evaluate_demand(self, partload_char, timeseries):
+        result = evaluate_demand(
+            partload_char, timeseries['T_hs_ff'], timeseries['T_cons_ff'],
+            timeseries['Q_demand']
+            )
+
+        assert result['Q'] == pytest.approx([7.5, 10, 2.5, 0, 5])
+        assert result['Q_unmet'] == pytest.approx([0, 2, 0, 0, 0])
+        assert result['pl'] == pytest.approx([0.75, 1, 0.25, 0, 0.5])
+        assert result['COP'][0] == pytest.approx(
+            partload_char.COP(10, 50, 0.75)
+            )
+        assert result['COP'][2] == pytest.approx(4.5 + 0.5)
+        assert result['COP'][4] == pytest.approx(4 + 0.5)
+        assert np.isnan(result['COP'][3])
+
+        unclamped = evaluate_demand(
+            partload_char, timeseries['T_hs_ff'], timeseries['T_cons_ff'],
+            timeseries['Q_demand'], clamp=False
+            )
+        assert unclamped['Q'][4] == 0
+        assert unclamped['Q_unmet'][4] == pytest.approx(5)
+
+    def test_annual_performance(self, partload_char, timeseries):
+        summary, results = annual_performance(
+            partload_char, timeseries, timestep=0.25, chunksize=2
+            )
+
+        assert len(results) == len(timeseries)
+        assert summary['heat_demand'] == pytest.approx(27 * 0.25)
+        assert summary['heat_delivered'] == pytest.approx(25 * 0.25)
+        assert summary['heat_unmet'] == pytest.approx(2 * 0.25)
+        assert summary['operating_hours'] == pytest.approx(4 * 0.25)
+        assert summary['SPF'] == pytest.approx(
+            results['Q'].sum() / results['P'].sum()
+            )
+
+        chunks = (timeseries.iloc[i:i + 3] for i in range(0, 5, 3))
+        streamed = annual_performance(
+            partload_char, chunks, timestep=0.25, return_timeseries=False
+            )
+        pd.testing.assert_series_equal(streamed, summary)
+
+    def test_annual_performance_file(self, partload_char, timeseries,
+                                     tmp_path):
+        path = tmp_path / 'timeseries.csv'
+        timeseries.to_csv(path, index=False)
+
+        summary = annual_performance(
+            partload_char, path, chunksize=2, return_timeseries=False
+            )
+        expected = annual_performance(
+            partload_char, timeseries, return_timeseries=False
+            )
+        pd.testing.assert_series_equal(summary, expected)
+
+
+class TestEvaluateFleet:
+
+    def test_evaluate_fleet(self, partload_char, timeseries):
+        T_hs_ff, T_cons_ff, pl = np.meshgrid(
+            *partload_char.grid, indexing='ij'
+            )
+        Q = 20 * pl
+        larger = PartloadCharacteristic(
+            *partload_char.grid, Q, Q / (3 + 0.05 * T_hs_ff), 0.5 * pl
+            )
+        coarse = PartloadCharacteristic(
+            np.array([0.0, 20.0]), np.array([50.0, 70.0]),
+            np.array([0.5, 1.0]), *[np.full((2, 2, 2), 5.0)] * 2,
+            np.full((2, 2, 2), 0.5)
+            )
+        units = {'small': partload_char, 'large': larger, 'coarse': coarse}
+        sites = {
+            'a': timeseries,
+            'b': timeseries.assign(T_cons_ff=[55.0, 60, 65, 70, 75])
+            }
+        scale = np.array([[1.0, 0.5], [2.0, 1.0], [1.0, 1.0]])
+
+        summary = evaluate_fleet(
+            units, sites, scale=scale, timestep=0.5, max_elements=10
+            )
+
+        assert list(summary.index.names) == ['unit', 'site']
+        for u, (unit, unit_char) in enumerate(units.items()):
+            for s, (site, site_ts) in enumerate(sites.items()):
+                expected = annual_performance(
+                    unit_char,
+                    site_ts.assign(Q_demand=site_ts['Q_demand'] * scale[u, s]),
+                    timestep=0.5, return_timeseries=False
+                    )
+                pd.testing.assert_series_equal(
+                    summary.loc[(unit, site)], expected, check_names=False
+                    )
+
+
+class TestSimulateDispatch:
+
+    def test_without_storage(self, partload_char, timeseries):
+        summary = simulate_dispatch(partload_char, timeseries, 0)
+        expected = annual_performance(
+            partload_char, timeseries, return_timeseries=False
+            )
+
+        for metric in expected.index:
+            assert summary.loc[0.0, metric] == pytest.approx(expected[metric])
+        assert summary.loc[0.0, 'starts'] == 2
+
+    def test_storage_cycle(self, partload_char):
+        timeseries = pd.DataFrame({
+            'T_hs_ff': np.full(7, 10.0),
+            'T_cons_ff': np.full(7, 50.0),
+            'Q_demand': np.full(7, 2.5)
+            })
+        summary, results = simulate_dispatch(
+            partload_char, timeseries, [0.0, 10.0], soc_initial=0.0,
+            return_timeseries=True
+            )
+
+        assert results['Q'][:, 1] == pytest.approx([10, 5, 0, 0, 0, 0, 10])
+        assert results['soc'][:, 1] == pytest.approx(
+            [7.5, 10, 7.5, 5, 2.5, 0, 7.5]
+            )
+        assert list(summary['starts']) == [1, 2]
+        assert summary.loc[10.0, 'operating_hours'] == 3
+        assert summary.loc[10.0, 'heat_produced'] == pytest.approx(
+            summary.loc[10.0, 'heat_delivered'] + results['soc'][-1, 1]
+            )
+        assert (summary['heat_unmet'] == 0).all()
+
+        with pytest.raises(ValueError):
+            simulate_dispatch(partload_char, timeseries, 1, partload_min=0.2)
@@ -0,0 +1,66 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from heatpumps.periods import approximation_error
+from heatpumps.periods import cluster_periods
+
+
+@pytest.fixture
+def timeseries():
+    hours = np.arange(4)
+    days = {
+        'cold': (2 + hours, 65.0 + 0 * hours, 9.0 - hours),
+        'mild': (10 + hours, 55.0 + 0 * hours, 6.0 - hours),
+        'warm': (18 + hours, 50.0 + 0 * hours, 2.0 + 0 * hours)
+        }
+    sequence = ['cold', 'mild', 'cold', 'warm', 'mild', 'cold', 'warm']
+    return pd.DataFrame(
+        np.concatenate([np.column_stack(days[day]) for day in sequence]),
+        columns=['T_hs_ff', 'T_cons_ff', 'Q_demand']
+        )
+
+
+class TestClusterPeriods:
+
+    @pytest.mark.parametrize('method', ['kmedoids', 'kmeans'])
+    def test_exact_representatives(self, partload_char, timeseries, method):
+        periods = cluster_periods(
+            timeseries, 3, period_length=4, method=method, random_state=0
+            )
+
+        assert sorted(periods.weights) == [2.0, 2.0, 3.0]
+        assert len(periods.timeseries) == 12
+        pd.testing.assert_frame_equal(
+            periods.expand(periods.timeseries), timeseries
+            )
+
+        report = approximation_error(
+            partload_char, timeseries, periods, timestep=0.5
+            )
+        assert report['representative'].to_numpy() == pytest.approx(
+            report['full'].to_numpy()
+            )
+        assert report['error'].abs().max() == pytest.approx(0)
+
+    def test_approximation(self, timeseries):
+        timeseries = pd.concat([timeseries, timeseries.iloc[:2]])
+        timeseries['Q_demand'] += np.linspace(0, 1, len(timeseries))
+        periods = cluster_periods(
+            timeseries, 2, period_length=4, method='kmeans',
+            columns=['T_hs_ff'], random_state=0
+            )
+
+        assert list(periods.weights)[-1] == 1.0
+        assert len(periods.weights) == 3
+        assert periods.weights.sum() == 8
+        assert len(periods.expand(periods.timeseries)) == len(timeseries)
+        assert (
+            (periods.step_weights * periods.timeseries['Q_demand']).sum()
+            == pytest.approx(timeseries['Q_demand'].sum())
+            )
+
+        with pytest.raises(ValueError):
+            cluster_periods(timeseries, 2, method='kmode')
+        with pytest.raises(ValueError):
+            cluster_periods(timeseries, 8, period_length=4)
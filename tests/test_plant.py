@@ -0,0 +1,81 @@
+import itertools
+
+import numpy as np
+import pytest
+
+from heatpumps.characteristic import PartloadCharacteristic
+from heatpumps.plant import PlantCharacteristic
+
+
+def unit_char(Q_nom, T_hs_ff_range=(0.0, 10.0, 20.0)):
+    T_hs_ff_range = np.array(T_hs_ff_range)
+    T_cons_ff_range = np.array([50.0, 70.0])
+    pl_range = np.array([0.4, 0.7, 1.0])
+    T_hs_ff, T_cons_ff, pl = np.meshgrid(
+        T_hs_ff_range, T_cons_ff_range, pl_range, indexing='ij'
+        )
+    Q = Q_nom * pl
+    COP = 4 + 0.05 * T_hs_ff - 0.02 * (T_cons_ff - 50) + 2 * pl * (1 - pl)
+    return PartloadCharacteristic(
+        T_hs_ff_range, T_cons_ff_range, pl_range, Q, Q / COP, 0.5 * pl
+        )
+
+
+class TestPlantCharacteristic:
+
+    def test_optimal_split(self):
+        units = {'a': unit_char(10), 'b': unit_char(10), 'c': unit_char(5)}
+        plant = PlantCharacteristic(units, Q_step=0.5)
+
+        assert plant.P.shape == (3, 2, 51)
+        assert plant.Q_range[-1] == pytest.approx(25)
+        assert plant.Q_units[1, 0, 36] == pytest.approx([7, 7, 4])
+        assert plant.n_running[1, 0, 0] == 0
+        assert np.isnan(plant.P[1, 0, 1])
+        assert np.nansum(plant.Q_units, axis=-1) == pytest.approx(
+            np.where(np.isnan(plant.P), 0, plant.Q_range)
+            )
+
+        # equal units with convex power input share the load equally
+        pair = PlantCharacteristic(
+            {'a': units['a'], 'b': units['b']}, Q_step=0.5
+            )
+        assert pair.Q_units[1, 0, 28] == pytest.approx([7, 7])
+
+        # exhaustive search over all splits of the grid
+        costs = [
+            plant._unit_costs(
+                unit, *[
+                    unit.evaluate(quantity, 10.0, 70.0, unit.pl_range)
+                    for quantity in ['Q', 'P']
+                    ]
+                )
+            for unit in units.values()
+            ]
+        expected = np.full(len(plant.Q_range), np.inf)
+        for steps in itertools.product(range(21), range(21), range(11)):
+            k = sum(steps)
+            cost = sum(c[j] for c, j in zip(costs, steps))
+            expected[k] = min(expected[k], cost)
+        expected[np.isinf(expected)] = np.nan
+        assert np.allclose(plant.P[1, 1], expected, equal_nan=True)
+
+    def test_evaluate(self):
+        units = [unit_char(10), unit_char(8, T_hs_ff_range=(0.0, 10.0))]
+        plant = PlantCharacteristic(units, n_steps=90)
+
+        result = plant.evaluate([5.0, 20.0, 20.0], 50.0, [14.4, 8.0, 14.4])
+        assert result['n_running'][:2].tolist() == [2, 1]
+        # the second unit has no data at 20 degrees of the heat source
+        assert np.isnan(result['P'][2])
+        assert np.isnan(result['n_running'][2])
+        assert result['Q_units'][1] == pytest.approx([8.0, 0.0])
+        assert result['COP'][1] == pytest.approx(
+            units[0].COP(20.0, 50.0, 0.8)
+            )
+
+        plant_map = plant.to_frame()
+        assert list(plant_map.columns) == [
+            'P', 'COP', 'n_running', 'Q_unit_0', 'Q_unit_1'
+            ]
+        assert len(plant_map) == 3 * 2 * 91
@@ -0,0 +1,93 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from heatpumps.models import HeatPumpSimple
+from heatpumps.parameters import get_params
+from heatpumps.sizing import annuity_factor
+from heatpumps.sizing import size_capacity
+
+
+class TestSizing:
+
+    def test_annuity_factor(self):
+        assert annuity_factor(0, 20) == pytest.approx(0.05)
+        assert annuity_factor(0.05, 20) == pytest.approx(0.0802426)
+
+    def test_scaled_cost(self, hp_model_design):
+        hp_model_design.calc_cost(2013, 2019)
+        cost = dict(hp_model_design.cost)
+        hp_model_design.calc_cost(2013, 2019, scale=2)
+
+        assert hp_model_design.cost['Compressor'] == pytest.approx(
+            cost['Compressor'] * 2**0.73
+            )
+        assert hp_model_design.cost['Condenser'] == pytest.approx(
+            cost['Condenser'] * 2**0.8
+            )
+
+    def test_size_capacity(self, hp_model_design):
+        partload_char = hp_model_design.get_partload_char()
+        scaled = partload_char.scale(1.5)
+        assert scaled.Q(10, 70, 1) == pytest.approx(
+            1.5 * partload_char.Q(10, 70, 1)
+            )
+        assert scaled.COP(10, 70, 1) == pytest.approx(
+            partload_char.COP(10, 70, 1)
+            )
+
+        timeseries = pd.DataFrame({
+            'T_hs_ff': np.tile([5.0, 10.0, 15.0], 16),
+            'T_cons_ff': np.tile([80.0, 70.0, 60.0], 16),
+            'Q_demand': np.tile([12.0, 8.0, 5.0], 16)
+            })
+        hp_model_design.calc_cost(2013, 2019)
+        cost_total = hp_model_design.cost_total
+
+        best, results = size_capacity(
+            hp_model_design, timeseries, [8, 10, 12, 14], 2013, 2019,
+            electricity_price=100, storage_capacities=[0, 5],
+            storage_cost=1e4
+            )
+
+        assert results.index.names == ['capacity', 'storage_capacity']
+        assert len(results) == 8
+        assert results.loc[(10.0, 0.0), 'investment_hp'] == pytest.approx(
+            cost_total
+            )
+        assert hp_model_design.cost_total == pytest.approx(cost_total)
+        assert results.loc[(8.0, 0.0), 'heat_unmet'] > 0
+        assert best.name == results['annual_cost'].idxmin()
+
+    def test_size_capacity_after_offdesign(self):
+        params = get_params('HeatPumpSimple')
+        params['offdesign'].update({
+            'T_hs_ff_start': 10, 'T_hs_ff_end': 10, 'T_hs_ff_steps': 1,
+            'T_cons_ff_start': 70, 'T_cons_ff_end': 80, 'T_cons_ff_steps': 2,
+            'partload_min': 0.5, 'partload_max': 1.0, 'partload_steps': 2,
+            'save_results': False
+            })
+        hp = HeatPumpSimple(params=params)
+        hp.run_model(iterinfo=False)
+        hp.calc_cost(2013, 2019)
+        cost_total = hp.cost_total
+
+        # the network holds the last offdesign point afterwards
+        hp.offdesign_simulation()
+        hp.calc_cost(2013, 2019)
+        assert hp.cost_total == pytest.approx(cost_total)
+
+        timeseries = pd.DataFrame({
+            'T_hs_ff': [10.0, 10.0], 'T_cons_ff': [70.0, 80.0],
+            'Q_demand': [8.0, 6.0]
+            })
+        best, results = size_capacity(
+            hp, timeseries, [10, 20], 2013, 2019, electricity_price=100
+            )
+        assert results.loc[(10.0, 0.0), 'investment_hp'] == pytest.approx(
+            cost_total
+            )
+        hp.calc_cost(2013, 2019, scale=2)
+        assert results.loc[(20.0, 0.0), 'investment_hp'] == pytest.approx(
+            hp.cost_total
+            )
@@ -0,0 +1,167 @@
+import copy
+import importlib.util
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from heatpumps.characteristic import PartloadCharacteristic
+from heatpumps.models import HeatPumpSimple
+from heatpumps.parameters import get_params
+from heatpumps.storage import CharacteristicStore
+from heatpumps.storage import iter_table
+from heatpumps.storage import params_hash
+from heatpumps.storage import read_metadata
+from heatpumps.storage import read_partload_char
+from heatpumps.storage import read_table
+from heatpumps.storage import write_partload_char
+from heatpumps.storage import write_table
+
+requires_pyarrow = pytest.mark.skipif(
+    importlib.util.find_spec('pyarrow') is None,
+    reason='pyarrow is not installed'
+    )
+
+
+@pytest.fixture
+def hp_params_model():
+    params = get_params('HeatPumpSimple')
+    return HeatPumpSimple(params=params)
+
+
+@pytest.fixture
+def results_offdesign():
+    multiindex = pd.MultiIndex.from_product(
+        [[5.0, 10.0], [60.0, 70.0], [0.5, 1.0]],
+        names=['T_hs_ff', 'T_cons_ff', 'pl']
+        )
+    results = pd.DataFrame(
+        index=multiindex, columns=['Q', 'P', 'COP', 'epsilon', 'residual']
+        )
+    results['Q'] = np.linspace(4, 11, 8)
+    results['P'] = np.linspace(1, 2, 8)
+    results['COP'] = results['Q'] / results['P']
+    results['epsilon'] = 0.5
+    results['residual'] = 1e-5
+    return results
+
+
+class TestStorage:
+
+    @requires_pyarrow
+    @pytest.mark.parametrize('ext', ['parquet', 'feather'])
+    def test_table_roundtrip(self, hp_params_model, results_offdesign,
+                             tmp_path, ext):
+        path = str(tmp_path / f'results.{ext}')
+        write_table(
+            results_offdesign, path, metadata=hp_params_model.get_metadata()
+            )
+
+        metadata = read_metadata(path)
+        assert metadata['topology'] == 'HeatPumpSimple'
+        assert metadata['refrigerant'] == (
+            hp_params_model.params['setup']['refrig']
+            )
+        assert len(metadata['params_hash']) == 16
+
+        results = read_table(path)
+        assert (results.dtypes == np.float64).all()
+        pd.testing.assert_frame_equal(
+            results, results_offdesign.astype(float)
+            )
+
+        results = read_table(path, columns=['COP'])
+        assert list(results.columns) == ['COP']
+        assert results.index.names == ['T_hs_ff', 'T_cons_ff', 'pl']
+
+    @requires_pyarrow
+    def test_partload_char_roundtrip(self, hp_params_model,
+                                     results_offdesign, tmp_path):
+        hp_params_model.T_hs_ff_range = np.array([5.0, 10.0])
+        hp_params_model.T_cons_ff_range = np.array([60.0, 70.0])
+        hp_params_model.pl_range = np.array([0.5, 1.0])
+        hp_params_model.df_to_array(results_offdesign)
+        partload_char = hp_params_model.get_partload_char(dtype='float32')
+
+        path = str(tmp_path / 'partload_char.parquet')
+        write_partload_char(partload_char, path)
+        restored = read_partload_char(path)
+
+        assert restored.dtype == np.float32
+        for quantity in ['Q', 'P', 'epsilon']:
+            assert np.array_equal(
+                restored.support[quantity], partload_char.support[quantity]
+                )
+        assert restored.COP(7.5, 65, 0.75) == pytest.approx(
+            partload_char.COP(7.5, 65, 0.75)
+            )
+
+    @pytest.mark.parametrize('ext', [
+        'csv',
+        pytest.param('parquet', marks=requires_pyarrow),
+        pytest.param('feather', marks=requires_pyarrow)
+        ])
+    def test_iter_table(self, results_offdesign, tmp_path, ext):
+        path = str(tmp_path / f'results.{ext}')
+        if ext == 'csv':
+            results_offdesign.to_csv(path)
+            chunks = iter_table(path, chunksize=3, index_col=[0, 1, 2])
+        else:
+            write_table(results_offdesign, path)
+            chunks = iter_table(path, columns=['Q', 'P'], chunksize=3)
+
+        chunks = list(chunks)
+        assert [len(chunk) for chunk in chunks] == [3, 3, 2]
+        results = pd.concat(chunks)
+        assert results.index.names == ['T_hs_ff', 'T_cons_ff', 'pl']
+        pd.testing.assert_frame_equal(
+            results[['Q', 'P']], results_offdesign[['Q', 'P']].astype(float)
+            )
+
+
+class TestCharacteristicStore:
+
+    def test_store_roundtrip(self, hp_params_model, tmp_path):
+        T_hs_ff, T_cons_ff, pl = np.meshgrid(
+            [5.0, 10.0], [60.0, 70.0, 80.0], [0.5, 0.75, 1.0], indexing='ij'
+            )
+        store = CharacteristicStore(str(tmp_path / 'store'))
+        keys = []
+        for i in range(3):
+            Q = (10 + i) * pl
+            partload_char = PartloadCharacteristic(
+                [5.0, 10.0], [60.0, 70.0, 80.0], [0.5, 0.75, 1.0],
+                Q, Q / (5 + 0.1 * T_hs_ff - 0.02 * T_cons_ff), 0.5 * pl,
+                dtype='float32'
+                )
+            params = copy.deepcopy(hp_params_model.params)
+            params['cons']['Q'] = -(10 + i) * 1e6
+            keys += [params_hash(params)]
+            store.add(keys[-1], partload_char, metadata={'Q_N': 10 + i})
+
+        store = CharacteristicStore(str(tmp_path / 'store'))
+        assert len(store) == 3
+        assert store.metadata(keys[1]) == {'Q_N': 11}
+
+        Q = store.get(keys[2], 'Q')
+        assert isinstance(Q, np.memmap)
+        assert Q.dtype == np.float32
+        assert Q[1, 2, 2] == pytest.approx(12)
+        assert not Q.flags.writeable
+
+        restored = store.load(keys[0])
+        assert restored.Q(7.5, 65, 0.6) == pytest.approx(6)
+        assert not restored.support['Q'].flags.owndata
+
+        store.add(keys[2], store.load(keys[2]), metadata={'Q_N': 20})
+        assert store.get(keys[2], 'Q')[1, 2, 2] == pytest.approx(12)
+        assert store.load(keys[2]).COP(7.5, 65, 0.6) == pytest.approx(
+            restored.COP(7.5, 65, 0.6)
+            )
+        assert store.metadata(keys[2]) == {'Q_N': 20}
+
+        store.add(keys[0], restored, resolution={'pl': 0.05})
+        assert store.get(keys[0], 'COP').shape == (6, 21, 11)
+
+        store.remove(keys[1])
+        assert keys[1] not in CharacteristicStore(str(tmp_path / 'store'))